@@ -0,0 +1,197 @@
+"""
+Bounded outbound queues for broadcasting session data to API clients.
+"""
+
+import collections
+import logging
+import threading
+from queue import Empty
+
+# policies for when a client queue is full
+BROADCAST_COALESCE = "coalesce"
+BROADCAST_DROP = "drop"
+BROADCAST_DISCONNECT = "disconnect"
+BROADCAST_POLICIES = (BROADCAST_COALESCE, BROADCAST_DROP, BROADCAST_DISCONNECT)
+
+
+def broadcast_queue(config, name, on_disconnect=None):
+    """
+    Create a broadcast queue using the core-daemon configuration.
+
+    :param dict config: core-daemon configuration
+    :param str name: name of the client, for logging
+    :param on_disconnect: function to call when the client should be disconnected
+    :return: broadcast queue
+    :rtype: BroadcastQueue
+    """
+    maxsize = int(config.get("broadcast_queue_size", 1024))
+    policy = config.get("broadcast_policy", BROADCAST_COALESCE)
+    if policy not in BROADCAST_POLICIES:
+        logging.warning("unknown broadcast policy %s, using %s", policy, BROADCAST_COALESCE)
+        policy = BROADCAST_COALESCE
+    return BroadcastQueue(name, maxsize, policy, on_disconnect)
+
+
+class BroadcastQueue(object):
+    """
+    Bounded queue of data to send to a client, filled by session broadcasts and drained by
+    the client writer, so a slow client never blocks a broadcast. When full, the policy
+    determines what happens to new data:
+
+    * coalesce: replace pending data with the same key, such as a position update for a
+      node, otherwise drop the oldest pending data with a key, and disconnect the client
+      when no pending data has a key, so protocol messages and replies are never dropped
+    * drop: drop the oldest pending data
+    * disconnect: close the queue and disconnect the client
+    """
+
+    def __init__(self, name, maxsize, policy, on_disconnect=None):
+        """
+        Create a BroadcastQueue instance.
+
+        :param str name: name of the client, for logging
+        :param int maxsize: maximum number of pending items
+        :param str policy: policy for when the queue is full
+        :param on_disconnect: function to call when the client should be disconnected
+        """
+        self.name = name
+        self.maxsize = maxsize
+        self.policy = policy
+        self.on_disconnect = on_disconnect
+        self.condition = threading.Condition()
+        self.closed = False
+        # pending [key, item] entries, and the pending entry for each key, oldest first
+        self.entries = collections.deque()
+        self.keys = collections.OrderedDict()
+        # counters
+        self.dropped = 0
+        self.coalesced = 0
+
+    def put(self, item, key=None):
+        """
+        Queue an item to send, without blocking.
+
+        :param item: item to send
+        :param key: key identifying data that a later item may replace, such as a node position
+        :return: True if the item was queued, False otherwise
+        :rtype: bool
+        """
+        disconnect = False
+        with self.condition:
+            if self.closed:
+                return False
+
+            if key is not None and self.policy == BROADCAST_COALESCE:
+                entry = self.keys.get(key)
+                if entry is not None:
+                    entry[1] = item
+                    self.coalesced += 1
+                    return True
+
+            if len(self.entries) >= self.maxsize:
+                if self.policy == BROADCAST_DROP:
+                    self._popleft()
+                    self.dropped += 1
+                elif self.policy == BROADCAST_COALESCE and self.keys:
+                    self._pop_keyed()
+                    self.dropped += 1
+                else:
+                    logging.warning("broadcast queue full for %s, disconnecting", self.name)
+                    self.closed = True
+                    self.condition.notify_all()
+                    disconnect = True
+
+            if not disconnect:
+                entry = [key, item]
+                self.entries.append(entry)
+                if key is not None:
+                    self.keys[key] = entry
+                self.condition.notify()
+
+        if disconnect:
+            if self.on_disconnect:
+                self.on_disconnect()
+            return False
+        return True
+
+    def _popleft(self):
+        """
+        Remove the oldest entry, expected to be called with the condition held.
+
+        :return: oldest item
+        """
+        key, item = entry = self.entries.popleft()
+        if key is not None and self.keys.get(key) is entry:
+            del self.keys[key]
+        return item
+
+    def _pop_keyed(self):
+        """
+        Remove the oldest entry with a key, expected to be called with the condition held.
+
+        :return: oldest item with a key
+        """
+        _, entry = self.keys.popitem(last=False)
+        self.entries.remove(entry)
+        return entry[1]
+
+    def get(self, timeout=None):
+        """
+        Retrieve the oldest item, waiting for one to be queued.
+
+        :param float timeout: time to wait for an item
+        :return: oldest item
+        :raises Empty: when no item was queued in time
+        :raises EOFError: when the queue was closed
+        """
+        with self.condition:
+            if not self.entries and not self.closed:
+                self.condition.wait(timeout)
+            if self.closed:
+                raise EOFError("broadcast queue closed")
+            if not self.entries:
+                raise Empty
+            return self._popleft()
+
+    def get_all(self, timeout=None):
+        """
+        Retrieve all pending items, waiting for one to be queued.
+
+        :param float timeout: time to wait for an item
+        :return: pending items, oldest first
+        :rtype: list
+        :raises Empty: when no item was queued in time
+        :raises EOFError: when the queue was closed
+        """
+        with self.condition:
+            items = [self.get(timeout)]
+            while self.entries:
+                items.append(self._popleft())
+            return items
+
+    def close(self):
+        """
+        Close the queue, discarding pending items and waking up the writer.
+
+        :return: nothing
+        """
+        with self.condition:
+            self.closed = True
+            self.entries.clear()
+            self.keys.clear()
+            self.condition.notify_all()
+
+    def stats(self):
+        """
+        Retrieve queue counters.
+
+        :return: pending, dropped, and coalesced counts, and whether the queue was closed
+        :rtype: dict
+        """
+        with self.condition:
+            return {
+                "pending": len(self.entries),
+                "dropped": self.dropped,
+                "coalesced": self.coalesced,
+                "closed": self.closed,
+            }
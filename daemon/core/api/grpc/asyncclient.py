@@ -0,0 +1,271 @@
+"""
+Asyncio gRpc client for interfacing with CORE, when gRPC mode is enabled.
+
+Requires Python 3 and a grpcio release providing grpc.aio.
+"""
+
+import asyncio
+import inspect
+import itertools
+import logging
+from contextlib import asynccontextmanager
+
+import grpc
+from grpc import aio
+
+from core.api.grpc import core_pb2
+from core.api.grpc import core_pb2_grpc
+from core.api.grpc.client import CoreGrpcClient
+
+
+async def stream_listener(stream, handler):
+    """
+    Listen for stream events and provide them to the handler.
+
+    :param stream: grpc stream that will provide events
+    :param handler: function or coroutine function that handles an event
+    :return: nothing
+    """
+    try:
+        async for event in stream:
+            result = handler(event)
+            if inspect.isawaitable(result):
+                await result
+    except grpc.RpcError as e:
+        if e.code() == grpc.StatusCode.CANCELLED:
+            logging.debug("stream closed")
+        else:
+            logging.exception("stream error")
+
+
+def start_streamer(stream, handler):
+    """
+    Convenience method for starting a task handling streamed events.
+
+    :param stream: grpc stream that will provide events
+    :param handler: function or coroutine function that handles an event
+    :return: task handling the stream, cancel it to stop listening
+    :rtype: asyncio.Task
+    """
+    return asyncio.ensure_future(stream_listener(stream, handler))
+
+
+class AsyncCoreGrpcClient(CoreGrpcClient):
+    """
+    Provides the methods of CoreGrpcClient over a small pool of asyncio channels. Unary calls
+    are awaited, streamed responses are iterated with async for, and event listeners run as
+    tasks. Calls are spread across the channels, and many calls may be in flight at once, so
+    bulk changes are not limited by the round trip time of each call.
+    """
+
+    def __init__(self, address="localhost:50051", pool_size=4):
+        """
+        Creates an AsyncCoreGrpcClient instance.
+
+        :param str address: grpc server address to connect to
+        :param int pool_size: number of channels to open to the server
+        """
+        self.address = address
+        self.pool_size = pool_size
+        self.channels = []
+        self.stubs = None
+
+    @property
+    def stub(self):
+        """
+        Retrieve the stub to use for the next call, rotating through the channel pool.
+
+        :return: stub for a pooled channel
+        :rtype: core_pb2_grpc.CoreApiStub
+        """
+        return next(self.stubs)
+
+    async def start_session(self, nodes, links, session_id=None, hooks=None, emane_config=None, wlan_configs=None,
+                            mobility_configs=None, emane_model_configs=None, service_configs=None,
+                            service_files=None, handler=None):
+        """
+        Create and start a session with a complete topology in a single call, waiting for it to start.
+
+        :param list[core_pb2.Node] nodes: nodes to create, each with a unique id
+        :param list[core_pb2.Link] links: links to create
+        :param int session_id: id for session, default is None and one will be created for you
+        :param list[core_pb2.Hook] hooks: hooks to add
+        :param dict[str, str] emane_config: emane configuration values to set
+        :param list[core_pb2.WlanConfig] wlan_configs: wlan configurations to set
+        :param list[core_pb2.MobilityConfig] mobility_configs: mobility configurations to set
+        :param list[core_pb2.EmaneModelConfig] emane_model_configs: emane model configurations to set
+        :param list[core_pb2.NodeServiceConfig] service_configs: node service customizations to set
+        :param list[core_pb2.NodeServiceFile] service_files: node service files to set
+        :param handler: handler for every progress event
+        :return: last progress event, with the started session id and state
+        :rtype: core_pb2.StartSessionEvent
+        :raises grpc.RpcError: when the topology is invalid, or the session fails to start
+        """
+        request = core_pb2.StartSessionRequest(
+            session_id=session_id, nodes=nodes, links=links, hooks=hooks, emane_config=emane_config,
+            wlan_configs=wlan_configs, mobility_configs=mobility_configs, emane_model_configs=emane_model_configs,
+            service_configs=service_configs, service_files=service_files)
+        event = None
+        async for event in self.stub.StartSession(request):
+            if handler:
+                handler(event)
+        return event
+
+    def events(self, session_id, handler, events=None, node_ids=None, max_rate=None):
+        """
+        Listen for session events.
+
+        :param int session_id: id of session
+        :param handler: function or coroutine function handling every event
+        :param list[core_pb2.EventType] events: event types to listen for, default is all types
+        :param list[int] node_ids: nodes to listen for events of, default is all nodes
+        :param float max_rate: maximum node updates per second for each node, default is unlimited
+        :return: task handling the stream, cancel it to stop listening
+        :rtype: asyncio.Task
+        """
+        request = core_pb2.EventsRequest(session_id=session_id, events=events, node_ids=node_ids, max_rate=max_rate)
+        stream = self.stub.Events(request)
+        return start_streamer(stream, handler)
+
+    def event_batches(self, session_id, handler, events=None, node_ids=None, max_rate=None):
+        """
+        Listen for session events, received in batches of those pending.
+
+        :param int session_id: id of session
+        :param handler: function or coroutine function handling every batch of events
+        :param list[core_pb2.EventType] events: event types to listen for, default is all types
+        :param list[int] node_ids: nodes to listen for events of, default is all nodes
+        :param float max_rate: maximum node updates per second for each node, default is unlimited
+        :return: task handling the stream, cancel it to stop listening
+        :rtype: asyncio.Task
+        """
+        request = core_pb2.EventsRequest(session_id=session_id, events=events, node_ids=node_ids, max_rate=max_rate)
+        stream = self.stub.EventBatches(request)
+        return start_streamer(stream, handler)
+
+    def throughputs(self, handler, session_id=None):
+        """
+        Listen for throughput events with information for interfaces and bridges.
+
+        :param handler: function or coroutine function handling every event
+        :param int session_id: id of session to listen for, default is all sessions
+        :return: task handling the stream, cancel it to stop listening
+        :rtype: asyncio.Task
+        """
+        request = core_pb2.ThroughputsRequest(session_id=session_id)
+        stream = self.stub.Throughputs(request)
+        return start_streamer(stream, handler)
+
+    async def pipeline(self, calls, max_in_flight=64):
+        """
+        Make many calls concurrently, with a bounded number in flight at once.
+
+        :param calls: functions each starting a call when invoked, may be a generator
+        :param int max_in_flight: maximum number of calls in flight
+        :return: response, or the grpc.RpcError raised, for each call, in order
+        :rtype: list
+        """
+        semaphore = asyncio.Semaphore(max_in_flight)
+
+        async def run(call):
+            try:
+                return await call()
+            finally:
+                semaphore.release()
+
+        tasks = []
+        for call in calls:
+            await semaphore.acquire()
+            tasks.append(asyncio.ensure_future(run(call)))
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def pipeline_add_nodes(self, session_id, nodes, max_in_flight=64):
+        """
+        Add nodes to session, with an add node call for each node and many calls in flight.
+
+        :param int session_id: session id
+        :param nodes: nodes to add, may be a generator
+        :param int max_in_flight: maximum number of calls in flight
+        :return: response with node id, or the grpc.RpcError raised, for each node, in order
+        :rtype: list
+        """
+        requests = (core_pb2.AddNodeRequest(session_id=session_id, node=node) for node in nodes)
+        calls = (lambda request=request: self.stub.AddNode(request) for request in requests)
+        return await self.pipeline(calls, max_in_flight)
+
+    async def pipeline_add_links(self, session_id, links, max_in_flight=64):
+        """
+        Add links to session, with an add link call for each link and many calls in flight.
+
+        :param int session_id: session id
+        :param links: links to add, may be a generator
+        :param int max_in_flight: maximum number of calls in flight
+        :return: response with result, or the grpc.RpcError raised, for each link, in order
+        :rtype: list
+        """
+        requests = (core_pb2.AddLinkRequest(session_id=session_id, link=link) for link in links)
+        calls = (lambda request=request: self.stub.AddLink(request) for request in requests)
+        return await self.pipeline(calls, max_in_flight)
+
+    async def pipeline_edit_links(self, session_id, links, max_in_flight=64):
+        """
+        Edit links in session, with an edit link call for each link and many calls in flight.
+
+        :param int session_id: session id
+        :param links: links with options to set, may be a generator
+        :param int max_in_flight: maximum number of calls in flight
+        :return: response with result, or the grpc.RpcError raised, for each link, in order
+        :rtype: list
+        """
+        requests = (core_pb2.EditLinkRequest(
+            session_id=session_id, node_one_id=link.node_one_id, node_two_id=link.node_two_id, options=link.options,
+            interface_one_id=link.interface_one.id, interface_two_id=link.interface_two.id) for link in links)
+        calls = (lambda request=request: self.stub.EditLink(request) for request in requests)
+        return await self.pipeline(calls, max_in_flight)
+
+    async def save_xml(self, session_id, file_path):
+        """
+        Save the current scenario to an XML file.
+
+        :param int session_id: session id
+        :param str file_path: local path to save scenario XML file to
+        :return: nothing
+        """
+        request = core_pb2.SaveXmlRequest(session_id=session_id)
+        response = await self.stub.SaveXml(request)
+        with open(file_path, "w") as xml_file:
+            xml_file.write(response.data)
+
+    def connect(self):
+        """
+        Open the pool of channels to the server, must be closed manually.
+
+        :return: nothing
+        """
+        self.channels = [aio.insecure_channel(self.address) for _ in range(self.pool_size)]
+        self.stubs = itertools.cycle([core_pb2_grpc.CoreApiStub(x) for x in self.channels])
+
+    async def close(self):
+        """
+        Close the pool of channels to the server.
+
+        :return: nothing
+        """
+        channels = self.channels
+        self.channels = []
+        self.stubs = None
+        for channel in channels:
+            await channel.close()
+
+    @asynccontextmanager
+    async def context_connect(self):
+        """
+        Makes a context manager based connection to the server, will close after context ends.
+
+        :return: nothing
+        """
+        try:
+            self.connect()
+            yield
+        finally:
+            await self.close()
@@ -0,0 +1,233 @@
+"""
+Defines an asyncio grpc server, streaming session data to subscribers from async generators
+on a single event loop, with blocking emulation calls run on a separately sized executor.
+
+Requires Python 3 and a grpcio release providing grpc.aio.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from queue import Empty
+
+import grpc
+from grpc import aio
+
+from core.api.broadcast import broadcast_queue
+from core.api.grpc import core_pb2
+from core.api.grpc import core_pb2_grpc
+from core.api.grpc.events import EventFilter
+from core.api.grpc.server import CoreGrpcServer
+
+
+class AsyncBroadcastQueue(object):
+    """
+    Wraps a broadcast queue filled from emulation threads, waking up the event loop when data
+    is queued, so subscribers wait on the event loop rather than holding a thread each.
+    """
+
+    def __init__(self, queue, loop):
+        """
+        Create an AsyncBroadcastQueue instance, expected to be called within the event loop.
+
+        :param core.api.broadcast.BroadcastQueue queue: queue to wrap
+        :param asyncio.AbstractEventLoop loop: event loop waiting for data
+        """
+        self.queue = queue
+        self.loop = loop
+        self.ready = asyncio.Event()
+
+    def put(self, item, key=None):
+        """
+        Queue an item to send, without blocking, safe to call from any thread.
+
+        :param item: item to send
+        :param key: key identifying data that a later item may replace, such as a node position
+        :return: True if the item was queued, False otherwise
+        :rtype: bool
+        """
+        queued = self.queue.put(item, key)
+        self.loop.call_soon_threadsafe(self.ready.set)
+        return queued
+
+    async def get_all(self, timeout=None):
+        """
+        Retrieve all pending items, waiting for one to be queued.
+
+        :param float timeout: time to wait for an item
+        :return: pending items, oldest first
+        :rtype: list
+        :raises Empty: when no item was queued in time
+        :raises EOFError: when the queue was closed
+        """
+        self.ready.clear()
+        try:
+            return self.queue.get_all(timeout=0)
+        except Empty:
+            pass
+
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            raise Empty
+        return self.queue.get_all(timeout=0)
+
+    def close(self):
+        """
+        Close the queue, discarding pending items and waking up the subscriber.
+
+        :return: nothing
+        """
+        self.queue.close()
+        self.loop.call_soon_threadsafe(self.ready.set)
+
+    def stats(self):
+        """
+        Retrieve queue counters.
+
+        :return: pending, dropped, and coalesced counts, and whether the queue was closed
+        :rtype: dict
+        """
+        return self.queue.stats()
+
+
+class AsyncCoreGrpcServer(CoreGrpcServer):
+    """
+    Grpc server running on an asyncio event loop. Event and throughput streams are async
+    generators fed by session broadcasts, so the number of subscribers is not limited by
+    the number of threads. All other calls run on an executor sized by the grpc_workers
+    option.
+    """
+
+    def __init__(self, coreemu):
+        """
+        Create an AsyncCoreGrpcServer instance.
+
+        :param core.emulator.coreemu.CoreEmu coreemu: coreemu to serve sessions from
+        """
+        super(AsyncCoreGrpcServer, self).__init__(coreemu)
+        max_workers = int(coreemu.config.get("grpc_workers", 16))
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.loop = None
+        # stop requests within the event loop, and the end of the event loop
+        self.stopping = None
+        self.stopped = threading.Event()
+        self.grace = None
+
+    def listen(self, address):
+        logging.info("starting asyncio grpc api: %s", address)
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self.stopping = asyncio.Event()
+        self.loop = loop
+        try:
+            self.loop.run_until_complete(self.serve(address))
+        except KeyboardInterrupt:
+            self.loop.run_until_complete(self.server.stop(None))
+        finally:
+            self.executor.shutdown(wait=False)
+            self.loop.close()
+            self.stopped.set()
+
+    async def serve(self, address):
+        """
+        Start the grpc server, and stop it once requested.
+
+        :param str address: address to listen on
+        :return: nothing
+        """
+        self.server = aio.server(migration_thread_pool=self.executor)
+        core_pb2_grpc.add_CoreApiServicer_to_server(self, self.server)
+        self.server.add_insecure_port(address)
+        await self.server.start()
+        await self.stopping.wait()
+        await self.server.stop(self.grace)
+
+    def stop(self, grace=None):
+        """
+        Stop the grpc server and wait for the event loop to finish, safe to call from any thread
+        other than the event loop.
+
+        :param float grace: time to let active calls finish
+        :return: nothing
+        """
+        if self.stopped.is_set():
+            return
+        if self.loop is None:
+            # never listened, there is no event loop to stop
+            self.executor.shutdown(wait=False)
+            self.stopped.set()
+            return
+        self.grace = grace
+        self.loop.call_soon_threadsafe(self.stopping.set)
+        self.stopped.wait()
+
+    async def _get_session(self, session_id, context):
+        session = self.coreemu.sessions.get(session_id)
+        if not session:
+            await context.abort(grpc.StatusCode.NOT_FOUND, "session {} not found".format(session_id))
+        return session
+
+    async def _event_batches(self, request, context):
+        session = await self._get_session(request.session_id, context)
+        queue = broadcast_queue(self.coreemu.config, "grpc events %s" % context.peer())
+        queue = AsyncBroadcastQueue(queue, self.loop)
+        event_filter = EventFilter(request.node_ids, request.max_rate)
+        try:
+            handlers = self._add_event_handlers(session, request.events, event_filter, queue)
+        except ValueError as e:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+
+        try:
+            while self.running:
+                try:
+                    items = await queue.get_all(timeout=event_filter.timeout(time.time(), 1))
+                except Empty:
+                    items = []
+                except EOFError:
+                    logging.warning("grpc events queue closed: %s", queue.stats())
+                    break
+
+                events = self._convert_events(session, event_filter, items)
+                if events:
+                    yield events
+        finally:
+            self._remove_event_handlers(handlers)
+            queue.close()
+
+        await context.abort(grpc.StatusCode.CANCELLED, "server stopping")
+
+    async def Events(self, request, context):
+        async for events in self._event_batches(request, context):
+            for event in events:
+                yield event
+
+    async def EventBatches(self, request, context):
+        async for events in self._event_batches(request, context):
+            yield core_pb2.EventBatch(events=events)
+
+    async def Throughputs(self, request, context):
+        session_id = request.session_id or None
+        if session_id is not None:
+            await self._get_session(session_id, context)
+        queue = broadcast_queue(self.coreemu.config, "grpc throughputs %s" % context.peer())
+        queue = AsyncBroadcastQueue(queue, self.loop)
+        self.throughput_sampler.subscribe(queue, session_id)
+
+        try:
+            while self.running:
+                try:
+                    items = await queue.get_all(timeout=1)
+                except Empty:
+                    continue
+                except EOFError:
+                    logging.warning("grpc throughputs queue closed: %s", queue.stats())
+                    break
+
+                for data in items:
+                    yield self._convert_throughputs(data)
+        finally:
+            self.throughput_sampler.unsubscribe(queue)
+            queue.close()
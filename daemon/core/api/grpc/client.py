@@ -121,6 +121,24 @@ def stream_listener(stream, handler):
             logging.exception("stream error")
 
 
+def chunks(items, size):
+    """
+    Split items into lists of a maximum size.
+
+    :param items: items to split, may be a generator
+    :param int size: maximum size of each list
+    :return: generator of item lists
+    """
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
 def start_streamer(stream, handler):
     """
     Convenience method for starting a grpc stream thread for handling streamed events.
@@ -263,27 +281,79 @@ class CoreGrpcClient(object):
         request = core_pb2.SetSessionStateRequest(session_id=session_id, state=state)
         return self.stub.SetSessionState(request)
 
-    def events(self, session_id, handler):
+    def start_session(self, nodes, links, session_id=None, hooks=None, emane_config=None, wlan_configs=None,
+                      mobility_configs=None, emane_model_configs=None, service_configs=None, service_files=None,
+                      handler=None):
+        """
+        Create and start a session with a complete topology in a single call, waiting for it to start.
+
+        :param list[core_pb2.Node] nodes: nodes to create, each with a unique id
+        :param list[core_pb2.Link] links: links to create
+        :param int session_id: id for session, default is None and one will be created for you
+        :param list[core_pb2.Hook] hooks: hooks to add
+        :param dict[str, str] emane_config: emane configuration values to set
+        :param list[core_pb2.WlanConfig] wlan_configs: wlan configurations to set
+        :param list[core_pb2.MobilityConfig] mobility_configs: mobility configurations to set
+        :param list[core_pb2.EmaneModelConfig] emane_model_configs: emane model configurations to set
+        :param list[core_pb2.NodeServiceConfig] service_configs: node service customizations to set
+        :param list[core_pb2.NodeServiceFile] service_files: node service files to set
+        :param handler: handler for every progress event
+        :return: last progress event, with the started session id and state
+        :rtype: core_pb2.StartSessionEvent
+        :raises grpc.RpcError: when the topology is invalid, or the session fails to start
+        """
+        request = core_pb2.StartSessionRequest(
+            session_id=session_id, nodes=nodes, links=links, hooks=hooks, emane_config=emane_config,
+            wlan_configs=wlan_configs, mobility_configs=mobility_configs, emane_model_configs=emane_model_configs,
+            service_configs=service_configs, service_files=service_files)
+        event = None
+        for event in self.stub.StartSession(request):
+            if handler:
+                handler(event)
+        return event
+
+    def events(self, session_id, handler, events=None, node_ids=None, max_rate=None):
         """
         Listen for session events.
 
         :param int session_id: id of session
         :param handler: handler for every event
+        :param list[core_pb2.EventType] events: event types to listen for, default is all types
+        :param list[int] node_ids: nodes to listen for events of, default is all nodes
+        :param float max_rate: maximum node updates per second for each node, default is unlimited
         :return: nothing
         :raises grpc.RpcError: when session doesn't exist
         """
-        request = core_pb2.EventsRequest(session_id=session_id)
+        request = core_pb2.EventsRequest(session_id=session_id, events=events, node_ids=node_ids, max_rate=max_rate)
         stream = self.stub.Events(request)
         start_streamer(stream, handler)
 
-    def throughputs(self, handler):
+    def event_batches(self, session_id, handler, events=None, node_ids=None, max_rate=None):
+        """
+        Listen for session events, received in batches of those pending.
+
+        :param int session_id: id of session
+        :param handler: handler for every batch of events
+        :param list[core_pb2.EventType] events: event types to listen for, default is all types
+        :param list[int] node_ids: nodes to listen for events of, default is all nodes
+        :param float max_rate: maximum node updates per second for each node, default is unlimited
+        :return: nothing
+        :raises grpc.RpcError: when session doesn't exist
+        """
+        request = core_pb2.EventsRequest(session_id=session_id, events=events, node_ids=node_ids, max_rate=max_rate)
+        stream = self.stub.EventBatches(request)
+        start_streamer(stream, handler)
+
+    def throughputs(self, handler, session_id=None):
         """
         Listen for throughput events with information for interfaces and bridges.
 
         :param handler: handler for every event
+        :param int session_id: id of session to listen for, default is all sessions
         :return: nothing
+        :raises grpc.RpcError: when session doesn't exist
         """
-        request = core_pb2.ThroughputsRequest()
+        request = core_pb2.ThroughputsRequest(session_id=session_id)
         stream = self.stub.Throughputs(request)
         start_streamer(stream, handler)
 
@@ -327,6 +397,20 @@ class CoreGrpcClient(object):
         request = core_pb2.EditNodeRequest(session_id=session_id, node_id=node_id, position=position)
         return self.stub.EditNode(request)
 
+    def move_positions(self, session_id, batches):
+        """
+        Stream batches of node positions, each applied together, with wireless ranges and emane
+        locations updated once for each batch.
+
+        :param int session_id: session id
+        :param batches: lists of core_pb2.NodePosition to apply, may be a generator
+        :return: response with the number of batches applied and nodes moved
+        :rtype: core_pb2.MovePositionsResponse
+        :raises grpc.RpcError: when session or a node doesn't exist
+        """
+        requests = (core_pb2.MovePositionsRequest(session_id=session_id, positions=positions) for positions in batches)
+        return self.stub.MovePositions(requests)
+
     def delete_node(self, session_id, node_id):
         """
         Delete node from session.
@@ -340,6 +424,46 @@ class CoreGrpcClient(object):
         request = core_pb2.DeleteNodeRequest(session_id=session_id, node_id=node_id)
         return self.stub.DeleteNode(request)
 
+    def add_nodes(self, session_id, nodes):
+        """
+        Add nodes to session in a single call.
+
+        :param int session_id: session id
+        :param list[core_pb2.Node] nodes: nodes to add
+        :return: response with the node id and result of each node, in order
+        :rtype: core_pb2.AddNodesResponse
+        :raises grpc.RpcError: when session doesn't exist
+        """
+        request = core_pb2.AddNodesRequest(session_id=session_id, nodes=nodes)
+        return self.stub.AddNodes(request)
+
+    def stream_add_nodes(self, session_id, nodes, chunk_size=100):
+        """
+        Add nodes to session, streamed in chunks the server adds as they arrive.
+
+        :param int session_id: session id
+        :param nodes: nodes to add, may be a generator
+        :param int chunk_size: number of nodes sent in each message
+        :return: response with the node id and result of each node, in order
+        :rtype: core_pb2.AddNodesResponse
+        :raises grpc.RpcError: when session doesn't exist
+        """
+        requests = (core_pb2.AddNodesRequest(session_id=session_id, nodes=chunk) for chunk in chunks(nodes, chunk_size))
+        return self.stub.StreamAddNodes(requests)
+
+    def delete_nodes(self, session_id, node_ids):
+        """
+        Delete nodes from session in a single call.
+
+        :param int session_id: session id
+        :param list[int] node_ids: ids of nodes to delete
+        :return: response with the result of each node, in order
+        :rtype: core_pb2.DeleteNodesResponse
+        :raises grpc.RpcError: when session doesn't exist
+        """
+        request = core_pb2.DeleteNodesRequest(session_id=session_id, node_ids=node_ids)
+        return self.stub.DeleteNodes(request)
+
     def node_command(self, session_id, node_id, command):
         """
         Send command to a node and get the output.
@@ -353,6 +477,28 @@ class CoreGrpcClient(object):
         request = core_pb2.NodeCommandRequest(session_id=session_id, node_id=node_id, command=command)
         return self.stub.NodeCommand(request)
 
+    def node_commands(self, session_id, command, node_ids=None, node_types=None, services=None, timeout=0,
+                      max_output=0):
+        """
+        Send a command to many nodes in parallel, getting the result for each node as it finishes.
+        Nodes are selected by all provided selectors, all nodes when none are provided.
+
+        :param int session_id: session id
+        :param str command: command to run
+        :param list[int] node_ids: nodes to run command on
+        :param list[core_pb2.NodeType] node_types: types of nodes to run command on
+        :param list[str] services: run command on nodes with any of these services
+        :param float timeout: seconds to let the command run on each node, unlimited when 0
+        :param int max_output: maximum length of output returned for each node, unlimited when 0
+        :return: stream of results for each node
+        :rtype: iterator[core_pb2.NodeCommandResult]
+        :raises grpc.RpcError: when session or a node doesn't exist
+        """
+        request = core_pb2.NodeCommandsRequest(
+            session_id=session_id, command=command, node_ids=node_ids, node_types=node_types, services=services,
+            timeout=timeout, max_output=max_output)
+        return self.stub.NodeCommands(request)
+
     def get_node_terminal(self, session_id, node_id):
         """
         Retrieve terminal command string for launching a local terminal.
@@ -418,6 +564,46 @@ class CoreGrpcClient(object):
             interface_one_id=interface_one_id, interface_two_id=interface_two_id)
         return self.stub.EditLink(request)
 
+    def add_links(self, session_id, links):
+        """
+        Add links between nodes in a single call.
+
+        :param int session_id: session id
+        :param list[core_pb2.Link] links: links to add
+        :return: response with the result of each link, in order
+        :rtype: core_pb2.AddLinksResponse
+        :raises grpc.RpcError: when session doesn't exist
+        """
+        request = core_pb2.AddLinksRequest(session_id=session_id, links=links)
+        return self.stub.AddLinks(request)
+
+    def stream_add_links(self, session_id, links, chunk_size=100):
+        """
+        Add links between nodes, streamed in chunks the server adds as they arrive.
+
+        :param int session_id: session id
+        :param links: links to add, may be a generator
+        :param int chunk_size: number of links sent in each message
+        :return: response with the result of each link, in order
+        :rtype: core_pb2.AddLinksResponse
+        :raises grpc.RpcError: when session doesn't exist
+        """
+        requests = (core_pb2.AddLinksRequest(session_id=session_id, links=chunk) for chunk in chunks(links, chunk_size))
+        return self.stub.StreamAddLinks(requests)
+
+    def edit_links(self, session_id, links):
+        """
+        Edit links between nodes in a single call.
+
+        :param int session_id: session id
+        :param list[core_pb2.Link] links: links identified by node ids and interface ids, with options to set
+        :return: response with the result of each link, in order
+        :rtype: core_pb2.EditLinksResponse
+        :raises grpc.RpcError: when session doesn't exist
+        """
+        request = core_pb2.EditLinksRequest(session_id=session_id, links=links)
+        return self.stub.EditLinks(request)
+
     def delete_link(self, session_id, node_one_id, node_two_id, interface_one_id=None, interface_two_id=None):
         """
         Delete a link between nodes.
@@ -0,0 +1,131 @@
+"""
+Filtering and rate limiting of session data streamed to grpc event subscribers.
+"""
+
+import collections
+
+from core.emulator.data import LinkData, NodeData
+from core.emulator.enumerations import MessageFlags
+
+
+def data_node_ids(data):
+    """
+    Retrieve the nodes session data is for.
+
+    :param data: node, link, event, config, exception, or file data
+    :return: node ids, empty when the data is not for a node
+    :rtype: tuple
+    """
+    if isinstance(data, NodeData):
+        return data.id,
+    elif isinstance(data, LinkData):
+        return data.node1_id, data.node2_id
+    node_id = getattr(data, "node", None)
+    if node_id is None:
+        return ()
+    return node_id,
+
+
+def is_node_update(data):
+    """
+    Check if session data is an update for an existing node, such as a position change.
+
+    :param data: session data to check
+    :return: True if data is a node update, False otherwise
+    :rtype: bool
+    """
+    return isinstance(data, NodeData) and data.message_type == 0
+
+
+class EventFilter(object):
+    """
+    Filters session data for an event subscriber by node, before it is queued, and limits
+    the rate of node updates sent for each node. Updates arriving too soon after the last
+    one sent are held, with later updates for the node replacing them, until the node may
+    be updated again.
+    """
+
+    def __init__(self, node_ids=None, max_rate=0):
+        """
+        Create an EventFilter instance.
+
+        :param list[int] node_ids: nodes to receive data for, all nodes when empty
+        :param float max_rate: maximum node updates per second for each node, unlimited
+            when 0
+        """
+        self.node_ids = frozenset(node_ids or ())
+        self.interval = 0
+        if max_rate > 0:
+            self.interval = 1.0 / max_rate
+        # time each node may next be updated, and updates held until then
+        self.next_times = {}
+        self.pending = collections.OrderedDict()
+
+    def accept(self, data):
+        """
+        Check if data should be sent to the subscriber. Data not for any node, such as
+        session state changes, is always accepted.
+
+        :param data: session data to check
+        :return: True if data should be sent, False otherwise
+        :rtype: bool
+        """
+        if not self.node_ids:
+            return True
+        node_ids = data_node_ids(data)
+        if not node_ids:
+            return True
+        return any(node_id in self.node_ids for node_id in node_ids)
+
+    def limit(self, items, now):
+        """
+        Retrieve the data to send now, holding node updates that exceed the maximum rate
+        and releasing held updates that are due. Held updates for a node are discarded
+        when the node is added or deleted.
+
+        :param list items: accepted data, oldest first
+        :param float now: current time
+        :return: data to send, oldest first
+        :rtype: list
+        """
+        if not self.interval:
+            return items
+
+        result = []
+        for node_id in list(self.pending):
+            if self.next_times[node_id] <= now:
+                result.append(self.pending.pop(node_id))
+                self.next_times[node_id] = now + self.interval
+
+        for data in items:
+            if not is_node_update(data):
+                # a node add or delete supersedes held updates for the node
+                if isinstance(data, NodeData):
+                    self.pending.pop(data.id, None)
+                    if data.message_type & MessageFlags.DELETE.value:
+                        self.next_times.pop(data.id, None)
+                result.append(data)
+                continue
+
+            node_id = data.id
+            if node_id in self.pending or self.next_times.get(node_id, 0) > now:
+                self.pending[node_id] = data
+            else:
+                result.append(data)
+                self.next_times[node_id] = now + self.interval
+
+        return result
+
+    def timeout(self, now, default):
+        """
+        Retrieve the time to wait for new data before held updates are due.
+
+        :param float now: current time
+        :param float default: time to wait when no updates are held
+        :return: time to wait
+        :rtype: float
+        """
+        if not self.pending:
+            return default
+        due = min(self.next_times[node_id] for node_id in self.pending)
+        return max(0, min(default, due - now))
@@ -1,27 +1,46 @@
 import atexit
 import logging
 import os
-import re
 import tempfile
 import time
 
 import grpc
 from builtins import int
 from concurrent import futures
-from queue import Queue, Empty
+from multiprocessing.pool import ThreadPool
+from queue import Empty
 
+from core.api.broadcast import broadcast_queue
 from core.api.grpc import core_pb2
 from core.api.grpc import core_pb2_grpc
+from core.api.grpc.events import EventFilter, is_node_update
+from core import utils
+from core.api.throughputs import ThroughputSampler
 from core.emulator.data import NodeData, LinkData, EventData, ConfigData, ExceptionData, FileData
 from core.emulator.emudata import NodeOptions, InterfaceData, LinkOptions
 from core.emulator.enumerations import NodeTypes, EventTypes, LinkTypes
 from core.location.mobility import BasicRangeModel, Ns2ScriptedMobility
 from core.nodes import nodeutils
+from core.nodes.base import CoreNodeBase
 from core.nodes.ipaddress import MacAddress
 from core.services.coreservices import ServiceManager
 
 _ONE_DAY_IN_SECONDS = 60 * 60 * 24
-_INTERFACE_REGEX = re.compile(r"\d+")
+# maximum threads used to apply a batch in parallel
+_BATCH_THREADS = 16
+# number of items applied between progress updates
+_BATCH_SIZE = 100
+# exit status of commands stopped by timeout
+_TIMEOUT_STATUS = 124
+# session handler lists for each event type
+_EVENT_HANDLERS = {
+    core_pb2.EventType.SESSION: "event_handlers",
+    core_pb2.EventType.NODE: "node_handlers",
+    core_pb2.EventType.LINK: "link_handlers",
+    core_pb2.EventType.CONFIG: "config_handlers",
+    core_pb2.EventType.EXCEPTION: "exception_handlers",
+    core_pb2.EventType.FILE: "file_handlers",
+}
 
 
 def convert_value(value):
@@ -108,20 +127,205 @@ def convert_link(session, link_data):
     )
 
 
-def get_net_stats():
-    with open("/proc/net/dev", "r") as f:
-        data = f.readlines()[2:]
+def convert_interface_data(interface_proto):
+    name = interface_proto.name
+    if name == "":
+        name = None
+    mac = interface_proto.mac
+    if mac == "":
+        mac = None
+    else:
+        mac = MacAddress.from_string(mac)
+    return InterfaceData(
+        _id=interface_proto.id,
+        name=name,
+        mac=mac,
+        ip4=interface_proto.ip4,
+        ip4_mask=interface_proto.ip4mask,
+        ip6=interface_proto.ip6,
+        ip6_mask=interface_proto.ip6mask,
+    )
+
+
+def convert_link_options(options_data, link_type=LinkTypes.WIRED):
+    link_options = LinkOptions(_type=link_type)
+    link_options.delay = options_data.delay
+    link_options.bandwidth = options_data.bandwidth
+    link_options.per = options_data.per
+    link_options.dup = options_data.dup
+    link_options.jitter = options_data.jitter
+    link_options.mer = options_data.mer
+    link_options.burst = options_data.burst
+    link_options.mburst = options_data.mburst
+    link_options.unidirectional = options_data.unidirectional
+    link_options.key = options_data.key
+    link_options.opaque = options_data.opaque
+    return link_options
+
+
+def add_node(session, node_proto):
+    node_id = node_proto.id
+    node_type = node_proto.type
+    if node_type is None:
+        node_type = NodeTypes.DEFAULT.value
+    node_type = NodeTypes(node_type)
+
+    node_options = NodeOptions(name=node_proto.name, model=node_proto.model)
+    node_options.icon = node_proto.icon
+    node_options.opaque = node_proto.opaque
+    node_options.services = node_proto.services
+
+    position = node_proto.position
+    node_options.set_position(position.x, position.y)
+    node_options.set_location(position.lat, position.lon, position.alt)
+    node = session.add_node(_type=node_type, _id=node_id, node_options=node_options)
+
+    # configure emane if provided
+    emane_model = node_proto.emane
+    if emane_model:
+        session.emane.set_model_config(node_id, emane_model)
+
+    return node
+
+
+def add_link(session, link_proto):
+    # validate node exist
+    session.get_node(link_proto.node_one_id)
+    session.get_node(link_proto.node_two_id)
+
+    interface_one = None
+    if link_proto.interface_one:
+        interface_one = convert_interface_data(link_proto.interface_one)
+
+    interface_two = None
+    if link_proto.interface_two:
+        interface_two = convert_interface_data(link_proto.interface_two)
+
+    link_type = None
+    link_type_value = link_proto.type
+    if link_type_value is not None:
+        link_type = LinkTypes(link_type_value)
+
+    link_options = convert_link_options(link_proto.options, link_type)
+    session.add_link(
+        link_proto.node_one_id, link_proto.node_two_id, interface_one, interface_two, link_options=link_options)
+
+
+def edit_link(session, link_proto):
+    link_options = convert_link_options(link_proto.options)
+    session.update_link(
+        link_proto.node_one_id, link_proto.node_two_id, link_proto.interface_one.id, link_proto.interface_two.id,
+        link_options
+    )
+
+
+def delete_node(session, node_id):
+    if not session.delete_node(node_id):
+        raise ValueError("node {} not found".format(node_id))
+
+
+def batch_result(session, func, *args):
+    try:
+        # flush batched host commands for each item, so a failed command fails its item
+        with session.net_batch():
+            func(session, *args)
+        return core_pb2.BatchResult(result=True)
+    except Exception as e:
+        logging.exception("batch item failed: %s", func.__name__)
+        return core_pb2.BatchResult(result=False, error=str(e))
+
+
+def add_node_result(session, node_proto):
+    try:
+        node = add_node(session, node_proto)
+        return core_pb2.AddNodeResult(node_id=node.id, result=True)
+    except Exception as e:
+        logging.exception("add node failed: %s", node_proto.id)
+        return core_pb2.AddNodeResult(node_id=node_proto.id, result=False, error=str(e))
+
 
-    stats = {}
-    for line in data:
-        line = line.strip()
-        if not line:
+def select_nodes(session, node_ids, node_types, services):
+    nodes = []
+    for node in list(session.nodes.values()):
+        if not isinstance(node, CoreNodeBase) or nodeutils.is_node(node, NodeTypes.RJ45):
             continue
-        line = line.split()
-        line[0] = line[0].strip(":")
-        stats[line[0]] = {"rx": float(line[1]), "tx": float(line[9])}
+        if node_ids and node.id not in node_ids:
+            continue
+        if node_types and nodeutils.get_node_type(node.__class__).value not in node_types:
+            continue
+        if services and not any(x.name in services for x in node.services):
+            continue
+        nodes.append(node)
+    return sorted(nodes, key=lambda x: x.id)
+
+
+def node_command_result(node, command, timeout, max_output):
+    result = core_pb2.NodeCommandResult(node_id=node.id)
+    args = utils.split_args(command)
+    if timeout > 0:
+        args = ["timeout", "%s" % timeout] + args
+    try:
+        status, output = node.cmd_output(args)
+    except Exception as e:
+        logging.exception("node command failed: %s", node.name)
+        result.error = str(e)
+        return result
+
+    result.status = status
+    result.timed_out = timeout > 0 and status == _TIMEOUT_STATUS
+    if 0 < max_output < len(output):
+        output = output[:max_output]
+        result.truncated = True
+    result.output = output
+    return result
+
+
+def validate_start_session(request, emane_models):
+    errors = []
+    node_ids = set()
+    for node_proto in request.nodes:
+        if not node_proto.id:
+            errors.append("node {} has no id".format(node_proto.name))
+        elif node_proto.id in node_ids:
+            errors.append("duplicate node id {}".format(node_proto.id))
+        node_ids.add(node_proto.id)
+        try:
+            NodeTypes(node_proto.type)
+        except ValueError:
+            errors.append("node {} has unknown type {}".format(node_proto.id, node_proto.type))
+        for service_name in node_proto.services:
+            if not ServiceManager.get(service_name):
+                errors.append("node {} has unknown service {}".format(node_proto.id, service_name))
+
+    for link_proto in request.links:
+        for node_id in (link_proto.node_one_id, link_proto.node_two_id):
+            if node_id not in node_ids:
+                errors.append("link {}-{} has unknown node {}".format(
+                    link_proto.node_one_id, link_proto.node_two_id, node_id))
+
+    for hook in request.hooks:
+        try:
+            EventTypes(hook.state)
+        except ValueError:
+            errors.append("hook {} has unknown state {}".format(hook.file, hook.state))
 
-    return stats
+    configs = [request.wlan_configs, request.mobility_configs, request.emane_model_configs, request.service_configs,
+               request.service_files]
+    for config_list in configs:
+        for config in config_list:
+            if config.node_id not in node_ids:
+                errors.append("{} has unknown node {}".format(config.DESCRIPTOR.name, config.node_id))
+
+    for config_list in (request.service_configs, request.service_files):
+        for config in config_list:
+            if not ServiceManager.get(config.service):
+                errors.append("{} has unknown service {}".format(config.DESCRIPTOR.name, config.service))
+
+    for config in request.emane_model_configs:
+        if config.model not in emane_models:
+            errors.append("{} has unknown emane model {}".format(config.DESCRIPTOR.name, config.model))
+
+    return errors
 
 
 class CoreGrpcServer(core_pb2_grpc.CoreApiServicer):
@@ -130,6 +334,8 @@ class CoreGrpcServer(core_pb2_grpc.CoreApiServicer):
         self.coreemu = coreemu
         self.running = True
         self.server = None
+        interval = float(coreemu.config.get("throughputs_interval", 3))
+        self.throughput_sampler = ThroughputSampler(coreemu.sessions, interval)
         atexit.register(self._exit_handler)
 
     def _exit_handler(self):
@@ -231,6 +437,92 @@ class CoreGrpcServer(core_pb2_grpc.CoreApiServicer):
 
         return core_pb2.SetSessionStateResponse(result=result)
 
+    def StartSession(self, request, context):
+        logging.debug("start session: %s nodes, %s links", len(request.nodes), len(request.links))
+        if request.session_id in self.coreemu.sessions:
+            context.abort(grpc.StatusCode.ALREADY_EXISTS, "session {} already exists".format(request.session_id))
+
+        # emane models available are only known once the session is created
+        session = self.coreemu.create_session(request.session_id)
+        started = False
+        try:
+            errors = validate_start_session(request, session.emane.models)
+            if errors:
+                context.abort(grpc.StatusCode.INVALID_ARGUMENT, "; ".join(errors))
+
+            session.set_state(EventTypes.DEFINITION_STATE)
+            session.location.setrefgeo(47.57917, -122.13232, 2.0)
+            session.location.refscale = 150000.0
+
+            error = None
+            try:
+                for event in self._start_session(session, request):
+                    yield event
+            except Exception as e:
+                logging.exception("error starting session: %s", session.id)
+                error = str(e)
+            if error is not None:
+                context.abort(grpc.StatusCode.INTERNAL, "session {} failed to start: {}".format(session.id, error))
+            started = True
+        finally:
+            # also reached when the client cancels the call, which does not raise an Exception
+            if not started:
+                self.coreemu.delete_session(session.id)
+
+    def _start_session(self, session, request):
+        def progress(step, completed=0, total=0):
+            return core_pb2.StartSessionEvent(
+                session_id=session.id, state=session.state, step=step, completed=completed, total=total)
+
+        yield progress("validated")
+
+        # configuration is set before nodes are added, as when reading xml
+        for hook in request.hooks:
+            session.add_hook(hook.state, hook.file, None, hook.data)
+        for config in request.service_configs:
+            session.services.set_service(config.node_id, config.service)
+            service = session.services.get_service(config.node_id, config.service)
+            service.startup = tuple(config.startup)
+            service.validate = tuple(config.validate)
+            service.shutdown = tuple(config.shutdown)
+        for config in request.service_files:
+            session.services.set_service_file(config.node_id, config.service, config.file, config.data)
+        for config in request.wlan_configs:
+            session.mobility.set_model_config(config.node_id, BasicRangeModel.name, config.config)
+        for config in request.mobility_configs:
+            session.mobility.set_model_config(config.node_id, Ns2ScriptedMobility.name, config.config)
+        session.emane.get_configs().update(request.emane_config)
+        for config in request.emane_model_configs:
+            _id = get_emane_model_id(config.node_id, config.interface_id)
+            session.emane.set_model_config(_id, config.model, config.config)
+        yield progress("configured")
+
+        total = len(request.nodes)
+        for start in range(0, total, _BATCH_SIZE):
+            results = self._add_nodes(session, request.nodes[start:start + _BATCH_SIZE])
+            errors = [x.error for x in results if not x.result]
+            if errors:
+                raise ValueError("; ".join(errors))
+            yield progress("nodes", min(start + _BATCH_SIZE, total), total)
+
+        total = len(request.links)
+        for start in range(0, total, _BATCH_SIZE):
+            results = self._add_links(session, request.links[start:start + _BATCH_SIZE])
+            errors = [x.error for x in results if not x.result]
+            if errors:
+                raise ValueError("; ".join(errors))
+            yield progress("links", min(start + _BATCH_SIZE, total), total)
+
+        session.set_state(EventTypes.CONFIGURATION_STATE, send_event=True)
+        yield progress("configuration")
+
+        session.set_state(EventTypes.INSTANTIATION_STATE, send_event=True)
+        yield progress("instantiation")
+        if not os.path.exists(session.session_dir):
+            os.mkdir(session.session_dir)
+        session.instantiate()
+        yield progress("started")
+
     def GetSessionOptions(self, request, context):
         logging.debug("get session options: %s", request)
         session = self.get_session(request.session_id, context)
@@ -282,49 +574,105 @@ class CoreGrpcServer(core_pb2_grpc.CoreApiServicer):
         session_proto = core_pb2.Session(state=session.state, nodes=nodes, links=links)
         return core_pb2.GetSessionResponse(session=session_proto)
 
-    def Events(self, request, context):
+    def _add_event_handlers(self, session, event_types, event_filter, queue):
+        if not event_types:
+            event_types = _EVENT_HANDLERS.keys()
+
+        def handler(data):
+            if event_filter.accept(data):
+                queue.put(data)
+
+        def node_handler(node_data):
+            if event_filter.accept(node_data):
+                key = None
+                if is_node_update(node_data):
+                    key = node_data.id
+                queue.put(node_data, key)
+
+        handlers = []
+        for event_type in set(event_types):
+            handler_name = _EVENT_HANDLERS.get(event_type)
+            if handler_name is None:
+                raise ValueError("unknown event type {}".format(event_type))
+            handler_list = getattr(session, handler_name)
+            if event_type == core_pb2.EventType.NODE:
+                handlers.append((handler_list, node_handler))
+            else:
+                handlers.append((handler_list, handler))
+
+        for handler_list, event_handler in handlers:
+            handler_list.append(event_handler)
+        return handlers
+
+    def _remove_event_handlers(self, handlers):
+        for handler_list, event_handler in handlers:
+            handler_list.remove(event_handler)
+
+    def _event_batches(self, request, context):
         session = self.get_session(request.session_id, context)
-        queue = Queue()
-        session.node_handlers.append(queue.put)
-        session.link_handlers.append(queue.put)
-        session.config_handlers.append(queue.put)
-        session.file_handlers.append(queue.put)
-        session.exception_handlers.append(queue.put)
-        session.event_handlers.append(queue.put)
+        queue = broadcast_queue(self.coreemu.config, "grpc events %s" % context.peer())
+        event_filter = EventFilter(request.node_ids, request.max_rate)
+        try:
+            handlers = self._add_event_handlers(session, request.events, event_filter, queue)
+        except ValueError as e:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
 
-        while self._is_running(context):
-            event = core_pb2.Event()
-            try:
-                data = queue.get(timeout=1)
-                if isinstance(data, NodeData):
-                    event.node_event.CopyFrom(self._handle_node_event(data))
-                elif isinstance(data, LinkData):
-                    event.link_event.CopyFrom(self._handle_link_event(data))
-                elif isinstance(data, EventData):
-                    event.session_event.CopyFrom(self._handle_session_event(data))
-                elif isinstance(data, ConfigData):
-                    event.config_event.CopyFrom(self._handle_config_event(data))
-                    # TODO: remove when config events are fixed
-                    event.config_event.session_id = session.id
-                elif isinstance(data, ExceptionData):
-                    event.exception_event.CopyFrom(self._handle_exception_event(data))
-                elif isinstance(data, FileData):
-                    event.file_event.CopyFrom(self._handle_file_event(data))
-                else:
-                    logging.error("unknown event: %s", data)
-                    continue
+        try:
+            while self._is_running(context):
+                try:
+                    items = queue.get_all(timeout=event_filter.timeout(time.time(), 1))
+                except Empty:
+                    items = []
+                except EOFError:
+                    logging.warning("grpc events queue closed: %s", queue.stats())
+                    break
+
+                events = self._convert_events(session, event_filter, items)
+                if events:
+                    yield events
+        finally:
+            self._remove_event_handlers(handlers)
+            queue.close()
 
+        self._cancel_stream(context)
+
+    def _convert_events(self, session, event_filter, items):
+        events = []
+        for data in event_filter.limit(items, time.time()):
+            event = self._convert_event(session, data)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def _convert_event(self, session, data):
+        event = core_pb2.Event()
+        if isinstance(data, NodeData):
+            event.node_event.CopyFrom(self._handle_node_event(data))
+        elif isinstance(data, LinkData):
+            event.link_event.CopyFrom(self._handle_link_event(data))
+        elif isinstance(data, EventData):
+            event.session_event.CopyFrom(self._handle_session_event(data))
+        elif isinstance(data, ConfigData):
+            event.config_event.CopyFrom(self._handle_config_event(data))
+            # TODO: remove when config events are fixed
+            event.config_event.session_id = session.id
+        elif isinstance(data, ExceptionData):
+            event.exception_event.CopyFrom(self._handle_exception_event(data))
+        elif isinstance(data, FileData):
+            event.file_event.CopyFrom(self._handle_file_event(data))
+        else:
+            logging.error("unknown event: %s", data)
+            return None
+        return event
+
+    def Events(self, request, context):
+        for events in self._event_batches(request, context):
+            for event in events:
                 yield event
-            except Empty:
-                continue
 
-        session.node_handlers.remove(queue.put)
-        session.link_handlers.remove(queue.put)
-        session.config_handlers.remove(queue.put)
-        session.file_handlers.remove(queue.put)
-        session.exception_handlers.remove(queue.put)
-        session.event_handlers.remove(queue.put)
-        self._cancel_stream(context)
+    def EventBatches(self, request, context):
+        for events in self._event_batches(request, context):
+            yield core_pb2.EventBatch(events=events)
 
     def _handle_node_event(self, event):
         position = core_pb2.Position(x=event.x_position, y=event.y_position)
@@ -427,75 +775,80 @@ class CoreGrpcServer(core_pb2_grpc.CoreApiServicer):
         )
 
     def Throughputs(self, request, context):
-        delay = 3
-        last_check = None
-        last_stats = None
-        while self._is_running(context):
-            now = time.time()
-            stats = get_net_stats()
-
-            # calculate average
-            if last_check is not None:
-                interval = now - last_check
-                throughputs_event = core_pb2.ThroughputsEvent()
-                for key in stats:
-                    current_rxtx = stats[key]
-                    previous_rxtx = last_stats.get(key)
-                    if not previous_rxtx:
-                        continue
-                    rx_kbps = (current_rxtx["rx"] - previous_rxtx["rx"]) * 8.0 / interval
-                    tx_kbps = (current_rxtx["tx"] - previous_rxtx["tx"]) * 8.0 / interval
-                    throughput = rx_kbps + tx_kbps
-                    if key.startswith("veth"):
-                        key = key.split(".")
-                        node_id = int(_INTERFACE_REGEX.search(key[0]).group())
-                        interface_id = int(key[1])
-                        interface_throughput = throughputs_event.interface_throughputs.add()
-                        interface_throughput.node_id = node_id
-                        interface_throughput.interface_id = interface_id
-                        interface_throughput.throughput = throughput
-                    elif key.startswith("b."):
-                        try:
-                            node_id = int(key.split(".")[1])
-                            bridge_throughput = throughputs_event.bridge_throughputs.add()
-                            bridge_throughput.node_id = node_id
-                            bridge_throughput.throughput = throughput
-                        except ValueError:
-                            pass
-
-                yield throughputs_event
-
-            last_check = now
-            last_stats = stats
-            time.sleep(delay)
+        session_id = request.session_id or None
+        if session_id is not None:
+            self.get_session(session_id, context)
+        queue = broadcast_queue(self.coreemu.config, "grpc throughputs %s" % context.peer())
+        self.throughput_sampler.subscribe(queue, session_id)
+
+        try:
+            while self._is_running(context):
+                try:
+                    data = queue.get(timeout=1)
+                except Empty:
+                    continue
+                except EOFError:
+                    logging.warning("grpc throughputs queue closed: %s", queue.stats())
+                    break
+
+                yield self._convert_throughputs(data)
+        finally:
+            self.throughput_sampler.unsubscribe(queue)
+            queue.close()
+
+    def _convert_throughputs(self, data):
+        throughputs_event = core_pb2.ThroughputsEvent(session_id=data.session_id)
+        for node_id, throughput in data.bridges:
+            bridge_throughput = throughputs_event.bridge_throughputs.add()
+            bridge_throughput.node_id = node_id
+            bridge_throughput.throughput = throughput
+        for node_id, interface_id, throughput in data.interfaces:
+            interface_throughput = throughputs_event.interface_throughputs.add()
+            interface_throughput.node_id = node_id
+            interface_throughput.interface_id = interface_id
+            interface_throughput.throughput = throughput
+        return throughputs_event
 
     def AddNode(self, request, context):
         logging.debug("add node: %s", request)
         session = self.get_session(request.session_id, context)
+        node = add_node(session, request.node)
+        return core_pb2.AddNodeResponse(node_id=node.id)
 
-        node_proto = request.node
-        node_id = node_proto.id
-        node_type = node_proto.type
-        if node_type is None:
-            node_type = NodeTypes.DEFAULT.value
-        node_type = NodeTypes(node_type)
+    def _add_nodes(self, session, nodes):
+        # nodes start when added after definition, so add nodes with ids in parallel, while
+        # nodes without ids are added in order to use the session node id generator
+        results = {}
+        parallel = []
+        for index, node_proto in enumerate(nodes):
+            if node_proto.id and session.state > EventTypes.DEFINITION_STATE.value:
+                parallel.append(index)
+            else:
+                results[index] = add_node_result(session, node_proto)
 
-        node_options = NodeOptions(name=node_proto.name, model=node_proto.model)
-        node_options.icon = node_proto.icon
-        node_options.opaque = node_proto.opaque
-        node_options.services = node_proto.services
+        if parallel:
+            pool = ThreadPool(min(len(parallel), _BATCH_THREADS))
+            try:
+                parallel_results = pool.map(lambda index: add_node_result(session, nodes[index]), parallel)
+            finally:
+                pool.close()
+            results.update(zip(parallel, parallel_results))
 
-        position = node_proto.position
-        node_options.set_position(position.x, position.y)
-        node_options.set_location(position.lat, position.lon, position.alt)
-        node = session.add_node(_type=node_type, _id=node_id, node_options=node_options)
+        return [results[index] for index in range(len(nodes))]
 
-        # configure emane if provided
-        emane_model = node_proto.emane
-        if emane_model:
-            session.emane.set_model_config(node_id, emane_model)
+    def AddNodes(self, request, context):
+        logging.debug("add nodes: %s", len(request.nodes))
+        session = self.get_session(request.session_id, context)
+        results = self._add_nodes(session, request.nodes)
+        return core_pb2.AddNodesResponse(results=results)
 
-        return core_pb2.AddNodeResponse(node_id=node.id)
+    def StreamAddNodes(self, request_iterator, context):
+        results = []
+        for request in request_iterator:
+            logging.debug("stream add nodes: %s", len(request.nodes))
+            session = self.get_session(request.session_id, context)
+            results.extend(self._add_nodes(session, request.nodes))
+        return core_pb2.AddNodesResponse(results=results)
 
     def GetNode(self, request, context):
         logging.debug("get node: %s", request)
@@ -541,12 +894,39 @@ class CoreGrpcServer(core_pb2_grpc.CoreApiServicer):
         result = session.update_node(node_id, node_options)
         return core_pb2.EditNodeResponse(result=result)
 
+    def MovePositions(self, request_iterator, context):
+        batches = 0
+        moved = 0
+        for request in request_iterator:
+            session = self.get_session(request.session_id, context)
+            positions = []
+            for node_position in request.positions:
+                position = node_position.position
+                if node_position.geo:
+                    x, y, z = session.location.getxyz(position.lat, position.lon, position.alt)
+                else:
+                    x, y, z = position.x, position.y, position.z
+                positions.append((node_position.node_id, x, y, z))
+
+            missing = sorted(set(x[0] for x in positions if x[0] not in session.nodes))
+            if missing:
+                context.abort(grpc.StatusCode.NOT_FOUND, "nodes {} not found".format(missing))
+            moved += len(session.move_nodes(positions))
+            batches += 1
+        return core_pb2.MovePositionsResponse(batches=batches, moved=moved)
+
     def DeleteNode(self, request, context):
         logging.debug("delete node: %s", request)
         session = self.get_session(request.session_id, context)
         result = session.delete_node(request.node_id)
         return core_pb2.DeleteNodeResponse(result=result)
 
+    def DeleteNodes(self, request, context):
+        logging.debug("delete nodes: %s", request)
+        session = self.get_session(request.session_id, context)
+        results = [batch_result(session, delete_node, node_id) for node_id in request.node_ids]
+        return core_pb2.DeleteNodesResponse(results=results)
+
     def NodeCommand(self, request, context):
         logging.debug("sending node command: %s", request)
         session = self.get_session(request.session_id, context)
@@ -554,6 +934,29 @@ class CoreGrpcServer(core_pb2_grpc.CoreApiServicer):
         _, output = node.cmd_output(request.command)
         return core_pb2.NodeCommandResponse(output=output)
 
+    def NodeCommands(self, request, context):
+        logging.debug("sending node commands: %s", request)
+        session = self.get_session(request.session_id, context)
+        if not request.command:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, "command is required")
+        node_ids = set(request.node_ids)
+        missing = sorted(x for x in node_ids if x not in session.nodes)
+        if missing:
+            context.abort(grpc.StatusCode.NOT_FOUND, "nodes {} not found".format(missing))
+        nodes = select_nodes(session, node_ids, set(request.node_types), set(request.services))
+        if not nodes:
+            return
+
+        def run(node):
+            return node_command_result(node, request.command, request.timeout, request.max_output)
+
+        pool = ThreadPool(min(_BATCH_THREADS, len(nodes)))
+        try:
+            for result in pool.imap_unordered(run, nodes):
+                yield result
+        finally:
+            pool.terminate()
+
     def GetNodeTerminal(self, request, context):
         logging.debug("getting node terminal: %s", request)
         session = self.get_session(request.session_id, context)
@@ -575,74 +978,29 @@ class CoreGrpcServer(core_pb2_grpc.CoreApiServicer):
         # validate node exist
         self.get_node(session, request.link.node_one_id, context)
         self.get_node(session, request.link.node_two_id, context)
-        node_one_id = request.link.node_one_id
-        node_two_id = request.link.node_two_id
 
-        interface_one = None
-        interface_one_data = request.link.interface_one
-        if interface_one_data:
-            name = interface_one_data.name
-            if name == "":
-                name = None
-            mac = interface_one_data.mac
-            if mac == "":
-                mac = None
-            else:
-                mac = MacAddress.from_string(mac)
-            interface_one = InterfaceData(
-                _id=interface_one_data.id,
-                name=name,
-                mac=mac,
-                ip4=interface_one_data.ip4,
-                ip4_mask=interface_one_data.ip4mask,
-                ip6=interface_one_data.ip6,
-                ip6_mask=interface_one_data.ip6mask,
-            )
-
-        interface_two = None
-        interface_two_data = request.link.interface_two
-        if interface_two_data:
-            name = interface_two_data.name
-            if name == "":
-                name = None
-            mac = interface_two_data.mac
-            if mac == "":
-                mac = None
-            else:
-                mac = MacAddress.from_string(mac)
-            interface_two = InterfaceData(
-                _id=interface_two_data.id,
-                name=name,
-                mac=mac,
-                ip4=interface_two_data.ip4,
-                ip4_mask=interface_two_data.ip4mask,
-                ip6=interface_two_data.ip6,
-                ip6_mask=interface_two_data.ip6mask,
-            )
-
-        link_type = None
-        link_type_value = request.link.type
-        if link_type_value is not None:
-            link_type = LinkTypes(link_type_value)
-
-        options_data = request.link.options
-        link_options = LinkOptions(_type=link_type)
-        if options_data:
-            link_options.delay = options_data.delay
-            link_options.bandwidth = options_data.bandwidth
-            link_options.per = options_data.per
-            link_options.dup = options_data.dup
-            link_options.jitter = options_data.jitter
-            link_options.mer = options_data.mer
-            link_options.burst = options_data.burst
-            link_options.mburst = options_data.mburst
-            link_options.unidirectional = options_data.unidirectional
-            link_options.key = options_data.key
-            link_options.opaque = options_data.opaque
-
-        session.add_link(node_one_id, node_two_id, interface_one, interface_two, link_options=link_options)
+        add_link(session, request.link)
         return core_pb2.AddLinkResponse(result=True)
 
+    def _add_links(self, session, links):
+        # links change interfaces of shared nodes and networks, so are added in order, with
+        # the host commands of each link batched
+        return [batch_result(session, add_link, link_proto) for link_proto in links]
+
+    def AddLinks(self, request, context):
+        logging.debug("add links: %s", len(request.links))
+        session = self.get_session(request.session_id, context)
+        results = self._add_links(session, request.links)
+        return core_pb2.AddLinksResponse(results=results)
+
+    def StreamAddLinks(self, request_iterator, context):
+        results = []
+        for request in request_iterator:
+            logging.debug("stream add links: %s", len(request.links))
+            session = self.get_session(request.session_id, context)
+            results.extend(self._add_links(session, request.links))
+        return core_pb2.AddLinksResponse(results=results)
+
     def EditLink(self, request, context):
         logging.debug("edit link: %s", request)
         session = self.get_session(request.session_id, context)
@@ -650,22 +1008,16 @@ class CoreGrpcServer(core_pb2_grpc.CoreApiServicer):
         node_two_id = request.node_two_id
         interface_one_id = request.interface_one_id
         interface_two_id = request.interface_two_id
-        options_data = request.options
-        link_options = LinkOptions()
-        link_options.delay = options_data.delay
-        link_options.bandwidth = options_data.bandwidth
-        link_options.per = options_data.per
-        link_options.dup = options_data.dup
-        link_options.jitter = options_data.jitter
-        link_options.mer = options_data.mer
-        link_options.burst = options_data.burst
-        link_options.mburst = options_data.mburst
-        link_options.unidirectional = options_data.unidirectional
-        link_options.key = options_data.key
-        link_options.opaque = options_data.opaque
+        link_options = convert_link_options(request.options)
         session.update_link(node_one_id, node_two_id, interface_one_id, interface_two_id, link_options)
         return core_pb2.EditLinkResponse(result=True)
 
+    def EditLinks(self, request, context):
+        logging.debug("edit links: %s", len(request.links))
+        session = self.get_session(request.session_id, context)
+        results = [batch_result(session, edit_link, link_proto) for link_proto in request.links]
+        return core_pb2.EditLinksResponse(results=results)
+
     def DeleteLink(self, request, context):
         logging.debug("delete link: %s", request)
         session = self.get_session(request.session_id, context)
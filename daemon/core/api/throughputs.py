@@ -0,0 +1,205 @@
+"""
+Shared sampling of interface counters, providing session throughputs to API clients.
+"""
+
+import collections
+import logging
+import threading
+import time
+from builtins import int
+
+from core import CoreCommandError
+from core.nodes.base import CoreNetworkBase, CoreNodeBase
+from core.nodes.netclient import NetlinkNetClient
+
+# throughputs of a session, with bridges as (node id, throughput) and interfaces as
+# (node id, interface id, throughput)
+ThroughputData = collections.namedtuple("ThroughputData", ["session_id", "bridges", "interfaces"])
+
+
+def read_proc_stats():
+    """
+    Retrieve the byte counters of all devices from /proc/net/dev.
+
+    :return: received and transmitted bytes by device name
+    :rtype: dict[str, tuple[int, int]]
+    """
+    with open("/proc/net/dev", "r") as f:
+        data = f.readlines()[2:]
+
+    stats = {}
+    for line in data:
+        name, _sep, counters = line.partition(":")
+        counters = counters.split()
+        if not counters:
+            continue
+        stats[name.strip()] = (int(counters[0]), int(counters[8]))
+    return stats
+
+
+def session_devices(session):
+    """
+    Retrieve the host devices of a session, from its nodes.
+
+    :param core.emulator.session.Session session: session to get devices for
+    :return: bridge node ids by bridge name, and node and interface ids by interface name
+    :rtype: tuple[dict, dict]
+    """
+    bridges = {}
+    interfaces = {}
+    for node in list(session.nodes.values()):
+        if not isinstance(node.id, int):
+            continue
+        if isinstance(node, CoreNetworkBase):
+            brname = getattr(node, "brname", None)
+            if brname:
+                bridges[brname] = node.id
+        elif isinstance(node, CoreNodeBase):
+            for interface_id, interface in list(node._netif.items()):
+                localname = getattr(interface, "localname", None)
+                if localname:
+                    interfaces[localname] = (node.id, interface_id)
+    return bridges, interfaces
+
+
+class ThroughputSampler(object):
+    """
+    Samples the counters of all host devices at an interval, with a single netlink dump
+    when available, and provides the throughputs of each session to its subscribers. The
+    sampler runs while there are subscribers.
+    """
+
+    def __init__(self, sessions, interval=3.0):
+        """
+        Create a ThroughputSampler instance.
+
+        :param dict sessions: sessions by id
+        :param float interval: time between samples
+        """
+        self.sessions = sessions
+        self.interval = interval
+        self.lock = threading.Lock()
+        # session id subscribed to by each subscriber queue, None for all sessions
+        self.subscribers = {}
+        self.thread = None
+
+    def subscribe(self, queue, session_id=None):
+        """
+        Subscribe to session throughputs, starting the sampler if needed.
+
+        :param core.api.broadcast.BroadcastQueue queue: queue receiving throughput data
+        :param int session_id: session to receive throughputs for, None for all sessions
+        :return: nothing
+        """
+        with self.lock:
+            self.subscribers[queue] = session_id
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="ThroughputSampler")
+                self.thread.daemon = True
+                self.thread.start()
+
+    def unsubscribe(self, queue):
+        """
+        Remove a subscriber, the sampler stops after its last subscriber is removed.
+
+        :param core.api.broadcast.BroadcastQueue queue: queue to remove
+        :return: nothing
+        """
+        with self.lock:
+            self.subscribers.pop(queue, None)
+
+    def read_stats(self, client):
+        """
+        Retrieve the byte counters of all host devices.
+
+        :param core.nodes.netclient.NetlinkNetClient client: netlink client, None to read
+            /proc/net/dev
+        :return: received and transmitted bytes by device name
+        :rtype: dict[str, tuple[int, int]]
+        """
+        if client is not None:
+            try:
+                return client.get_link_stats()
+            except CoreCommandError:
+                logging.exception("error reading link stats, reading /proc/net/dev")
+        return read_proc_stats()
+
+    def run(self):
+        """
+        Sample counters and publish session throughputs until there are no subscribers.
+
+        :return: nothing
+        """
+        try:
+            client = NetlinkNetClient()
+        except CoreCommandError:
+            logging.exception("error creating netlink client, reading /proc/net/dev")
+            client = None
+
+        last_stats = None
+        last_time = None
+        while True:
+            with self.lock:
+                if not self.subscribers:
+                    self.thread = None
+                    break
+                session_ids = set(self.subscribers.values())
+
+            now = time.time()
+            stats = self.read_stats(client)
+            if last_stats is not None:
+                if None in session_ids:
+                    session_ids = set(self.sessions)
+                for session_id in session_ids:
+                    session = self.sessions.get(session_id)
+                    if session is None:
+                        continue
+                    data = self.session_throughputs(session, stats, last_stats, now - last_time)
+                    self.publish(data)
+
+            last_stats = stats
+            last_time = now
+            time.sleep(self.interval)
+
+        if client is not None:
+            client.close()
+
+    def session_throughputs(self, session, stats, last_stats, interval):
+        """
+        Calculate the throughputs of the devices of a session between samples.
+
+        :param core.emulator.session.Session session: session to calculate throughputs for
+        :param dict stats: current device counters
+        :param dict last_stats: previous device counters
+        :param float interval: time between samples
+        :return: session throughputs
+        :rtype: ThroughputData
+        """
+        bridges, interfaces = session_devices(session)
+        bridge_throughputs = []
+        interface_throughputs = []
+        for name in stats:
+            current = stats[name]
+            previous = last_stats.get(name)
+            if previous is None:
+                continue
+            throughput = ((current[0] - previous[0]) + (current[1] - previous[1])) * 8.0 / interval
+            if name in interfaces:
+                node_id, interface_id = interfaces[name]
+                interface_throughputs.append((node_id, interface_id, throughput))
+            elif name in bridges:
+                bridge_throughputs.append((bridges[name], throughput))
+        return ThroughputData(session.id, bridge_throughputs, interface_throughputs)
+
+    def publish(self, data):
+        """
+        Queue session throughputs to the subscribers of the session, replacing any
+        throughputs of the session still pending.
+
+        :param ThroughputData data: session throughputs
+        :return: nothing
+        """
+        with self.lock:
+            queues = [x for x in self.subscribers if self.subscribers[x] in (None, data.session_id)]
+        for queue in queues:
+            queue.put(data, data.session_id)
@@ -0,0 +1,354 @@
+"""
+Defines an asyncio core server for handling TCP connections and UDP requests, using a
+single event loop for all connections and a bounded executor for emulation work.
+
+Requires Python 3.
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from queue import Empty
+
+from core.api.broadcast import broadcast_queue
+from core.api.tlv import coreapi
+from core.api.tlv.corehandlers import CoreHandler
+from core.api.tlv.corehandlers import CoreUdpHandler
+from core.api.tlv.dispatcher import CoreMessageDispatcher
+from core.emulator.coreemu import CoreEmu
+
+
+class AsyncMessageDispatcher(CoreMessageDispatcher):
+    """
+    Dispatches messages using the same ordering as CoreMessageDispatcher, with each message
+    handled by a task on the event loop that waits for the messages it follows and then runs
+    the handler on a shared executor, rather than by worker threads for each connection.
+    """
+
+    event_class = asyncio.Event
+
+    def __init__(self, handler, loop, executor):
+        """
+        Create an AsyncMessageDispatcher instance.
+
+        :param handler: function to handle a message
+        :param asyncio.AbstractEventLoop loop: event loop to run tasks on
+        :param concurrent.futures.Executor executor: executor to run the handler on
+        """
+        super(AsyncMessageDispatcher, self).__init__(handler, 0, 0)
+        self.loop = loop
+        self.executor = executor
+
+    def dispatch(self, message):
+        """
+        Queue a message to be handled after the earlier messages it must follow, safe to call
+        from any thread, as completion events belong to the event loop.
+
+        :param core.api.tlv.coreapi.CoreMessage message: message to dispatch
+        :return: nothing
+        """
+        self.loop.call_soon_threadsafe(super(AsyncMessageDispatcher, self).dispatch, message)
+
+    def schedule(self, item, shard):
+        """
+        Create the task handling an item, within the event loop.
+
+        :param core.api.tlv.dispatcher.DispatchItem item: item to handle
+        :param int shard: unused, tasks are not sharded
+        :return: nothing
+        """
+        self.loop.create_task(self._handle(item))
+
+    async def _handle(self, item):
+        """
+        Task handling an item once the messages it follows are done.
+
+        :param core.api.tlv.dispatcher.DispatchItem item: item to handle
+        :return: nothing
+        """
+        for dependency in item.dependencies:
+            await dependency.wait()
+
+        start = self.started(item)
+        try:
+            await self.loop.run_in_executor(self.executor, self.handler, item.message)
+        except Exception:
+            logging.exception("error handling message: %s", item.message.type_str())
+        finally:
+            item.done.set()
+        self.finished(item, start)
+
+
+class AsyncCoreHandler(CoreHandler):
+    """
+    Handles a TCP connection using asyncio streams, reusing the CoreHandler message handlers.
+    """
+
+    def __init__(self, server, reader, writer):
+        """
+        Create an AsyncCoreHandler instance.
+
+        :param AsyncCoreServer server: core server instance
+        :param asyncio.StreamReader reader: stream to read messages from
+        :param asyncio.StreamWriter writer: stream to write data to
+        """
+        self.done = False
+        self.message_handlers = self.create_message_handlers()
+        self.node_status_request = {}
+        self._shutdown_lock = threading.Lock()
+        self._sessions_lock = threading.Lock()
+        self.master = False
+        self.session = None
+        self.server = server
+        self.coreemu = server.coreemu
+        self.loop = server.loop
+        self.reader = reader
+        self.writer = writer
+        self.client_address = writer.get_extra_info("peername")
+        self.dispatcher = AsyncMessageDispatcher(self.handle_queued_message, server.loop, server.executor)
+        self.broadcast_queue = broadcast_queue(server.config, str(self.client_address), self.disconnect)
+        self.write_ready = asyncio.Event()
+
+    def sendall(self, data, key=None):
+        """
+        Queue raw data to send to the other end of this TCP connection, safe to call from any thread.
+
+        :param data: data to send
+        :param key: key identifying data that later data may replace, such as a node position
+        :return: True if the data was queued, False otherwise
+        :rtype: bool
+        """
+        queued = self.broadcast_queue.put(data, key)
+        if queued:
+            self.loop.call_soon_threadsafe(self.write_ready.set)
+        return queued
+
+    def disconnect(self):
+        """
+        Disconnect the client, ending the read loop for this connection, safe to call from any thread.
+
+        :return: nothing
+        """
+        self.loop.call_soon_threadsafe(self.writer.close)
+
+    async def write_loop(self):
+        """
+        Write queued data to the connection, combining all pending data into a single write.
+
+        :return: nothing
+        """
+        while True:
+            await self.write_ready.wait()
+            self.write_ready.clear()
+            try:
+                data = self.broadcast_queue.get_all(timeout=0)
+            except Empty:
+                continue
+            except EOFError:
+                break
+
+            try:
+                self.writer.write(b"".join(data))
+                await self.writer.drain()
+            except IOError:
+                logging.exception("error sending data to client: %s", self.client_address)
+                self.broadcast_queue.close()
+                break
+
+    async def read_message(self):
+        """
+        Read the next message from the connection.
+
+        :return: received message
+        :rtype: core.api.tlv.coreapi.CoreMessage
+        :raises EOFError: when the client disconnected
+        """
+        try:
+            header = await self.reader.readexactly(coreapi.CoreMessage.header_len)
+        except asyncio.IncompleteReadError as e:
+            if not e.partial:
+                raise EOFError("client disconnected")
+            raise IOError("invalid message header size")
+
+        message_type, message_flags, message_len = coreapi.CoreMessage.unpack_header(header)
+        try:
+            data = await self.reader.readexactly(message_len)
+        except asyncio.IncompleteReadError as e:
+            raise IOError("received message length does not match received data (%s != %s)" % (
+                len(e.partial), message_len))
+        return self.create_message(message_type, message_flags, header, data)
+
+    async def run(self):
+        """
+        Handle the connection until the client disconnects.
+
+        :return: nothing
+        """
+        logging.debug("new TCP connection: %s", self.client_address)
+        write_task = self.loop.create_task(self.write_loop())
+
+        try:
+            # use port as session id
+            port = self.client_address[1]
+            await self.loop.run_in_executor(self.server.executor, self.open_session, port)
+
+            while True:
+                try:
+                    message = await self.read_message()
+                except (EOFError, ConnectionResetError):
+                    logging.info("client disconnected")
+                    break
+                except IOError:
+                    logging.exception("error receiving message")
+                    break
+
+                message.queuedtimes = 0
+                self.queue_message(message)
+
+            # give some time for message queue to deplete
+            timeout = 10
+            wait = 0
+            while self.dispatcher.qsize():
+                logging.debug("waiting for message queue to empty: %s seconds", wait)
+                await asyncio.sleep(1)
+                wait += 1
+                if wait == timeout:
+                    logging.warning("queue failed to be empty, finishing request handler")
+                    break
+        finally:
+            # always clean up the connection, whatever ended the receive loop
+            self.done = True
+            self.dispatcher.stop()
+            logging.info("broadcast queue stats: %s", self.broadcast_queue.stats())
+            self.broadcast_queue.close()
+            self.write_ready.set()
+            try:
+                await write_task
+            finally:
+                self.writer.close()
+                logging.info("connection closed: %s", self.client_address)
+                await self.loop.run_in_executor(self.server.executor, self.close_session)
+
+
+class UdpSender(object):
+    """
+    Socket-like object for CoreUdpHandler replies, sending using a datagram transport.
+    """
+
+    def __init__(self, loop, transport):
+        """
+        Create a UdpSender instance.
+
+        :param asyncio.AbstractEventLoop loop: event loop of the transport
+        :param asyncio.DatagramTransport transport: transport to send with
+        """
+        self.loop = loop
+        self.transport = transport
+
+    def sendto(self, data, address):
+        """
+        Send data to an address, safe to call from any thread.
+
+        :param bytes data: data to send
+        :param address: address to send to
+        :return: nothing
+        """
+        self.loop.call_soon_threadsafe(self.transport.sendto, data, address)
+
+
+class AsyncUdpProtocol(asyncio.DatagramProtocol):
+    """
+    Handles UDP requests using CoreUdpHandler on the server executor.
+    """
+
+    def __init__(self, server):
+        """
+        Create an AsyncUdpProtocol instance.
+
+        :param AsyncCoreServer server: core server instance
+        """
+        self.server = server
+        self.sender = None
+
+    def connection_made(self, transport):
+        self.sender = UdpSender(self.server.loop, transport)
+
+    def datagram_received(self, data, address):
+        self.server.executor.submit(self.handle_request, data, address)
+
+    def handle_request(self, data, address):
+        try:
+            CoreUdpHandler((data, self.sender), address, self.server)
+        except Exception:
+            logging.exception("error handling udp request from %s", address)
+
+
+class AsyncCoreServer(object):
+    """
+    Asyncio server class, manages sessions and handles TCP connections and UDP requests
+    on a single event loop, with emulation work run on a bounded executor.
+    """
+
+    def __init__(self, server_address, config=None):
+        """
+        Create an AsyncCoreServer instance.
+
+        :param tuple[str, int] server_address: server host and port to use
+        :param dict config: configuration setting
+        """
+        if not config:
+            config = {}
+        self.coreemu = CoreEmu(config)
+        self.config = config
+        self.server_address = server_address
+        # CoreUdpHandler finds sessions through the main server
+        self.mainserver = self
+        max_workers = int(config.get("async_workers", 16))
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.loop = asyncio.new_event_loop()
+        self.server = None
+        self.udp_transport = None
+
+    async def handle_connection(self, reader, writer):
+        """
+        Handle a new TCP connection.
+
+        :param asyncio.StreamReader reader: stream to read messages from
+        :param asyncio.StreamWriter writer: stream to write data to
+        :return: nothing
+        """
+        handler = AsyncCoreHandler(self, reader, writer)
+        try:
+            await handler.run()
+        except Exception:
+            logging.exception("error handling connection: %s", handler.client_address)
+
+    def serve_forever(self):
+        """
+        Start listening for TCP connections and UDP requests, and run the event loop.
+
+        :return: nothing
+        """
+        asyncio.set_event_loop(self.loop)
+        host, port = self.server_address
+        self.server = self.loop.run_until_complete(
+            asyncio.start_server(self.handle_connection, host, port, reuse_address=True))
+        self.udp_transport, _ = self.loop.run_until_complete(self.loop.create_datagram_endpoint(
+            lambda: AsyncUdpProtocol(self), local_addr=self.server_address))
+        try:
+            self.loop.run_forever()
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        """
+        Stop listening and shut down the executor.
+
+        :return: nothing
+        """
+        if self.server:
+            self.server.close()
+        if self.udp_transport:
+            self.udp_transport.close()
+        self.executor.shutdown(wait=False)
@@ -49,6 +49,7 @@ class CoreDistributedServer(object):
         self.host = host
         self.port = port
         self.sock = None
+        self.reader = None
         self.instantiation_complete = False
 
     def connect(self):
@@ -69,6 +70,7 @@ class CoreDistributedServer(object):
             raise e
 
         self.sock = sock
+        self.reader = coreapi.CoreMessageReader(sock)
 
     def close(self):
         """
@@ -79,6 +81,7 @@ class CoreDistributedServer(object):
         if self.sock is not None:
             self.sock.close()
             self.sock = None
+            self.reader = None
 
 
 class CoreBroker(object):
@@ -228,19 +231,18 @@ class CoreBroker(object):
         :return: message length
         :rtype: int
         """
-        msghdr = server.sock.recv(coreapi.CoreMessage.header_len)
-        if len(msghdr) == 0:
+        try:
+            msgtype, msgflags, msghdr, msgdata = server.reader.read()
+        except EOFError:
             # server disconnected
             logging.info("server disconnected, closing server")
             server.close()
             return 0
+        except IOError:
+            logging.exception("broker received incomplete message, closing server")
+            server.close()
+            return 0
 
-        if len(msghdr) != coreapi.CoreMessage.header_len:
-            logging.warning("warning: broker received not enough data len=%s", len(msghdr))
-            return len(msghdr)
-
-        msgtype, msgflags, msglen = coreapi.CoreMessage.unpack_header(msghdr)
-        msgdata = server.sock.recv(msglen)
         data = msghdr + msgdata
         count = None
         logging.debug("received message type: %s", MessageTypes(msgtype))
@@ -5,6 +5,7 @@ types and objects used for parsing and building CORE API messages.
 CORE API messaging is leveraged for communication with the GUI.
 """
 
+import logging
 import socket
 import struct
 from past.builtins import basestring
@@ -353,6 +354,8 @@ class CoreTlv(object):
 
     tlv_type_map = Enum
     tlv_data_class_map = {}
+    # compiled encoder, created on first use for each tlv class
+    _encoder = None
 
     def __init__(self, tlv_type, tlv_data):
         """
@@ -363,31 +366,54 @@ class CoreTlv(object):
         :return: unpacked data
         """
         self.tlv_type = tlv_type
-        if tlv_data:
-            try:
-                self.value = self.tlv_data_class_map[self.tlv_type].unpack(tlv_data)
-            except KeyError:
-                self.value = tlv_data
-        else:
-            self.value = None
+        self.value = self.decode(tlv_type, tlv_data)
 
     @classmethod
-    def unpack(cls, data):
+    def decode(cls, tlv_type, tlv_data):
         """
-        Parse data and return unpacked class.
+        Decode the value of TLV data, based on type.
 
-        :param data: data to unpack
-        :return: unpacked data class
+        :param int tlv_type: tlv type
+        :param bytes tlv_data: data to decode
+        :return: decoded value, or None for empty data
         """
-        tlv_type, tlv_len = struct.unpack(cls.header_format, data[:cls.header_len])
+        if not tlv_data:
+            return None
+        try:
+            return cls.tlv_data_class_map[tlv_type].unpack(tlv_data)
+        except KeyError:
+            return tlv_data
+
+    @classmethod
+    def unpack_header(cls, data, offset=0):
+        """
+        Parse the TLV header at an offset into data, without copying the TLV value.
+
+        :param data: data to parse
+        :param int offset: offset of the TLV within data
+        :return: tlv type, start and end offsets of the value, and offset of the next TLV
+        :rtype: tuple
+        """
+        tlv_type, tlv_len = struct.unpack_from(cls.header_format, data, offset)
         header_len = cls.header_len
         if tlv_len == 0:
-            tlv_type, _zero, tlv_len = struct.unpack(cls.long_header_format, data[:cls.long_header_len])
+            tlv_type, _zero, tlv_len = struct.unpack_from(cls.long_header_format, data, offset)
             header_len = cls.long_header_len
         tlv_size = header_len + tlv_len
         # for 32-bit alignment
         tlv_size += -tlv_size % 4
-        return cls(tlv_type, data[header_len:tlv_size]), data[tlv_size:]
+        return tlv_type, offset + header_len, offset + tlv_size, offset + tlv_size
+
+    @classmethod
+    def unpack(cls, data):
+        """
+        Parse data and return unpacked class.
+
+        :param data: data to unpack
+        :return: unpacked data class
+        """
+        tlv_type, start, end, _ = cls.unpack_header(data)
+        return cls(tlv_type, data[start:end]), data[end:]
 
     @classmethod
     def pack(cls, tlv_type, value):
@@ -405,6 +431,20 @@ class CoreTlv(object):
             hdr = struct.pack(cls.long_header_format, tlv_type, 0, tlv_len)
         return hdr + tlv_data
 
+    @classmethod
+    def encoder(cls):
+        """
+        Retrieve the compiled encoder for this TLV class.
+
+        :return: tlv encoder
+        :rtype: CoreTlvEncoder
+        """
+        encoder = cls.__dict__.get("_encoder")
+        if encoder is None:
+            encoder = CoreTlvEncoder(cls)
+            cls._encoder = encoder
+        return encoder
+
     @classmethod
     def pack_string(cls, tlv_type, value):
         """
@@ -438,6 +478,105 @@ class CoreTlv(object):
         return "%s <tlvtype = %s, value = %s>" % (self.__class__.__name__, self.type_str(), self.value)
 
 
+class CoreTlvEncoder(object):
+    """
+    Packs the TLVs of a TLV class into a bytearray, using struct formats for the header and
+    value of each TLV type compiled once, producing the same data as CoreTlv.pack.
+    """
+
+    def __init__(self, tlv_class):
+        """
+        Create a CoreTlvEncoder instance.
+
+        :param class tlv_class: tlv class to encode values for
+        """
+        self.tlv_class = tlv_class
+        self.packers = {}
+        for tlv_type, data_class in tlv_class.tlv_data_class_map.items():
+            if issubclass(data_class, CoreTlvDataString):
+                packer = self.string_packer(tlv_type)
+            elif data_class.pad_len is not None:
+                packer = self.fixed_packer(tlv_type, data_class)
+            else:
+                packer = self.default_packer(tlv_type)
+            self.packers[tlv_type] = packer
+
+    @staticmethod
+    def fixed_packer(tlv_type, data_class):
+        """
+        Create a packer for a fixed size value, packing the header and value using one struct.
+
+        :param int tlv_type: tlv type to pack
+        :param class data_class: tlv data class of the value
+        :return: packer function
+        """
+        fixed = struct.Struct(CoreTlv.header_format + data_class.data_format[1:])
+        tlv_len = fixed.size - CoreTlv.header_len - data_class.pad_len
+        get_value = None
+        if issubclass(data_class, CoreTlvDataObj):
+            get_value = data_class.get_value
+
+        def pack(data, value):
+            if get_value:
+                value = get_value(value)
+            data += fixed.pack(tlv_type, tlv_len, value)
+
+        return pack
+
+    @staticmethod
+    def string_packer(tlv_type):
+        """
+        Create a packer for a string value, using a long header for strings of 256 bytes or more.
+
+        :param int tlv_type: tlv type to pack
+        :return: packer function
+        """
+        header = struct.Struct(CoreTlv.header_format)
+        long_header = struct.Struct(CoreTlv.long_header_format)
+        padding = [b"\0" * x for x in range(4)]
+
+        def pack(data, value):
+            if not isinstance(value, basestring):
+                raise ValueError("value not a string: %s" % type(value))
+            value = value.encode("utf-8")
+            tlv_len = len(value)
+            if tlv_len < 256:
+                data += header.pack(tlv_type, tlv_len)
+                pad_len = -(header.size + tlv_len) % 4
+            else:
+                data += long_header.pack(tlv_type, 0, tlv_len)
+                pad_len = -(long_header.size + tlv_len) % 4
+            data += value
+            data += padding[pad_len]
+
+        return pack
+
+    def default_packer(self, tlv_type):
+        """
+        Create a packer using CoreTlv.pack, for variable size values.
+
+        :param int tlv_type: tlv type to pack
+        :return: packer function
+        """
+        tlv_class = self.tlv_class
+
+        def pack(data, value):
+            data += tlv_class.pack(tlv_type, value)
+
+        return pack
+
+    def pack_into(self, data, tlv_type, value):
+        """
+        Pack a TLV value, appending it to data.
+
+        :param bytearray data: data to append to
+        :param int tlv_type: type of data to pack
+        :param value: data to pack
+        :return: nothing
+        """
+        self.packers[tlv_type](data, value)
+
+
 class CoreNodeTlv(CoreTlv):
     """
     Class for representing CORE Node TLVs.
@@ -660,6 +799,67 @@ class CoreExceptionTlv(CoreTlv):
     }
 
 
+class CoreMessageReader(object):
+    """
+    Reads framed CORE messages from a stream socket, receiving directly into a reusable
+    buffer that grows to fit the largest message seen.
+    """
+
+    def __init__(self, sock, size=4096):
+        """
+        Create a CoreMessageReader instance.
+
+        :param socket.socket sock: socket to read messages from
+        :param int size: initial size of the receive buffer
+        """
+        self.sock = sock
+        self.buffer = bytearray(size)
+
+    def _recv(self, size):
+        """
+        Receive exactly size bytes into the start of the buffer.
+
+        :param int size: number of bytes to receive
+        :return: number of bytes received, less than size only when the socket closed
+        :rtype: int
+        """
+        if size > len(self.buffer):
+            self.buffer = bytearray(max(size, len(self.buffer) * 2))
+        view = memoryview(self.buffer)
+        count = 0
+        while count < size:
+            received = self.sock.recv_into(view[count:size], size - count)
+            if not received:
+                break
+            count += received
+        return count
+
+    def read(self):
+        """
+        Read the next message from the socket.
+
+        :return: message type, message flags, header data and message data
+        :rtype: tuple
+        :raises EOFError: when the socket closed before a message was started
+        :raises IOError: when the socket closed within a message
+        """
+        header_len = CoreMessage.header_len
+        count = self._recv(header_len)
+        if count == 0:
+            raise EOFError("client disconnected")
+        elif count != header_len:
+            raise IOError("invalid message header size")
+        header = memoryview(self.buffer)[:header_len].tobytes()
+
+        message_type, message_flags, message_len = CoreMessage.unpack_header(header)
+        count = self._recv(message_len)
+        if count != message_len:
+            raise IOError("received message length does not match received data (%s != %s)" % (count, message_len))
+        # messages are queued to be handled by other threads, so each gets its own copy
+        data = memoryview(self.buffer)[:message_len].tobytes()
+        return message_type, message_flags, header, data
+
+
 class CoreMessage(object):
     """
     Base class for representing CORE messages.
@@ -674,9 +874,35 @@ class CoreMessage(object):
     def __init__(self, flags, hdr, data):
         self.raw_message = hdr + data
         self.flags = flags
-        self.tlv_data = {}
+        # decoded tlv values, and undecoded tlv values as views into the message data
+        self._tlv_values = {}
+        self._tlv_views = {}
         self.parse_data(data)
 
+    @property
+    def tlv_data(self):
+        """
+        TLV data map, with all values decoded.
+
+        :return: tlv values by tlv type
+        :rtype: dict
+        """
+        for tlv_type in list(self._tlv_views):
+            self._decode_tlv(tlv_type)
+        return self._tlv_values
+
+    def _decode_tlv(self, tlv_type):
+        """
+        Decode an undecoded TLV value into the data map.
+
+        :param int tlv_type: type of data to decode
+        :return: decoded value
+        """
+        view = self._tlv_views.pop(tlv_type)
+        value = self.tlv_class.decode(tlv_type, view.tobytes())
+        self._tlv_values[tlv_type] = value
+        return value
+
     @classmethod
     def unpack_header(cls, data):
         """
@@ -716,10 +942,10 @@ class CoreMessage(object):
         :param value: data to associate with key
         :return: nothing
         """
-        if key in self.tlv_data:
+        if key in self._tlv_values or key in self._tlv_views:
             raise KeyError("key already exists: %s (val=%s)" % (key, value))
 
-        self.tlv_data[key] = value
+        self._tlv_values[key] = value
 
     def get_tlv(self, tlv_type):
         """
@@ -728,18 +954,25 @@ class CoreMessage(object):
         :param int tlv_type: type of data to retrieve
         :return: TLV type data
         """
-        return self.tlv_data.get(tlv_type)
+        if tlv_type in self._tlv_views:
+            return self._decode_tlv(tlv_type)
+        return self._tlv_values.get(tlv_type)
 
     def parse_data(self, data):
         """
-        Parse data while possible and adding TLV data to the data map.
+        Index the TLVs within data, keeping views of their values to be decoded when
+        retrieved.
 
         :param data: data to parse for TLV data
         :return: nothing
         """
-        while data:
-            tlv, data = self.tlv_class.unpack(data)
-            self.add_tlv_data(tlv.tlv_type, tlv.value)
+        view = memoryview(data)
+        offset = 0
+        while offset < len(data):
+            tlv_type, start, end, offset = self.tlv_class.unpack_header(data, offset)
+            if tlv_type in self._tlv_values or tlv_type in self._tlv_views:
+                raise KeyError("key already exists: %s" % tlv_type)
+            self._tlv_views[tlv_type] = view[start:end]
 
     def pack_tlv_data(self):
         """
@@ -955,6 +1188,93 @@ class CoreExceptionMessage(CoreMessage):
     tlv_class = CoreExceptionTlv
 
 
+class CoreBatchMessage(CoreMessage):
+    """
+    CORE batch message class, carrying complete messages to be handled as one unit, rather
+    than TLVs.
+    """
+    message_type = MessageTypes.BATCH.value
+    # maximum length of the messages within a batch, limited by the message header
+    max_len = 0xFFFF
+
+    def parse_data(self, data):
+        """
+        Parse the messages within data, skipping invalid messages, which are counted as invalid.
+
+        :param bytes data: data to parse messages from
+        :return: nothing
+        """
+        self.messages = []
+        self.invalid = 0
+        offset = 0
+        while offset < len(data):
+            start = offset + self.header_len
+            header = data[offset:start]
+            if len(header) != self.header_len:
+                logging.error("invalid message header size within batch")
+                self.invalid += 1
+                break
+            message_type, message_flags, message_len = self.unpack_header(header)
+            end = start + message_len
+            if end > len(data):
+                logging.error("message length exceeds batch data (%s > %s)", end, len(data))
+                self.invalid += 1
+                break
+            offset = end
+            message_class = CLASS_MAP.get(message_type)
+            if message_class is None or message_class is CoreBatchMessage:
+                logging.error("invalid message type within batch: %s", message_type)
+                self.invalid += 1
+                continue
+            try:
+                self.messages.append(message_class(message_flags, header, data[start:end]))
+            except (ValueError, struct.error):
+                logging.exception("invalid message within batch: %s", message_class.__name__)
+                self.invalid += 1
+
+    @classmethod
+    def pack_batches(cls, message_flags, messages, max_len=None):
+        """
+        Pack messages into as few batch messages as possible.
+
+        :param int message_flags: message flags for each batch
+        :param list[bytes] messages: packed messages to batch
+        :param int max_len: maximum length of the messages within a batch, defaults to the
+            largest supported
+        :return: packed batch messages
+        :rtype: list[bytes]
+        """
+        if max_len is None:
+            max_len = cls.max_len
+        batches = []
+        batch = []
+        batch_len = 0
+        for message in messages:
+            if len(message) > max_len:
+                raise ValueError("message too large for a batch: %s" % len(message))
+            if batch_len + len(message) > max_len:
+                batches.append(cls.pack(message_flags, b"".join(batch)))
+                batch = []
+                batch_len = 0
+            batch.append(message)
+            batch_len += len(message)
+        if batch:
+            batches.append(cls.pack(message_flags, b"".join(batch)))
+        return batches
+
+    def __str__(self):
+        """
+        Retrieve string representation of the message.
+
+        :return: string representation
+        :rtype: str
+        """
+        result = "%s <msgtype = %s, flags = %s>" % (self.__class__.__name__, self.type_str(), self.flag_str())
+        for message in self.messages:
+            result += "\n  %s" % str(message).replace("\n", "\n  ")
+        return result
+
+
 # map used to translate enumerated message type values to message class objects
 CLASS_MAP = {
     MessageTypes.NODE.value: CoreNodeMessage,
@@ -967,6 +1287,7 @@ CLASS_MAP = {
     MessageTypes.EVENT.value: CoreEventMessage,
     MessageTypes.SESSION.value: CoreSessionMessage,
     MessageTypes.EXCEPTION.value: CoreExceptionMessage,
+    MessageTypes.BATCH.value: CoreBatchMessage,
 }
 
 
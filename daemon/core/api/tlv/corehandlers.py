@@ -6,17 +6,21 @@ import logging
 import os
 import shlex
 import shutil
+import socket
+import struct
 import sys
 import threading
 import time
 from itertools import repeat
 
 import socketserver
-from builtins import range
-from queue import Queue, Empty
+from queue import Empty
 
+from core import CoreCommandError
 from core import utils
+from core.api.broadcast import broadcast_queue
 from core.api.tlv import coreapi, dataconversion, structutils
+from core.api.tlv.dispatcher import CoreMessageDispatcher
 from core.config import ConfigShim
 from core.emulator.data import ConfigData, ExceptionData
 from core.emulator.data import EventData
@@ -29,6 +33,7 @@ from core.emulator.enumerations import ConfigFlags
 from core.emulator.enumerations import ConfigTlvs
 from core.emulator.enumerations import EventTlvs
 from core.emulator.enumerations import EventTypes
+from core.emulator.enumerations import ExceptionLevels
 from core.emulator.enumerations import ExceptionTlvs
 from core.emulator.enumerations import ExecuteTlvs
 from core.emulator.enumerations import FileTlvs
@@ -50,6 +55,10 @@ class CoreHandler(socketserver.BaseRequestHandler):
     The CoreHandler class uses the RequestHandler class for servicing requests.
     """
 
+    # node and link message types, which may be sent within batch messages and are forwarded
+    # to other clients of the session
+    batch_types = (MessageTypes.NODE.value, MessageTypes.LINK.value)
+
     def __init__(self, request, client_address, server):
         """
         Create a CoreRequestHandler instance.
@@ -59,32 +68,24 @@ class CoreHandler(socketserver.BaseRequestHandler):
         :param CoreServer server: core server instance
         """
         self.done = False
-        self.message_handlers = {
-            MessageTypes.NODE.value: self.handle_node_message,
-            MessageTypes.LINK.value: self.handle_link_message,
-            MessageTypes.EXECUTE.value: self.handle_execute_message,
-            MessageTypes.REGISTER.value: self.handle_register_message,
-            MessageTypes.CONFIG.value: self.handle_config_message,
-            MessageTypes.FILE.value: self.handle_file_message,
-            MessageTypes.INTERFACE.value: self.handle_interface_message,
-            MessageTypes.EVENT.value: self.handle_event_message,
-            MessageTypes.SESSION.value: self.handle_session_message,
-        }
-        self.message_queue = Queue()
+        self.message_handlers = self.create_message_handlers()
+        self.message_reader = coreapi.CoreMessageReader(request)
         self.node_status_request = {}
         self._shutdown_lock = threading.Lock()
         self._sessions_lock = threading.Lock()
 
-        self.handler_threads = []
         num_threads = int(server.config["numthreads"])
         if num_threads < 1:
             raise ValueError("invalid number of threads: %s" % num_threads)
 
         logging.debug("launching core server handler threads: %s", num_threads)
-        for _ in range(num_threads):
-            thread = threading.Thread(target=self.handler_thread)
-            self.handler_threads.append(thread)
-            thread.start()
+        self.dispatcher = CoreMessageDispatcher(self.handle_queued_message, num_threads)
+
+        # outbound data is queued and written by its own thread, so slow clients do not block broadcasts
+        self.broadcast_queue = broadcast_queue(server.config, str(client_address), self.disconnect)
+        self.writer_thread = threading.Thread(target=self.writer, args=(request,))
+        self.writer_thread.daemon = True
+        self.writer_thread.start()
 
         self.master = False
         self.session = None
@@ -95,6 +96,26 @@ class CoreHandler(socketserver.BaseRequestHandler):
         utils.close_onexec(request.fileno())
         socketserver.BaseRequestHandler.__init__(self, request, client_address, server)
 
+    def create_message_handlers(self):
+        """
+        Create the handlers for each message type.
+
+        :return: message handlers by message type
+        :rtype: dict
+        """
+        return {
+            MessageTypes.NODE.value: self.handle_node_message,
+            MessageTypes.LINK.value: self.handle_link_message,
+            MessageTypes.EXECUTE.value: self.handle_execute_message,
+            MessageTypes.REGISTER.value: self.handle_register_message,
+            MessageTypes.CONFIG.value: self.handle_config_message,
+            MessageTypes.FILE.value: self.handle_file_message,
+            MessageTypes.INTERFACE.value: self.handle_interface_message,
+            MessageTypes.EVENT.value: self.handle_event_message,
+            MessageTypes.SESSION.value: self.handle_session_message,
+            MessageTypes.BATCH.value: self.handle_batch_message,
+        }
+
     def setup(self):
         """
         Client has connected, set up a new connection.
@@ -111,12 +132,12 @@ class CoreHandler(socketserver.BaseRequestHandler):
         :return: nothing
         """
         logging.debug("finishing request handler")
-        logging.debug("remaining message queue size: %s", self.message_queue.qsize())
+        logging.debug("remaining message queue size: %s", self.dispatcher.qsize())
 
         # give some time for message queue to deplete
         timeout = 10
         wait = 0
-        while not self.message_queue.empty():
+        while self.dispatcher.qsize():
             logging.debug("waiting for message queue to empty: %s seconds", wait)
             time.sleep(1)
             wait += 1
@@ -126,13 +147,48 @@ class CoreHandler(socketserver.BaseRequestHandler):
 
         logging.info("client disconnected: notifying threads")
         self.done = True
-        for thread in self.handler_threads:
-            logging.info("waiting for thread: %s", thread.getName())
-            thread.join(timeout)
-            if thread.isAlive():
-                logging.warning("joining %s failed: still alive after %s sec", thread.getName(), timeout)
+        self.dispatcher.stop(timeout)
+        logging.info("broadcast queue stats: %s", self.broadcast_queue.stats())
+        self.broadcast_queue.close()
+        self.writer_thread.join(timeout)
 
         logging.info("connection closed: %s", self.client_address)
+        self.close_session()
+
+        return socketserver.BaseRequestHandler.finish(self)
+
+    def open_session(self, port):
+        """
+        Create a session for a newly connected client, and register this client
+        for broadcasts from it.
+
+        :param int port: client port, used as the session id
+        :return: nothing
+        """
+        # TODO: add shutdown handler for session
+        self.session = self.coreemu.create_session(port, master=False)
+        logging.debug("created new session for client: %s", self.session.id)
+
+        # TODO: hack to associate this handler with this sessions broker for broadcasting
+        # TODO: broker needs to be pulled out of session to the server/handler level
+        if self.master:
+            logging.debug("session set to master")
+            self.session.master = True
+        self.session.broker.session_clients.append(self)
+
+        # add handlers for various data
+        self.add_session_handlers()
+
+        # set initial session state
+        self.session.set_state(EventTypes.DEFINITION_STATE)
+
+    def close_session(self):
+        """
+        Remove this client from its session, shutting the session down when there
+        are no clients left and it is not running.
+
+        :return: nothing
+        """
         if self.session:
             # remove client from session broker and shutdown if there are no clients
             self.remove_session_handlers()
@@ -141,8 +197,6 @@ class CoreHandler(socketserver.BaseRequestHandler):
                 logging.info("no session clients left and not active, initiating shutdown")
                 self.coreemu.delete_session(self.session.id)
 
-        return socketserver.BaseRequestHandler.finish(self)
-
     def session_message(self, flags=0):
         """
         Build CORE API Sessions message based on current session info.
@@ -309,10 +363,36 @@ class CoreHandler(socketserver.BaseRequestHandler):
         message = dataconversion.convert_node(node_data)
 
         try:
-            self.sendall(message)
+            self.sendall(message, self.node_data_key(node_data))
         except IOError:
             logging.exception("error sending node message")
 
+    @staticmethod
+    def node_data_key(node_data):
+        """
+        Key for node data that later node data may replace when queued, only used for node
+        position updates.
+
+        :param core.emulator.data.NodeData node_data: node data to get key for
+        :return: key for position updates, None otherwise
+        """
+        if node_data.message_type == 0:
+            return "node", node_data.id
+        return None
+
+    def handle_broadcast_nodes(self, node_datas):
+        """
+        Callback to handle a batch of node broadcasts out from a session, queued together to be
+        sent using a single write.
+
+        :param list[core.emulator.data.NodeData] node_datas: node data to handle
+        :return: nothing
+        """
+        logging.debug("handling broadcast nodes: %s", len(node_datas))
+        for node_data in node_datas:
+            message = dataconversion.convert_node(node_data)
+            self.sendall(message, self.node_data_key(node_data))
+
     def handle_broadcast_link(self, link_data):
         """
         Callback to handle an link broadcast out from a session.
@@ -321,49 +401,7 @@ class CoreHandler(socketserver.BaseRequestHandler):
         :return: nothing
         """
         logging.debug("handling broadcast link: %s", link_data)
-        per = ""
-        if link_data.per is not None:
-            per = str(link_data.per)
-        dup = ""
-        if link_data.dup is not None:
-            dup = str(link_data.dup)
-
-        tlv_data = structutils.pack_values(coreapi.CoreLinkTlv, [
-            (LinkTlvs.N1_NUMBER, link_data.node1_id),
-            (LinkTlvs.N2_NUMBER, link_data.node2_id),
-            (LinkTlvs.DELAY, link_data.delay),
-            (LinkTlvs.BANDWIDTH, link_data.bandwidth),
-            (LinkTlvs.PER, per),
-            (LinkTlvs.DUP, dup),
-            (LinkTlvs.JITTER, link_data.jitter),
-            (LinkTlvs.MER, link_data.mer),
-            (LinkTlvs.BURST, link_data.burst),
-            (LinkTlvs.SESSION, link_data.session),
-            (LinkTlvs.MBURST, link_data.mburst),
-            (LinkTlvs.TYPE, link_data.link_type),
-            (LinkTlvs.GUI_ATTRIBUTES, link_data.gui_attributes),
-            (LinkTlvs.UNIDIRECTIONAL, link_data.unidirectional),
-            (LinkTlvs.EMULATION_ID, link_data.emulation_id),
-            (LinkTlvs.NETWORK_ID, link_data.network_id),
-            (LinkTlvs.KEY, link_data.key),
-            (LinkTlvs.INTERFACE1_NUMBER, link_data.interface1_id),
-            (LinkTlvs.INTERFACE1_NAME, link_data.interface1_name),
-            (LinkTlvs.INTERFACE1_IP4, link_data.interface1_ip4),
-            (LinkTlvs.INTERFACE1_IP4_MASK, link_data.interface1_ip4_mask),
-            (LinkTlvs.INTERFACE1_MAC, link_data.interface1_mac),
-            (LinkTlvs.INTERFACE1_IP6, link_data.interface1_ip6),
-            (LinkTlvs.INTERFACE1_IP6_MASK, link_data.interface1_ip6_mask),
-            (LinkTlvs.INTERFACE2_NUMBER, link_data.interface2_id),
-            (LinkTlvs.INTERFACE2_NAME, link_data.interface2_name),
-            (LinkTlvs.INTERFACE2_IP4, link_data.interface2_ip4),
-            (LinkTlvs.INTERFACE2_IP4_MASK, link_data.interface2_ip4_mask),
-            (LinkTlvs.INTERFACE2_MAC, link_data.interface2_mac),
-            (LinkTlvs.INTERFACE2_IP6, link_data.interface2_ip6),
-            (LinkTlvs.INTERFACE2_IP6_MASK, link_data.interface2_ip6_mask),
-            (LinkTlvs.OPAQUE, link_data.opaque)
-        ])
-
-        message = coreapi.CoreLinkMessage.pack(link_data.message_type, tlv_data)
+        message = dataconversion.convert_link(link_data)
 
         try:
             self.sendall(message)
@@ -397,15 +435,51 @@ class CoreHandler(socketserver.BaseRequestHandler):
 
         return coreapi.CoreRegMessage.pack(MessageFlags.ADD.value, tlv_data)
 
-    def sendall(self, data):
+    def sendall(self, data, key=None):
         """
-        Send raw data to the other end of this TCP connection
-        using socket"s sendall().
+        Queue raw data to send to the other end of this TCP connection,
+        without blocking on the socket.
 
         :param data: data to send over request socket
-        :return: data sent
+        :param key: key identifying data that later data may replace, such as a node position
+        :return: True if the data was queued, False otherwise
+        :rtype: bool
+        """
+        return self.broadcast_queue.put(data, key)
+
+    def writer(self, request):
+        """
+        Thread target that writes queued data to the TCP connection, combining all pending
+        data into a single write.
+
+        :param request: request socket to write to
+        :return: nothing
+        """
+        while True:
+            try:
+                data = self.broadcast_queue.get_all(timeout=1)
+            except Empty:
+                continue
+            except EOFError:
+                break
+
+            try:
+                request.sendall(b"".join(data))
+            except IOError:
+                logging.exception("error sending data to client: %s", self.client_address)
+                self.broadcast_queue.close()
+                break
+
+    def disconnect(self):
         """
-        return self.request.sendall(data)
+        Disconnect the client, ending the receive loop for this connection.
+
+        :return: nothing
+        """
+        try:
+            self.request.shutdown(socket.SHUT_RDWR)
+        except IOError:
+            logging.exception("error disconnecting client: %s", self.client_address)
 
     def receive_message(self):
         """
@@ -414,30 +488,25 @@ class CoreHandler(socketserver.BaseRequestHandler):
         :return: received message
         :rtype: core.api.tlv.coreapi.CoreMessage
         """
-        try:
-            header = self.request.recv(coreapi.CoreMessage.header_len)
-        except IOError as e:
-            raise IOError("error receiving header (%s)" % e)
+        message_type, message_flags, header, data = self.message_reader.read()
+        return self.create_message(message_type, message_flags, header, data)
 
-        if len(header) != coreapi.CoreMessage.header_len:
-            if len(header) == 0:
-                raise EOFError("client disconnected")
-            else:
-                raise IOError("invalid message header size")
+    @staticmethod
+    def create_message(message_type, message_flags, header, data):
+        """
+        Create a CORE API message object from received data.
 
-        message_type, message_flags, message_len = coreapi.CoreMessage.unpack_header(header)
-        if message_len == 0:
+        :param int message_type: message type
+        :param int message_flags: message flags
+        :param bytes header: message header data
+        :param bytes data: message data
+        :return: received message
+        :rtype: core.api.tlv.coreapi.CoreMessage
+        :raises IOError: when the message data is invalid
+        """
+        if not data:
             logging.warning("received message with no data")
 
-        data = b""
-        while len(data) < message_len:
-            data += self.request.recv(message_len - len(data))
-            if len(data) > message_len:
-                error_message = "received message length does not match received data (%s != %s)" % (
-                    len(data), message_len)
-                logging.error(error_message)
-                raise IOError(error_message)
-
         try:
             message_class = coreapi.CLASS_MAP[message_type]
             message = message_class(message_flags, header, data)
@@ -445,6 +514,8 @@ class CoreHandler(socketserver.BaseRequestHandler):
             message = coreapi.CoreMessage(message_flags, header, data)
             message.message_type = message_type
             logging.exception("unimplemented core message type: %s", message.type_str())
+        except (ValueError, struct.error):
+            raise IOError("invalid core message data for message type: %s" % message_type)
 
         return message
 
@@ -457,22 +528,35 @@ class CoreHandler(socketserver.BaseRequestHandler):
         """
         logging.debug("queueing msg (queuedtimes = %s): type %s", message.queuedtimes, MessageTypes(
             message.message_type))
-        self.message_queue.put(message)
+        self.dispatcher.dispatch(message)
 
-    def handler_thread(self):
+    def handle_queued_message(self, message):
         """
-        CORE API message handling loop that is spawned for each server
-        thread; get CORE API messages from the incoming message queue,
-        and call handlemsg() for processing.
+        Handle a message dispatched to a handler thread, then broadcast node and link
+        messages to other clients connected to the session.
 
+        :param message: message to handle
         :return: nothing
         """
-        while not self.done:
-            try:
-                message = self.message_queue.get(timeout=1)
-                self.handle_message(message)
-            except Empty:
-                pass
+        self.handle_message(message)
+
+        # broadcast node/link messages to other connected clients, and those within batches
+        if message.message_type == MessageTypes.BATCH.value:
+            raw_message = b"".join(x.raw_message for x in message.messages if x.message_type in self.batch_types)
+        elif message.message_type in self.batch_types:
+            raw_message = message.raw_message
+        else:
+            return
+
+        if not raw_message:
+            return
+
+        for client in self.session.broker.session_clients:
+            if client == self:
+                continue
+
+            logging.debug("BROADCAST TO OTHER CLIENT: %s", client)
+            client.sendall(raw_message)
 
     def handle_message(self, message):
         """
@@ -540,23 +624,7 @@ class CoreHandler(socketserver.BaseRequestHandler):
         """
         # use port as session id
         port = self.request.getpeername()[1]
-
-        # TODO: add shutdown handler for session
-        self.session = self.coreemu.create_session(port, master=False)
-        logging.debug("created new session for client: %s", self.session.id)
-
-        # TODO: hack to associate this handler with this sessions broker for broadcasting
-        # TODO: broker needs to be pulled out of session to the server/handler level
-        if self.master:
-            logging.debug("session set to master")
-            self.session.master = True
-        self.session.broker.session_clients.append(self)
-
-        # add handlers for various data
-        self.add_session_handlers()
-
-        # set initial session state
-        self.session.set_state(EventTypes.DEFINITION_STATE)
+        self.open_session(port)
 
         while True:
             try:
@@ -571,21 +639,6 @@ class CoreHandler(socketserver.BaseRequestHandler):
             message.queuedtimes = 0
             self.queue_message(message)
 
-            # delay is required for brief connections, allow session joining
-            if message.message_type == MessageTypes.SESSION.value:
-                time.sleep(0.125)
-
-            # broadcast node/link messages to other connected clients
-            if message.message_type not in [MessageTypes.NODE.value, MessageTypes.LINK.value]:
-                continue
-
-            for client in self.session.broker.session_clients:
-                if client == self:
-                    continue
-
-                logging.debug("BROADCAST TO OTHER CLIENT: %s", client)
-                client.sendall(message.raw_message)
-
     def send_exception(self, level, source, text, node=None):
         """
         Sends an exception for display within the GUI.
@@ -610,7 +663,7 @@ class CoreHandler(socketserver.BaseRequestHandler):
         logging.debug("adding session broadcast handlers")
         self.session.event_handlers.append(self.handle_broadcast_event)
         self.session.exception_handlers.append(self.handle_broadcast_exception)
-        self.session.node_handlers.append(self.handle_broadcast_node)
+        self.session.node_batch_handlers.append(self.handle_broadcast_nodes)
         self.session.link_handlers.append(self.handle_broadcast_link)
         self.session.file_handlers.append(self.handle_broadcast_file)
         self.session.config_handlers.append(self.handle_broadcast_config)
@@ -619,7 +672,7 @@ class CoreHandler(socketserver.BaseRequestHandler):
         logging.debug("removing session broadcast handlers")
         self.session.event_handlers.remove(self.handle_broadcast_event)
         self.session.exception_handlers.remove(self.handle_broadcast_exception)
-        self.session.node_handlers.remove(self.handle_broadcast_node)
+        self.session.node_batch_handlers.remove(self.handle_broadcast_nodes)
         self.session.link_handlers.remove(self.handle_broadcast_link)
         self.session.file_handlers.remove(self.handle_broadcast_file)
         self.session.config_handlers.remove(self.handle_broadcast_config)
@@ -756,6 +809,60 @@ class CoreHandler(socketserver.BaseRequestHandler):
 
         return ()
 
+    def handle_batch_message(self, message):
+        """
+        Batch Message handler, handling node and link messages as one unit, with host network
+        commands batched across all of them, and replying with a single batch of their replies.
+
+        :param core.api.tlv.coreapi.CoreBatchMessage message: batch message to handle
+        :return: batch message reply
+        """
+        replies = []
+        failed = message.invalid
+        handled = 0
+        total = len(message.messages) + message.invalid
+        try:
+            with self.session.net_batch():
+                for batch_message in message.messages:
+                    if batch_message.message_type not in self.batch_types:
+                        logging.error("invalid message within batch: %s", batch_message.type_str())
+                        failed += 1
+                        continue
+
+                    if self.session.broker.handle_message(batch_message):
+                        logging.debug("batch message not being handled locally")
+                        continue
+
+                    try:
+                        message_handler = self.message_handlers[batch_message.message_type]
+                        replies.extend(message_handler(batch_message))
+                        handled += 1
+                    except Exception:
+                        logging.exception("exception while handling batch message: %s", batch_message)
+                        failed += 1
+        except CoreCommandError:
+            # the batched host commands of the handled messages failed
+            logging.exception("error running batched host commands")
+            failed += handled
+
+        logging.info("handled batch of %s messages, %s failed", total, failed)
+        if failed:
+            tlv_data = structutils.pack_values(coreapi.CoreExceptionTlv, [
+                (ExceptionTlvs.SESSION, str(self.session.id)),
+                (ExceptionTlvs.LEVEL, ExceptionLevels.ERROR.value),
+                (ExceptionTlvs.SOURCE, "batch"),
+                (ExceptionTlvs.DATE, time.ctime()),
+                (ExceptionTlvs.TEXT, "%s of %s batch messages failed" % (failed, total))
+            ])
+            replies.append(coreapi.CoreExceptionMessage.pack(0, tlv_data))
+
+        if not replies:
+            # a client waiting on a string flagged batch always gets a reply
+            if message.flags & MessageFlags.STRING.value:
+                return [coreapi.CoreBatchMessage.pack(MessageFlags.LOCAL.value, b"")]
+            return ()
+        return coreapi.CoreBatchMessage.pack_batches(MessageFlags.LOCAL.value, replies)
+
     def handle_execute_message(self, message):
         """
         Execute Message handler
@@ -1447,9 +1554,6 @@ class CoreHandler(socketserver.BaseRequestHandler):
             # clear all session objects in order to receive new definitions
             self.session.clear()
         elif event_type == EventTypes.INSTANTIATION_STATE:
-            if len(self.handler_threads) > 1:
-                # TODO: sync handler threads here before continuing
-                time.sleep(2.0)  # XXX
             # done receiving node/link configuration, ready to instantiate
             self.session.instantiate()
 
@@ -1683,12 +1787,22 @@ class CoreHandler(socketserver.BaseRequestHandler):
 
             del self.node_status_request[node_id]
 
-    def send_objects(self):
+    def broadcast_objects(self):
         """
-        Return API messages that describe the current session.
+        Broadcast all nodes and links to session handlers other than api clients, which are
+        sent the packed session snapshot when they request it.
+
+        :return: nothing
         """
-        # find all nodes and links
+        node_handlers = list(self.session.node_handlers)
+        node_batch_handlers = [x for x in self.session.node_batch_handlers
+                               if not isinstance(getattr(x, "__self__", None), CoreHandler)]
+        link_handlers = [x for x in self.session.link_handlers
+                         if not isinstance(getattr(x, "__self__", None), CoreHandler)]
+        if not any([node_handlers, node_batch_handlers, link_handlers]):
+            return
 
+        # find all nodes and links
         nodes_data = []
         links_data = []
         with self.session._nodes_lock:
@@ -1697,17 +1811,27 @@ class CoreHandler(socketserver.BaseRequestHandler):
                 node_data = node.data(message_type=MessageFlags.ADD.value)
                 if node_data:
                     nodes_data.append(node_data)
-
-                node_links = node.all_link_data(flags=MessageFlags.ADD.value)
-                for link_data in node_links:
-                    links_data.append(link_data)
+                links_data.extend(node.all_link_data(flags=MessageFlags.ADD.value))
 
         # send all nodes first, so that they will exist for any links
-        for node_data in nodes_data:
-            self.session.broadcast_node(node_data)
+        for handler in node_handlers:
+            for node_data in nodes_data:
+                handler(node_data)
+        for handler in node_batch_handlers:
+            handler(nodes_data)
+        for handler in link_handlers:
+            for link_data in links_data:
+                handler(link_data)
 
-        for link_data in links_data:
-            self.session.broadcast_link(link_data)
+    def send_objects(self):
+        """
+        Return API messages that describe the current session.
+        """
+        # send all nodes and links, packed messages are cached for nodes that have not changed
+        data = self.session.snapshot.pack()
+        if data:
+            self.sendall(data)
+        self.broadcast_objects()
 
         # send mobility model info
         for node_id in self.session.mobility.nodes():
@@ -1790,22 +1914,12 @@ class CoreHandler(socketserver.BaseRequestHandler):
             )
             self.session.broadcast_config(config_data)
 
-        logging.info("informed GUI about %d nodes and %d links", len(nodes_data), len(links_data))
+        logging.info("informed GUI about %d nodes and their links", len(self.session.snapshot.entries))
 
 
 class CoreUdpHandler(CoreHandler):
     def __init__(self, request, client_address, server):
-        self.message_handlers = {
-            MessageTypes.NODE.value: self.handle_node_message,
-            MessageTypes.LINK.value: self.handle_link_message,
-            MessageTypes.EXECUTE.value: self.handle_execute_message,
-            MessageTypes.REGISTER.value: self.handle_register_message,
-            MessageTypes.CONFIG.value: self.handle_config_message,
-            MessageTypes.FILE.value: self.handle_file_message,
-            MessageTypes.INTERFACE.value: self.handle_interface_message,
-            MessageTypes.EVENT.value: self.handle_event_message,
-            MessageTypes.SESSION.value: self.handle_session_message,
-        }
+        self.message_handlers = self.create_message_handlers()
         self.master = False
         self.session = None
         socketserver.BaseRequestHandler.__init__(self, request, client_address, server)
@@ -1850,7 +1964,7 @@ class CoreUdpHandler(CoreHandler):
             for session_id in sessions:
                 session = self.server.mainserver.coreemu.sessions.get(session_id)
                 if session:
-                    logging.debug("session handling message: %s", session.session_id)
+                    logging.debug("session handling message: %s", session.id)
                     self.session = session
                     self.handle_message(message)
                     self.broadcast(message)
@@ -1896,11 +2010,12 @@ class CoreUdpHandler(CoreHandler):
         """
         raise Exception("Unable to queue %s message for later processing using UDP!" % msg)
 
-    def sendall(self, data):
+    def sendall(self, data, key=None):
         """
         Use sendto() on the connectionless UDP socket.
 
         :param data:
+        :param key: unused, UDP handlers send data immediately
         :return:
         """
         self.request[1].sendto(data, self.client_address)
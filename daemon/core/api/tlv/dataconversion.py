@@ -4,9 +4,71 @@ Converts CORE data objects into legacy API messages.
 
 from core.api.tlv import coreapi, structutils
 from core.emulator.enumerations import ConfigTlvs
+from core.emulator.enumerations import LinkTlvs
 from core.emulator.enumerations import NodeTlvs
 
 
+# node data attributes packed into node message tlvs
+NODE_FIELDS = (
+    (NodeTlvs.NUMBER.value, "id", None),
+    (NodeTlvs.TYPE.value, "node_type", None),
+    (NodeTlvs.NAME.value, "name", None),
+    (NodeTlvs.IP_ADDRESS.value, "ip_address", None),
+    (NodeTlvs.MAC_ADDRESS.value, "mac_address", None),
+    (NodeTlvs.IP6_ADDRESS.value, "ip6_address", None),
+    (NodeTlvs.MODEL.value, "model", None),
+    (NodeTlvs.EMULATION_ID.value, "emulation_id", None),
+    (NodeTlvs.EMULATION_SERVER.value, "emulation_server", None),
+    (NodeTlvs.SESSION.value, "session", None),
+    (NodeTlvs.X_POSITION.value, "x_position", None),
+    (NodeTlvs.Y_POSITION.value, "y_position", None),
+    (NodeTlvs.CANVAS.value, "canvas", None),
+    (NodeTlvs.NETWORK_ID.value, "network_id", None),
+    (NodeTlvs.SERVICES.value, "services", None),
+    (NodeTlvs.LATITUDE.value, "latitude", None),
+    (NodeTlvs.LONGITUDE.value, "longitude", None),
+    (NodeTlvs.ALTITUDE.value, "altitude", None),
+    (NodeTlvs.ICON.value, "icon", None),
+    (NodeTlvs.OPAQUE.value, "opaque", None),
+)
+
+# link data attributes packed into link message tlvs
+LINK_FIELDS = (
+    (LinkTlvs.N1_NUMBER.value, "node1_id", None),
+    (LinkTlvs.N2_NUMBER.value, "node2_id", None),
+    (LinkTlvs.DELAY.value, "delay", None),
+    (LinkTlvs.BANDWIDTH.value, "bandwidth", None),
+    (LinkTlvs.PER.value, "per", str),
+    (LinkTlvs.DUP.value, "dup", str),
+    (LinkTlvs.JITTER.value, "jitter", None),
+    (LinkTlvs.MER.value, "mer", None),
+    (LinkTlvs.BURST.value, "burst", None),
+    (LinkTlvs.SESSION.value, "session", None),
+    (LinkTlvs.MBURST.value, "mburst", None),
+    (LinkTlvs.TYPE.value, "link_type", None),
+    (LinkTlvs.GUI_ATTRIBUTES.value, "gui_attributes", None),
+    (LinkTlvs.UNIDIRECTIONAL.value, "unidirectional", None),
+    (LinkTlvs.EMULATION_ID.value, "emulation_id", None),
+    (LinkTlvs.NETWORK_ID.value, "network_id", None),
+    (LinkTlvs.KEY.value, "key", None),
+    (LinkTlvs.INTERFACE1_NUMBER.value, "interface1_id", None),
+    (LinkTlvs.INTERFACE1_NAME.value, "interface1_name", None),
+    (LinkTlvs.INTERFACE1_IP4.value, "interface1_ip4", None),
+    (LinkTlvs.INTERFACE1_IP4_MASK.value, "interface1_ip4_mask", None),
+    (LinkTlvs.INTERFACE1_MAC.value, "interface1_mac", None),
+    (LinkTlvs.INTERFACE1_IP6.value, "interface1_ip6", None),
+    (LinkTlvs.INTERFACE1_IP6_MASK.value, "interface1_ip6_mask", None),
+    (LinkTlvs.INTERFACE2_NUMBER.value, "interface2_id", None),
+    (LinkTlvs.INTERFACE2_NAME.value, "interface2_name", None),
+    (LinkTlvs.INTERFACE2_IP4.value, "interface2_ip4", None),
+    (LinkTlvs.INTERFACE2_IP4_MASK.value, "interface2_ip4_mask", None),
+    (LinkTlvs.INTERFACE2_MAC.value, "interface2_mac", None),
+    (LinkTlvs.INTERFACE2_IP6.value, "interface2_ip6", None),
+    (LinkTlvs.INTERFACE2_IP6_MASK.value, "interface2_ip6_mask", None),
+    (LinkTlvs.OPAQUE.value, "opaque", None),
+)
+
+
 def convert_node(node_data):
     """
     Convenience method for converting NodeData to a packed TLV message.
@@ -14,31 +76,21 @@ def convert_node(node_data):
     :param core.emulator.data.NodeData node_data: node data to convert
     :return: packed node message
     """
-    tlv_data = structutils.pack_values(coreapi.CoreNodeTlv, [
-        (NodeTlvs.NUMBER, node_data.id),
-        (NodeTlvs.TYPE, node_data.node_type),
-        (NodeTlvs.NAME, node_data.name),
-        (NodeTlvs.IP_ADDRESS, node_data.ip_address),
-        (NodeTlvs.MAC_ADDRESS, node_data.mac_address),
-        (NodeTlvs.IP6_ADDRESS, node_data.ip6_address),
-        (NodeTlvs.MODEL, node_data.model),
-        (NodeTlvs.EMULATION_ID, node_data.emulation_id),
-        (NodeTlvs.EMULATION_SERVER, node_data.emulation_server),
-        (NodeTlvs.SESSION, node_data.session),
-        (NodeTlvs.X_POSITION, node_data.x_position),
-        (NodeTlvs.Y_POSITION, node_data.y_position),
-        (NodeTlvs.CANVAS, node_data.canvas),
-        (NodeTlvs.NETWORK_ID, node_data.network_id),
-        (NodeTlvs.SERVICES, node_data.services),
-        (NodeTlvs.LATITUDE, node_data.latitude),
-        (NodeTlvs.LONGITUDE, node_data.longitude),
-        (NodeTlvs.ALTITUDE, node_data.altitude),
-        (NodeTlvs.ICON, node_data.icon),
-        (NodeTlvs.OPAQUE, node_data.opaque)
-    ])
+    tlv_data = structutils.pack_fields(coreapi.CoreNodeTlv, node_data, NODE_FIELDS)
     return coreapi.CoreNodeMessage.pack(node_data.message_type, tlv_data)
 
 
+def convert_link(link_data):
+    """
+    Convenience method for converting LinkData to a packed TLV message.
+
+    :param core.emulator.data.LinkData link_data: link data to convert
+    :return: packed link message
+    """
+    tlv_data = structutils.pack_fields(coreapi.CoreLinkTlv, link_data, LINK_FIELDS)
+    return coreapi.CoreLinkMessage.pack(link_data.message_type, tlv_data)
+
+
 def convert_config(config_data):
     """
     Convenience method for converting ConfigData to a packed TLV message.
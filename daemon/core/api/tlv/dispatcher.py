@@ -0,0 +1,288 @@
+"""
+Ordered dispatch of CORE API messages to worker threads.
+"""
+
+import logging
+import threading
+import time
+from queue import Queue, Empty
+
+from core.emulator.enumerations import MessageTypes
+
+
+class MessageMetrics(object):
+    """
+    Queue depth and latency for a message type.
+    """
+
+    def __init__(self):
+        """
+        Create a MessageMetrics instance.
+        """
+        self.queued = 0
+        self.started = 0
+        self.handled = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.handle_total = 0.0
+        self.handle_max = 0.0
+
+    def data(self):
+        """
+        Retrieve the current metrics.
+
+        :return: queue depth, handled count, and average and max wait and handling time in seconds
+        :rtype: dict
+        """
+        wait_average = 0.0
+        if self.started:
+            wait_average = self.wait_total / self.started
+        handle_average = 0.0
+        if self.handled:
+            handle_average = self.handle_total / self.handled
+        return {
+            "depth": self.queued - self.started,
+            "handled": self.handled,
+            "wait_average": wait_average,
+            "wait_max": self.wait_max,
+            "handle_average": handle_average,
+            "handle_max": self.handle_max,
+        }
+
+
+class DispatchItem(object):
+    """
+    A message queued for dispatch, along with the completion of messages it must follow.
+    """
+
+    def __init__(self, message, dependencies, queue_time, done):
+        """
+        Create a DispatchItem instance.
+
+        :param core.api.tlv.coreapi.CoreMessage message: message to handle
+        :param list dependencies: completion events of earlier messages to wait for
+        :param float queue_time: time the message was queued
+        :param done: event set once the message is handled
+        """
+        self.message = message
+        self.dependencies = dependencies
+        self.queue_time = queue_time
+        self.done = done
+
+
+class CoreMessageDispatcher(object):
+    """
+    Dispatches messages to worker threads sharded by the nodes they affect, so messages for
+    the same node are handled in order while messages for other nodes are handled in parallel.
+
+    Messages without nodes, and session, register, event, and batch messages, act on the whole
+    session and are handled once all earlier messages are done, before any later message. Messages
+    affecting several nodes, such as links, wait for earlier messages of each node. Long running
+    message types are handled by a separate pool, after earlier messages for their nodes, without
+    holding up later messages.
+    """
+
+    # message types acting on the whole session
+    session_message_types = {
+        MessageTypes.SESSION.value,
+        MessageTypes.REGISTER.value,
+        MessageTypes.EVENT.value,
+        MessageTypes.BATCH.value,
+    }
+    # message types handled by the long running pool
+    long_message_types = {
+        MessageTypes.EXECUTE.value,
+    }
+    # completion event for queued messages
+    event_class = threading.Event
+
+    def __init__(self, handler, num_threads, num_long_threads=None):
+        """
+        Create a CoreMessageDispatcher instance and start its worker threads.
+
+        :param handler: function to handle a message
+        :param int num_threads: number of shards, each with a worker thread
+        :param int num_long_threads: number of worker threads for long running messages,
+            defaults to the number of shards
+        """
+        if num_long_threads is None:
+            num_long_threads = num_threads
+        self.handler = handler
+        self.done = False
+        # this lock protects last, barrier, and metrics
+        self.lock = threading.Lock()
+        # completion of the last message queued for each node
+        self.last = {}
+        # completion of the last message queued for the whole session
+        self.barrier = None
+        self.metrics = {}
+
+        self.shards = [Queue() for _ in range(num_threads)]
+        self.long_queue = Queue()
+        self.threads = []
+        queues = self.shards + [self.long_queue] * num_long_threads
+        for index, queue in enumerate(queues):
+            thread = threading.Thread(target=self.worker, args=(queue,), name="CoreHandler-%s" % index)
+            self.threads.append(thread)
+            thread.start()
+
+    def message_keys(self, message):
+        """
+        Retrieve the nodes a message affects.
+
+        :param core.api.tlv.coreapi.CoreMessage message: message to get nodes for
+        :return: node numbers, or None when the message acts on the whole session
+        :rtype: tuple
+        """
+        if message.message_type in self.session_message_types:
+            return None
+        node_numbers = message.node_numbers()
+        if not node_numbers:
+            return None
+        return tuple(node_numbers)
+
+    def dispatch(self, message):
+        """
+        Queue a message to be handled after the earlier messages it must follow.
+
+        :param core.api.tlv.coreapi.CoreMessage message: message to dispatch
+        :return: nothing
+        """
+        keys = self.message_keys(message)
+        with self.lock:
+            metrics = self.metrics.setdefault(message.message_type, MessageMetrics())
+            metrics.queued += 1
+
+            if keys is None:
+                dependencies = list(self.last.values())
+            else:
+                dependencies = [self.last[key] for key in keys if key in self.last]
+            if self.barrier is not None:
+                dependencies.append(self.barrier)
+            dependencies = [x for x in dependencies if not x.is_set()]
+            item = DispatchItem(message, dependencies, time.time(), self.event_class())
+
+            if message.message_type in self.long_message_types:
+                shard = None
+            elif keys is None:
+                self.last = {}
+                self.barrier = item.done
+                shard = 0
+            else:
+                for key in keys:
+                    self.last[key] = item.done
+                shard = min(keys)
+        self.schedule(item, shard)
+
+    def schedule(self, item, shard):
+        """
+        Queue an item to be handled by a worker thread.
+
+        :param DispatchItem item: item to handle
+        :param int shard: shard to handle the item in, None for long running messages
+        :return: nothing
+        """
+        if shard is None:
+            self.long_queue.put(item)
+        else:
+            self.shards[shard % len(self.shards)].put(item)
+
+    def started(self, item):
+        """
+        Record that handling of an item started.
+
+        :param DispatchItem item: item being handled
+        :return: start time
+        :rtype: float
+        """
+        start = time.time()
+        with self.lock:
+            metrics = self.metrics[item.message.message_type]
+            metrics.started += 1
+            wait = start - item.queue_time
+            metrics.wait_total += wait
+            metrics.wait_max = max(metrics.wait_max, wait)
+        return start
+
+    def finished(self, item, start):
+        """
+        Record that handling of an item finished.
+
+        :param DispatchItem item: item handled
+        :param float start: time handling started
+        :return: nothing
+        """
+        elapsed = time.time() - start
+        with self.lock:
+            metrics = self.metrics[item.message.message_type]
+            metrics.handled += 1
+            metrics.handle_total += elapsed
+            metrics.handle_max = max(metrics.handle_max, elapsed)
+
+    def worker(self, queue):
+        """
+        Worker thread target, handling messages from a queue once the messages they follow are done.
+
+        :param Queue queue: queue to handle messages from
+        :return: nothing
+        """
+        while not self.done:
+            try:
+                item = queue.get(timeout=1)
+            except Empty:
+                continue
+
+            for dependency in item.dependencies:
+                while not dependency.wait(1):
+                    if self.done:
+                        return
+
+            start = self.started(item)
+            try:
+                self.handler(item.message)
+            except Exception:
+                logging.exception("error handling message: %s", item.message.type_str())
+            finally:
+                item.done.set()
+            self.finished(item, start)
+
+    def qsize(self):
+        """
+        Retrieve the number of messages queued and not yet started.
+
+        :return: number of queued messages
+        :rtype: int
+        """
+        with self.lock:
+            return sum(x.queued - x.started for x in self.metrics.values())
+
+    def message_metrics(self):
+        """
+        Retrieve queue depth and latency metrics for each message type.
+
+        :return: metrics by message type name
+        :rtype: dict
+        """
+        with self.lock:
+            result = {}
+            for message_type, metrics in self.metrics.items():
+                try:
+                    name = MessageTypes(message_type).name
+                except ValueError:
+                    name = str(message_type)
+                result[name] = metrics.data()
+            return result
+
+    def stop(self, timeout=None):
+        """
+        Stop and join the worker threads.
+
+        :param float timeout: time to wait for each thread
+        :return: nothing
+        """
+        self.done = True
+        for thread in self.threads:
+            logging.info("waiting for thread: %s", thread.getName())
+            thread.join(timeout)
+            if thread.is_alive():
+                logging.warning("joining %s failed: still alive after %s sec", thread.getName(), timeout)
@@ -0,0 +1,79 @@
+"""
+Cache of packed node and link messages describing a session, for sending the session to
+clients as they connect.
+"""
+
+import logging
+import threading
+
+from core.api.tlv import dataconversion
+from core.emulator.enumerations import MessageFlags
+
+
+class SessionSnapshot(object):
+    """
+    Packed node and link messages for each node of a session, rebuilt only for nodes whose data
+    version changed since they were last packed.
+    """
+
+    def __init__(self, session):
+        """
+        Create a SessionSnapshot instance.
+
+        :param core.emulator.session.Session session: session to pack messages for
+        """
+        self.session = session
+        self.lock = threading.Lock()
+        # node id to (version, packed node message, packed link messages)
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def pack_node(self, node):
+        """
+        Pack the add messages for a node and the links it reports.
+
+        :param core.nodes.base.NodeBase node: node to pack messages for
+        :return: packed node message and packed link messages
+        :rtype: tuple[bytes, bytes]
+        """
+        node_message = b""
+        node_data = node.data(message_type=MessageFlags.ADD.value)
+        if node_data:
+            node_message = dataconversion.convert_node(node_data)
+        link_datas = node.all_link_data(flags=MessageFlags.ADD.value)
+        link_messages = b"".join(dataconversion.convert_link(x) for x in link_datas)
+        return node_message, link_messages
+
+    def pack(self):
+        """
+        Retrieve packed add messages for all nodes, followed by all links, so the nodes
+        exist for any links.
+
+        :return: packed node and link messages
+        :rtype: bytes
+        """
+        node_messages = []
+        link_messages = []
+        with self.lock:
+            with self.session._nodes_lock:
+                for node_id in self.session.nodes:
+                    node = self.session.nodes[node_id]
+                    # get the version before packing, so changes while packing repack next time
+                    version = self.session.data_version(node_id)
+                    entry = self.entries.get(node_id)
+                    if entry is None or entry[0] != version:
+                        entry = (version,) + self.pack_node(node)
+                        self.entries[node_id] = entry
+                        self.misses += 1
+                    else:
+                        self.hits += 1
+                    node_messages.append(entry[1])
+                    link_messages.append(entry[2])
+
+                for node_id in set(self.entries) - set(self.session.nodes):
+                    del self.entries[node_id]
+
+            logging.debug("session snapshot nodes(%s) hits(%s) misses(%s)",
+                          len(self.entries), self.hits, self.misses)
+        return b"".join(node_messages) + b"".join(link_messages)
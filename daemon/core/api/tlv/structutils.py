@@ -2,7 +2,6 @@
 Utilities for working with python struct data.
 """
 
-import logging
 from past.builtins import basestring
 
 
@@ -10,14 +9,14 @@ def pack_values(clazz, packers):
     """
     Pack values for a given legacy class.
 
-    :param class clazz: class that will provide a pack method
+    :param class clazz: tlv class that will provide a compiled encoder
     :param list packers: a list of tuples that are used to pack values and transform them
     :return: packed data string of all values
     """
 
-    # iterate through tuples of values to pack
-    logging.debug("packing: %s", packers)
-    data = b""
+    # iterate through tuples of values to pack, into a single buffer
+    encoder = clazz.encoder()
+    data = bytearray()
     for packer in packers:
         # check if a transformer was provided for valid values
         transformer = None
@@ -37,8 +36,33 @@ def pack_values(clazz, packers):
         if transformer:
             value = transformer(value)
 
-        # pack and add to existing data
-        logging.debug("packing: %s - %s type(%s)", tlv_type, value, type(value))
-        data += clazz.pack(tlv_type.value, value)
+        encoder.pack_into(data, tlv_type.value, value)
 
-    return data
+    return bytes(data)
+
+
+def pack_fields(clazz, obj, fields):
+    """
+    Pack attribute values of a data object for a given legacy class, using fields built once
+    for the data type, rather than a list of values for each object.
+
+    :param class clazz: tlv class that will provide a compiled encoder
+    :param obj: data object to pack attribute values of
+    :param tuple fields: tuples of tlv type value, attribute name, and transformer or None
+    :return: packed data string of all values
+    """
+    encoder = clazz.encoder()
+    data = bytearray()
+    for tlv_type, name, transformer in fields:
+        value = getattr(obj, name)
+
+        # only pack actual values and avoid packing empty strings
+        if value is None or (isinstance(value, basestring) and not value):
+            continue
+
+        if transformer:
+            value = transformer(value)
+
+        encoder.pack_into(data, tlv_type, value)
+
+    return bytes(data)
@@ -852,9 +852,10 @@ class EmaneManager(ModelManager):
             return False
 
         # don"t use node.setposition(x,y,z) which generates an event
-        node.position.set(x, y, z)
+        if node.position.set(x, y, z):
+            self.session.data_changed(node.id)
         node_data = node.data(message_type=0, lat=str(lat), lon=str(lon), alt=str(alt))
-        self.session.broadcast_node(node_data)
+        self.session.position_publisher.publish(node_data)
         return True
 
     def emanerunning(self, node):
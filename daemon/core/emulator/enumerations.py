@@ -22,6 +22,7 @@ class MessageTypes(Enum):
     EVENT = 0x08
     SESSION = 0x09
     EXCEPTION = 0x0A
+    BATCH = 0x0B
 
 
 class MessageFlags(Enum):
@@ -0,0 +1,78 @@
+"""
+Coalesces node position updates into rate-limited broadcasts.
+"""
+
+import collections
+import threading
+
+
+class PositionPublisher(object):
+    """
+    Collects node position updates published within a window, and broadcasts only the
+    latest position for each node, as a single batch, at the end of the window. The window
+    is set in milliseconds by the "position_window" session option, with updates broadcast
+    immediately when it is zero or the session event loop is not running.
+    """
+
+    def __init__(self, session):
+        """
+        Create a PositionPublisher instance.
+
+        :param core.emulator.session.Session session: session to broadcast positions for
+        """
+        self.session = session
+        self.lock = threading.Lock()
+        # latest node data for each node id, in order of first update within the window
+        self.pending = collections.OrderedDict()
+        self.event = None
+
+    def window(self):
+        """
+        Retrieve the configured window to coalesce updates within.
+
+        :return: window in seconds
+        :rtype: float
+        """
+        return self.session.options.get_config_int("position_window", default=0) / 1000.0
+
+    def publish(self, node_data):
+        """
+        Publish a node position update, to be broadcast at the end of the current window.
+
+        :param core.emulator.data.NodeData node_data: node data with position to publish
+        :return: nothing
+        """
+        window = self.window()
+        if window <= 0 or not self.session.event_loop.running:
+            self.session.broadcast_node(node_data)
+            return
+
+        with self.lock:
+            self.pending[node_data.id] = node_data
+            if self.event is not None:
+                return
+            self.event = self.session.event_loop.add_event(window, self.flush)
+
+    def discard(self, node_id):
+        """
+        Discard the pending position update of a node, such as when the node is deleted.
+
+        :param int node_id: id of node to discard update for
+        :return: nothing
+        """
+        with self.lock:
+            self.pending.pop(node_id, None)
+
+    def flush(self):
+        """
+        Broadcast all pending node position updates as a single batch.
+
+        :return: nothing
+        """
+        with self.lock:
+            node_datas = list(self.pending.values())
+            self.pending.clear()
+            self.event = None
+
+        if node_datas:
+            self.session.broadcast_nodes(node_datas)
@@ -3,6 +3,7 @@ session.py: defines the Session class used by the core-daemon daemon program
 that manages a CORE session.
 """
 
+import contextlib
 import logging
 import os
 import pwd
@@ -15,10 +16,12 @@ import time
 from multiprocessing.pool import ThreadPool
 
 import core.nodes.base
+from core import CoreCommandError
 from core import constants
 from core import utils
 from core.api.tlv import coreapi
 from core.api.tlv.broker import CoreBroker
+from core.api.tlv.snapshot import SessionSnapshot
 from core.emane.emanemanager import EmaneManager
 from core.emulator.data import EventData, NodeData
 from core.emulator.data import ExceptionData
@@ -30,6 +33,7 @@ from core.emulator.emudata import link_config
 from core.emulator.enumerations import EventTypes, LinkTypes
 from core.emulator.enumerations import ExceptionLevels
 from core.emulator.enumerations import NodeTypes
+from core.emulator.publisher import PositionPublisher
 from core.emulator.sessionconfig import SessionConfig
 from core.emulator.sessionconfig import SessionMetaData
 from core.location.corelocation import CoreLocation
@@ -38,6 +42,7 @@ from core.location.mobility import MobilityManager
 from core.nodes import nodeutils
 from core.nodes.base import CoreNodeBase
 from core.nodes.ipaddress import MacAddress
+from core.nodes.netclient import NetBatch
 from core.plugins.sdt import Sdt
 from core.services.coreservices import CoreServices
 from core.xml import corexml
@@ -76,6 +81,15 @@ class Session(object):
         self.node_id_gen = IdGen()
         self.nodes = {}
         self._nodes_lock = threading.Lock()
+        self._control_net_lock = threading.RLock()
+
+        # versions of node and link data, for caching data sent to clients
+        self._versions_lock = threading.Lock()
+        self._version = 0
+        self._node_versions = {}
+
+        # active host namespace ip/tc batch for each thread
+        self._net_batch = threading.local()
 
         # TODO: should the default state be definition?
         self.state = EventTypes.NONE.value
@@ -91,6 +105,7 @@ class Session(object):
         self.event_handlers = []
         self.exception_handlers = []
         self.node_handlers = []
+        self.node_batch_handlers = []
         self.link_handlers = []
         self.file_handlers = []
         self.config_handlers = []
@@ -112,6 +127,8 @@ class Session(object):
         self.services = CoreServices(session=self)
         self.emane = EmaneManager(session=self)
         self.sdt = Sdt(session=self)
+        self.position_publisher = PositionPublisher(session=self)
+        self.snapshot = SessionSnapshot(session=self)
 
         # initialize default node services
         self.services.default_services = {
@@ -203,6 +220,50 @@ class Session(object):
             else:
                 common_network.unlink(interface_one, interface_two)
 
+    @contextlib.contextmanager
+    def net_batch(self):
+        """
+        Batch host namespace ip and tc operations issued by the current thread, running them
+        as a few batch commands when the outermost block exits. Operations that later steps
+        depend on, such as creating veths and moving them into nodes, still run immediately.
+
+        When the block raises, batched commands still run for the operations that completed,
+        but a failure running them is only logged, so the original exception is raised.
+
+        :return: active batch
+        :rtype: core.nodes.netclient.NetBatch
+        :raises CoreCommandError: when a batched command fails
+        """
+        batch = self.get_net_batch()
+        if batch is not None:
+            yield batch
+            return
+
+        batch = NetBatch()
+        self._net_batch.batch = batch
+        failed = True
+        try:
+            yield batch
+            failed = False
+        finally:
+            self._net_batch.batch = None
+            if not failed:
+                batch.flush()
+            else:
+                try:
+                    batch.flush()
+                except CoreCommandError:
+                    logging.exception("error running batched commands after failure")
+
+    def get_net_batch(self):
+        """
+        Retrieve the host namespace batch active for the current thread.
+
+        :return: active batch, None otherwise
+        :rtype: core.nodes.netclient.NetBatch
+        """
+        return getattr(self._net_batch, "batch", None)
+
     def add_link(self, node_one_id, node_two_id, interface_one=None, interface_two=None, link_options=None):
         """
         Add a link between nodes.
@@ -226,80 +287,81 @@ class Session(object):
             node_two.lock.acquire()
 
         try:
-            # wireless link
-            if link_options.type == LinkTypes.WIRELESS:
-                objects = [node_one, node_two, net_one, net_two]
-                self._link_wireless(objects, connect=True)
-            # wired link
-            else:
-                # 2 nodes being linked, ptp network
-                if all([node_one, node_two]) and not net_one:
-                    logging.info("adding link for peer to peer nodes: %s - %s", node_one.name, node_two.name)
-                    ptp_class = nodeutils.get_node_class(NodeTypes.PEER_TO_PEER)
-                    start = self.state > EventTypes.DEFINITION_STATE.value
-                    net_one = self.create_node(cls=ptp_class, start=start)
-
-                # node to network
-                if node_one and net_one:
-                    logging.info("adding link from node to network: %s - %s", node_one.name, net_one.name)
-                    interface = create_interface(node_one, net_one, interface_one)
-                    link_config(net_one, interface, link_options)
-
-                # network to node
-                if node_two and net_one:
-                    logging.info("adding link from network to node: %s - %s", node_two.name, net_one.name)
-                    interface = create_interface(node_two, net_one, interface_two)
-                    if not link_options.unidirectional:
+            with self.net_batch():
+                # wireless link
+                if link_options.type == LinkTypes.WIRELESS:
+                    objects = [node_one, node_two, net_one, net_two]
+                    self._link_wireless(objects, connect=True)
+                # wired link
+                else:
+                    # 2 nodes being linked, ptp network
+                    if all([node_one, node_two]) and not net_one:
+                        logging.info("adding link for peer to peer nodes: %s - %s", node_one.name, node_two.name)
+                        ptp_class = nodeutils.get_node_class(NodeTypes.PEER_TO_PEER)
+                        start = self.state > EventTypes.DEFINITION_STATE.value
+                        net_one = self.create_node(cls=ptp_class, start=start)
+
+                    # node to network
+                    if node_one and net_one:
+                        logging.info("adding link from node to network: %s - %s", node_one.name, net_one.name)
+                        interface = create_interface(node_one, net_one, interface_one)
                         link_config(net_one, interface, link_options)
 
-                # network to network
-                if net_one and net_two:
-                    logging.info("adding link from network to network: %s - %s", net_one.name, net_two.name)
-                    if nodeutils.is_node(net_two, NodeTypes.RJ45):
-                        interface = net_two.linknet(net_one)
-                    else:
-                        interface = net_one.linknet(net_two)
+                    # network to node
+                    if node_two and net_one:
+                        logging.info("adding link from network to node: %s - %s", node_two.name, net_one.name)
+                        interface = create_interface(node_two, net_one, interface_two)
+                        if not link_options.unidirectional:
+                            link_config(net_one, interface, link_options)
 
-                    link_config(net_one, interface, link_options)
+                    # network to network
+                    if net_one and net_two:
+                        logging.info("adding link from network to network: %s - %s", net_one.name, net_two.name)
+                        if nodeutils.is_node(net_two, NodeTypes.RJ45):
+                            interface = net_two.linknet(net_one)
+                        else:
+                            interface = net_one.linknet(net_two)
 
-                    if not link_options.unidirectional:
-                        interface.swapparams("_params_up")
-                        link_config(net_two, interface, link_options, devname=interface.name)
-                        interface.swapparams("_params_up")
-
-                # a tunnel node was found for the nodes
-                addresses = []
-                if not node_one and all([net_one, interface_one]):
-                    addresses.extend(interface_one.get_addresses())
-
-                if not node_two and all([net_two, interface_two]):
-                    addresses.extend(interface_two.get_addresses())
-
-                # tunnel node logic
-                key = link_options.key
-                if key and nodeutils.is_node(net_one, NodeTypes.TUNNEL):
-                    logging.info("setting tunnel key for: %s", net_one.name)
-                    net_one.setkey(key)
-                    if addresses:
-                        net_one.addrconfig(addresses)
-                if key and nodeutils.is_node(net_two, NodeTypes.TUNNEL):
-                    logging.info("setting tunnel key for: %s", net_two.name)
-                    net_two.setkey(key)
-                    if addresses:
-                        net_two.addrconfig(addresses)
-
-                # physical node connected with tunnel
-                if not net_one and not net_two and (node_one or node_two):
-                    if node_one and nodeutils.is_node(node_one, NodeTypes.PHYSICAL):
-                        logging.info("adding link for physical node: %s", node_one.name)
-                        addresses = interface_one.get_addresses()
-                        node_one.adoptnetif(tunnel, interface_one.id, interface_one.mac, addresses)
-                        link_config(node_one, tunnel, link_options)
-                    elif node_two and nodeutils.is_node(node_two, NodeTypes.PHYSICAL):
-                        logging.info("adding link for physical node: %s", node_two.name)
-                        addresses = interface_two.get_addresses()
-                        node_two.adoptnetif(tunnel, interface_two.id, interface_two.mac, addresses)
-                        link_config(node_two, tunnel, link_options)
+                        link_config(net_one, interface, link_options)
+
+                        if not link_options.unidirectional:
+                            interface.swapparams("_params_up")
+                            link_config(net_two, interface, link_options, devname=interface.name)
+                            interface.swapparams("_params_up")
+
+                    # a tunnel node was found for the nodes
+                    addresses = []
+                    if not node_one and all([net_one, interface_one]):
+                        addresses.extend(interface_one.get_addresses())
+
+                    if not node_two and all([net_two, interface_two]):
+                        addresses.extend(interface_two.get_addresses())
+
+                    # tunnel node logic
+                    key = link_options.key
+                    if key and nodeutils.is_node(net_one, NodeTypes.TUNNEL):
+                        logging.info("setting tunnel key for: %s", net_one.name)
+                        net_one.setkey(key)
+                        if addresses:
+                            net_one.addrconfig(addresses)
+                    if key and nodeutils.is_node(net_two, NodeTypes.TUNNEL):
+                        logging.info("setting tunnel key for: %s", net_two.name)
+                        net_two.setkey(key)
+                        if addresses:
+                            net_two.addrconfig(addresses)
+
+                    # physical node connected with tunnel
+                    if not net_one and not net_two and (node_one or node_two):
+                        if node_one and nodeutils.is_node(node_one, NodeTypes.PHYSICAL):
+                            logging.info("adding link for physical node: %s", node_one.name)
+                            addresses = interface_one.get_addresses()
+                            node_one.adoptnetif(tunnel, interface_one.id, interface_one.mac, addresses)
+                            link_config(node_one, tunnel, link_options)
+                        elif node_two and nodeutils.is_node(node_two, NodeTypes.PHYSICAL):
+                            logging.info("adding link for physical node: %s", node_two.name)
+                            addresses = interface_two.get_addresses()
+                            node_two.adoptnetif(tunnel, interface_two.id, interface_two.mac, addresses)
+                            link_config(node_two, tunnel, link_options)
         finally:
             if node_one:
                 node_one.lock.release()
@@ -511,6 +573,7 @@ class Session(object):
             self.add_remove_control_interface(node=node, remove=False)
             self.services.boot_services(node)
 
+        self.data_changed(node.id)
         return node
 
     def update_node(self, node_id, node_options):
@@ -533,6 +596,7 @@ class Session(object):
             # update attributes
             node.canvas = node_options.canvas
             node.icon = node_options.icon
+            self.data_changed(node_id)
 
             # set node as updated successfully
             result = True
@@ -571,6 +635,38 @@ class Session(object):
         if using_lat_lon_alt:
             self.broadcast_node_location(node)
 
+    def move_nodes(self, positions):
+        """
+        Move several nodes together, then update wireless ranges and emane locations once for
+        each network of the moved nodes, as mobility scripts do, rather than once for each node.
+
+        :param list[tuple] positions: node id and x, y, z position for each node to move
+        :return: moved nodes
+        :rtype: list
+        :raises KeyError: when a node does not exist, before any node is moved
+        """
+        nodes = [(self.get_node(node_id), x, y, z) for node_id, x, y, z in positions]
+        moved = []
+        moved_netifs = {}
+        for node, x, y, z in nodes:
+            # set position directly, avoiding the range calculation done by interface position hooks
+            if not node.position.set(x, y, z):
+                continue
+            self.data_changed(node.id)
+            self.position_publisher.publish(node.data(message_type=0))
+            moved.append(node)
+            if isinstance(node, CoreNodeBase):
+                for netif in node.netifs(sort=True):
+                    if netif.net is not None:
+                        moved_netifs.setdefault(netif.net, []).append(netif)
+
+        with self.net_batch():
+            for net, netifs in moved_netifs.items():
+                model = getattr(net, "model", None)
+                if model:
+                    model.update(moved, netifs)
+        return moved
+
     def broadcast_node_location(self, node):
         """
         Broadcast node location to all listeners.
@@ -617,7 +713,8 @@ class Session(object):
         self.clear()
 
         # write out xml file
-        CoreXmlReader(self).read(file_name)
+        with self.net_batch():
+            CoreXmlReader(self).read(file_name)
 
         # start session if needed
         if start:
@@ -787,6 +884,25 @@ class Session(object):
         for handler in self.node_handlers:
             handler(node_data)
 
+        for handler in self.node_batch_handlers:
+            handler([node_data])
+
+    def broadcast_nodes(self, node_datas):
+        """
+        Handle a batch of node data that should be provided to node handlers. Batch handlers
+        receive the whole batch, while other node handlers receive each node data in turn.
+
+        :param list[core.emulator.data.NodeData] node_datas: node data to send out
+        :return: nothing
+        """
+
+        for handler in self.node_handlers:
+            for node_data in node_datas:
+                handler(node_data)
+
+        for handler in self.node_batch_handlers:
+            handler(node_datas)
+
     def broadcast_file(self, file_data):
         """
         Handle file data that should be provided to file handlers.
@@ -1114,6 +1230,7 @@ class Session(object):
                 node.shutdown()
                 raise KeyError("duplicate node id %s for %s" % (node.id, node.name))
             self.nodes[node.id] = node
+        self.data_changed(node.id)
 
         return node
 
@@ -1142,10 +1259,12 @@ class Session(object):
         with self._nodes_lock:
             if _id in self.nodes:
                 node = self.nodes.pop(_id)
+                self.position_publisher.discard(_id)
                 node.shutdown()
                 result = True
 
         if result:
+            self.data_changed(_id)
             self.check_shutdown()
 
         return result
@@ -1156,8 +1275,34 @@ class Session(object):
         """
         with self._nodes_lock:
             while self.nodes:
-                _, node = self.nodes.popitem()
+                _id, node = self.nodes.popitem()
+                self.position_publisher.discard(_id)
                 node.shutdown()
+                self.data_changed(_id)
+
+    def data_changed(self, node_id):
+        """
+        Record a change to the data of a node, or to the links it reports, so cached data for
+        the node is rebuilt.
+
+        :param int node_id: id of the changed node
+        :return: nothing
+        """
+        with self._versions_lock:
+            self._version += 1
+            self._node_versions[node_id] = self._version
+
+    def data_version(self, node_id):
+        """
+        Retrieve the version of the data of a node, which changes whenever the node or the links
+        it reports change.
+
+        :param int node_id: id of node to get version for
+        :return: data version
+        :rtype: int
+        """
+        with self._versions_lock:
+            return self._node_versions.get(node_id, 0)
 
     def write_nodes(self):
         """
@@ -1215,7 +1360,8 @@ class Session(object):
         self.write_nodes()
 
         # controlnet may be needed by some EMANE models
-        self.add_remove_control_interface(node=None, remove=False)
+        with self.net_batch():
+            self.add_remove_control_interface(node=None, remove=False)
 
         # instantiate will be invoked again upon Emane configure
         if self.emane.startup() == self.emane.NOT_READY:
@@ -1287,8 +1433,9 @@ class Session(object):
         Tear down a running session. Stop the event loop and any running
         nodes, and perform clean-up.
         """
-        # stop event loop
+        # stop event loop, and send out any coalesced node positions
         self.event_loop.stop()
+        self.position_publisher.flush()
 
         # stop node services
         with self._nodes_lock:
@@ -1429,6 +1576,11 @@ class Session(object):
         :return: control net node
         :rtype: core.nodes.network.CtrlNet
         """
+        # nodes added concurrently share one control net bridge
+        with self._control_net_lock:
+            return self._add_remove_control_net(net_index, remove, conf_required)
+
+    def _add_remove_control_net(self, net_index, remove, conf_required):
         logging.debug("add/remove control net: index(%s) remove(%s) conf_required(%s)", net_index, remove, conf_required)
         prefix_spec_list = self.get_control_net_prefixes()
         prefix_spec = prefix_spec_list[net_index]
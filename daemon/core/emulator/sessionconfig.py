@@ -24,7 +24,9 @@ class SessionConfig(ConfigurableManager, ConfigurableOptions):
                       label="Preserve session dir"),
         Configuration(_id="enablesdt", _type=ConfigDataTypes.BOOL, default="0", options=["On", "Off"],
                       label="Enable SDT3D output"),
-        Configuration(_id="sdturl", _type=ConfigDataTypes.STRING, default=Sdt.DEFAULT_SDT_URL, label="SDT3D URL")
+        Configuration(_id="sdturl", _type=ConfigDataTypes.STRING, default=Sdt.DEFAULT_SDT_URL, label="SDT3D URL"),
+        Configuration(_id="position_window", _type=ConfigDataTypes.UINT32, default="50",
+                      label="Position Update Window (ms)")
     ]
     config_type = RegisterTlvs.UTILITY.value
 
@@ -1,72 +1,11 @@
 """
-event.py: event loop implementation using a heap queue and threads.
+event.py: event loop implementation using a heap queue and a scheduler thread.
 """
 
 import heapq
+import logging
 import threading
 import time
-from past.builtins import cmp
-
-
-class Timer(threading.Thread):
-    """
-    Based on threading.Timer but cancel() returns if the timer was
-    already running.
-    """
-
-    def __init__(self, interval, function, args=None, kwargs=None):
-        """
-        Create a Timer instance.
-
-        :param interval: time interval
-        :param function: function to call when timer finishes
-        :param args: function arguments
-        :param kwargs: function keyword arguments
-        """
-        super(Timer, self).__init__()
-        self.interval = interval
-        self.function = function
-
-        self.finished = threading.Event()
-        self._running = threading.Lock()
-
-        # validate arguments were provided
-        if args:
-            self.args = args
-        else:
-            self.args = []
-
-        # validate keyword arguments were provided
-        if kwargs:
-            self.kwargs = kwargs
-        else:
-            self.kwargs = {}
-
-    def cancel(self):
-        """
-        Stop the timer if it hasn't finished yet.  Return False if
-        the timer was already running.
-
-        :return: True if canceled, False otherwise
-        :rtype: bool
-        """
-        locked = self._running.acquire(False)
-        if locked:
-            self.finished.set()
-            self._running.release()
-        return locked
-
-    def run(self):
-        """
-        Run the timer.
-
-        :return: nothing
-        """
-        self.finished.wait(self.interval)
-        with self._running:
-            if not self.finished.is_set():
-                self.function(*self.args, **self.kwargs)
-            self.finished.set()
 
 
 class Event(object):
@@ -90,19 +29,8 @@ class Event(object):
         self.args = args
         self.kwds = kwds
         self.canceled = False
-
-    def __cmp__(self, other):
-        """
-        Comparison function.
-
-        :param Event other: event to compare with
-        :return: comparison result
-        :rtype: int
-        """
-        tmp = cmp(self.time, other.time)
-        if tmp == 0:
-            tmp = cmp(self.eventnum, other.eventnum)
-        return tmp
+        # True while the event is in the event loop queue
+        self.queued = False
 
     def run(self):
         """
@@ -126,7 +54,13 @@ class Event(object):
 
 class EventLoop(object):
     """
-    Provides an event loop for running events.
+    Provides an event loop for running events, using a single scheduler thread that waits
+    on a condition for the next event in a heap queue. Canceled events are left in the
+    queue and discarded when they reach the head, with the queue compacted when most of it
+    is canceled.
+
+    Scheduling lag, the time between when an event was due and when it was run, is tracked
+    for events that have run since the loop was last started.
     """
 
     def __init__(self):
@@ -134,54 +68,52 @@ class EventLoop(object):
         Creates a EventLoop instance.
         """
         self.lock = threading.RLock()
+        self.condition = threading.Condition(self.lock)
         self.queue = []
         self.eventnum = 0
-        self.timer = None
+        self.canceled = 0
+        self.thread = None
         self.running = False
         self.start = None
+        # scheduling lag instrumentation
+        self.events_run = 0
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+        self.last_lag = 0.0
 
     def __run_events(self):
         """
-        Run events.
+        Scheduler thread target, running events as they become due until the loop is stopped.
 
         :return: nothing
         """
-        schedule = False
+        current = threading.current_thread()
         while True:
             with self.lock:
-                if not self.running or not self.queue:
-                    break
-                now = time.time()
-                if self.queue[0].time > now:
-                    schedule = True
-                    break
-                event = heapq.heappop(self.queue)
-            if event.time > now:
-                raise ValueError("invalid event time: %s > %s", event.time, now)
-            event.run()
-
-        with self.lock:
-            self.timer = None
-            if schedule:
-                self.__schedule_event()
-
-    def __schedule_event(self):
-        """
-        Schedule event.
-
-        :return: nothing
-        """
-        with self.lock:
-            if not self.running:
-                raise ValueError("scheduling event while not running")
-            if not self.queue:
-                return
-            delay = self.queue[0].time - time.time()
-            if self.timer:
-                raise ValueError("timer was already set")
-            self.timer = Timer(delay, self.__run_events)
-            self.timer.daemon = True
-            self.timer.start()
+                while True:
+                    if not self.running or self.thread is not current:
+                        return
+                    while self.queue and self.queue[0][2].canceled:
+                        heapq.heappop(self.queue)[2].queued = False
+                        self.canceled -= 1
+                    now = time.time()
+                    if self.queue and self.queue[0][0] <= now:
+                        break
+                    if self.queue:
+                        self.condition.wait(self.queue[0][0] - now)
+                    else:
+                        self.condition.wait()
+                event = heapq.heappop(self.queue)[2]
+                event.queued = False
+                lag = now - event.time
+                self.events_run += 1
+                self.lag_total += lag
+                self.lag_max = max(self.lag_max, lag)
+                self.last_lag = lag
+            try:
+                event.run()
+            except Exception:
+                logging.exception("error running event: %s", event.func)
 
     def run(self):
         """
@@ -194,9 +126,16 @@ class EventLoop(object):
                 return
             self.running = True
             self.start = time.time()
-            for event in self.queue:
+            self.queue = [(event_time + self.start, eventnum, event) for event_time, eventnum, event in self.queue]
+            for _, _, event in self.queue:
                 event.time += self.start
-            self.__schedule_event()
+            self.events_run = 0
+            self.lag_total = 0.0
+            self.lag_max = 0.0
+            self.last_lag = 0.0
+            self.thread = threading.Thread(target=self.__run_events)
+            self.thread.daemon = True
+            self.thread.start()
 
     def stop(self):
         """
@@ -207,13 +146,15 @@ class EventLoop(object):
         with self.lock:
             if not self.running:
                 return
+            for _, _, event in self.queue:
+                event.queued = False
             self.queue = []
             self.eventnum = 0
-            if self.timer is not None:
-                self.timer.cancel()
-                self.timer = None
+            self.canceled = 0
+            self.thread = None
             self.running = False
             self.start = None
+            self.condition.notify_all()
 
     def add_event(self, delaysec, func, *args, **kwds):
         """
@@ -233,17 +174,51 @@ class EventLoop(object):
             if self.running:
                 evtime += time.time()
             event = Event(eventnum, evtime, func, *args, **kwds)
-
-            if self.queue:
-                prevhead = self.queue[0]
-            else:
-                prevhead = None
-
-            heapq.heappush(self.queue, event)
-            head = self.queue[0]
-            if prevhead is not None and prevhead != head:
-                if self.timer is not None and self.timer.cancel():
-                    self.timer = None
-            if self.running and self.timer is None:
-                self.__schedule_event()
+            event.queued = True
+            heapq.heappush(self.queue, (evtime, eventnum, event))
+            # only wake the scheduler thread when the next event to run changed
+            if self.running and self.queue[0][2] is event:
+                self.condition.notify()
         return event
+
+    def cancel_event(self, event):
+        """
+        Cancel an event, leaving it in the queue to be discarded when it becomes due.
+        Only events still in the queue are counted as canceled within it.
+
+        :param Event event: event to cancel
+        :return: nothing
+        """
+        with self.lock:
+            if event.canceled:
+                return
+            event.cancel()
+            if not event.queued:
+                return
+            self.canceled += 1
+            if self.canceled > len(self.queue) // 2:
+                for _, _, queued in self.queue:
+                    if queued.canceled:
+                        queued.queued = False
+                self.queue = [x for x in self.queue if not x[2].canceled]
+                heapq.heapify(self.queue)
+                self.canceled = 0
+
+    def lag_metrics(self):
+        """
+        Retrieve scheduling lag metrics for events run since the loop was started.
+
+        :return: number of events run, and average, max, and last scheduling lag in seconds
+        :rtype: dict
+        """
+        with self.lock:
+            average = 0.0
+            if self.events_run:
+                average = self.lag_total / self.events_run
+            return {
+                "events": self.events_run,
+                "average": average,
+                "max": self.lag_max,
+                "last": self.last_lag,
+                "pending": max(0, len(self.queue) - self.canceled),
+            }
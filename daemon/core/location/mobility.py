@@ -28,6 +28,16 @@ from core.emulator.enumerations import RegisterTlvs
 from core.nodes.base import CoreNodeBase
 from core.nodes.ipaddress import IpAddress
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+    logging.debug("numpy not installed, numpy range engine unavailable")
+
+# engines available for calculating basic range links
+RANGE_ENGINE_GRID = "grid"
+RANGE_ENGINE_NUMPY = "numpy"
+
 
 class MobilityManager(ModelManager):
     """
@@ -314,6 +324,12 @@ class BasicRangeModel(WirelessModel):
     Basic Range wireless model, calculates range between nodes and links
     and unlinks nodes based on this distance. This was formerly done from
     the GUI.
+
+    Interfaces are indexed in a uniform grid with cells the size of the range,
+    so a moved interface is only checked against interfaces in neighboring cells
+    and those it is currently linked to. Alternatively the numpy engine keeps all
+    positions in a RangeMatrix and calculates links for all moved interfaces in a
+    single vectorized pass.
     """
     name = "basic_range"
     options = [
@@ -322,7 +338,9 @@ class BasicRangeModel(WirelessModel):
         Configuration(_id="jitter", _type=ConfigDataTypes.UINT64, default="0", label="transmission jitter (usec)"),
         Configuration(_id="delay", _type=ConfigDataTypes.UINT64, default="5000",
                       label="transmission delay (usec)"),
-        Configuration(_id="error", _type=ConfigDataTypes.STRING, default="0", label="error rate (%)")
+        Configuration(_id="error", _type=ConfigDataTypes.STRING, default="0", label="error rate (%)"),
+        Configuration(_id="engine", _type=ConfigDataTypes.STRING, default=RANGE_ENGINE_GRID,
+                      options=[RANGE_ENGINE_GRID, RANGE_ENGINE_NUMPY], label="range engine")
     ]
 
     @classmethod
@@ -344,6 +362,10 @@ class BasicRangeModel(WirelessModel):
         self.wlan = session.get_node(_id)
         self._netifs = {}
         self._netifslock = threading.Lock()
+        self._grid = {}
+        self._cells = {}
+        self._links = {}
+        self._matrix = None
 
         self.range = None
         self.bw = None
@@ -360,6 +382,11 @@ class BasicRangeModel(WirelessModel):
         """
         self.range = int(config["range"])
         logging.info("basic range model configured for WLAN %d using range %d", self.wlan.id, self.range)
+        engine = config.get("engine", RANGE_ENGINE_GRID)
+        if engine == RANGE_ENGINE_NUMPY and numpy is None:
+            logging.warning("numpy not installed, using grid range engine for WLAN %d", self.wlan.id)
+            engine = RANGE_ENGINE_GRID
+        self._reset_engine(engine)
         self.bw = int(config["bandwidth"])
         if self.bw == 0:
             self.bw = None
@@ -407,11 +434,18 @@ class BasicRangeModel(WirelessModel):
         """
         self._netifslock.acquire()
         self._netifs[netif] = (x, y, z)
+        if self._matrix:
+            self._matrix.set_position(netif, (x, y, z))
+        else:
+            self._update_cell(netif)
         if x is None or y is None:
             self._netifslock.release()
             return
-        for netif2 in self._netifs:
-            self.calclink(netif, netif2)
+        if self._matrix:
+            self._update_links(self._matrix.calculate([netif], self.range))
+        else:
+            for netif2 in self._candidates(netif):
+                self.calclink(netif, netif2)
         self._netifslock.release()
 
     position_callback = set_position
@@ -428,16 +462,136 @@ class BasicRangeModel(WirelessModel):
         :return: nothing
         """
         with self._netifslock:
+            if self._matrix:
+                moved = []
+                while len(moved_netifs):
+                    netif = moved_netifs.pop()
+                    if netif in self._netifs:
+                        self._netifs[netif] = netif.node.getposition()
+                        self._matrix.set_position(netif, self._netifs[netif])
+                        moved.append(netif)
+                self._update_links(self._matrix.calculate(moved, self.range))
+                return
+
+            pending = set(moved_netifs)
             while len(moved_netifs):
                 netif = moved_netifs.pop()
+                pending.discard(netif)
                 nx, ny, nz = netif.node.getposition()
                 if netif in self._netifs:
                     self._netifs[netif] = (nx, ny, nz)
-                for netif2 in self._netifs:
-                    if netif2 in moved_netifs:
+                    self._update_cell(netif)
+                for netif2 in self._candidates(netif):
+                    if netif2 in pending:
                         continue
                     self.calclink(netif, netif2)
 
+    def _reset_engine(self, engine):
+        """
+        Rebuild the state used by the range engine, based on current positions and links.
+
+        :param str engine: range engine to use
+        :return: nothing
+        """
+        with self._netifslock:
+            self._grid.clear()
+            self._cells.clear()
+            self._links.clear()
+            self._matrix = None
+            if engine == RANGE_ENGINE_NUMPY:
+                self._matrix = RangeMatrix()
+                for netif in self._netifs:
+                    self._matrix.set_position(netif, self._netifs[netif])
+            else:
+                for netif in self._netifs:
+                    self._update_cell(netif)
+
+            with self.wlan._linked_lock:
+                pairs = [(a, b) for a in self.wlan._linked for b in self.wlan._linked[a] if self.wlan._linked[a][b]]
+            for a, b in pairs:
+                if a not in self._netifs or b not in self._netifs:
+                    continue
+                if self._matrix:
+                    self._matrix.set_linked(a, b, True)
+                else:
+                    self._links.setdefault(a, set()).add(b)
+                    self._links.setdefault(b, set()).add(a)
+
+    def _update_links(self, changes):
+        """
+        Link or unlink interface pairs that have changed, sending link messages for them.
+
+        :param list changes: tuples of the interfaces and whether they should now be linked
+        :return: nothing
+        """
+        for netif, netif2, connect in changes:
+            a = min(netif, netif2)
+            b = max(netif, netif2)
+            with self.wlan._linked_lock:
+                linked = self.wlan.linked(a, b)
+            if connect and not linked:
+                self.wlan.link(a, b)
+                self.sendlinkmsg(a, b)
+            elif not connect and linked:
+                self.wlan.unlink(a, b)
+                self.sendlinkmsg(a, b, unlink=True)
+
+    def _get_cell(self, netif):
+        """
+        Calculate the grid cell for the current position of an interface.
+
+        :param netif: interface to get cell for
+        :return: grid cell, None when the interface has no position
+        :rtype: tuple[int, int]
+        """
+        x, y, _ = self._netifs[netif]
+        if x is None or y is None:
+            return None
+        size = max(self.range, 1)
+        return int(math.floor(x / size)), int(math.floor(y / size))
+
+    def _update_cell(self, netif):
+        """
+        Move an interface to the grid cell for its current position.
+
+        :param netif: interface to update
+        :return: nothing
+        """
+        cell = self._get_cell(netif)
+        old_cell = self._cells.get(netif)
+        if cell == old_cell:
+            return
+        if old_cell is not None:
+            netifs = self._grid[old_cell]
+            netifs.discard(netif)
+            if not netifs:
+                del self._grid[old_cell]
+        if cell is None:
+            self._cells.pop(netif, None)
+        else:
+            self._cells[netif] = cell
+            self._grid.setdefault(cell, set()).add(netif)
+
+    def _candidates(self, netif):
+        """
+        Retrieve the interfaces that may need to be linked or unlinked with an interface:
+        those in its own and neighboring grid cells, as well as those it is linked to.
+        Interfaces in any other cell are further away than the range.
+
+        :param netif: interface to get candidates for
+        :return: candidate interfaces
+        :rtype: set
+        """
+        candidates = set(self._links.get(netif, ()))
+        cell = self._cells.get(netif)
+        if cell is not None:
+            cx, cy = cell
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    candidates.update(self._grid.get((cx + dx, cy + dy), ()))
+        candidates.discard(netif)
+        return candidates
+
     def calclink(self, netif, netif2):
         """
         Helper used by set_position() and update() to
@@ -469,11 +623,15 @@ class BasicRangeModel(WirelessModel):
                 linked = self.wlan.linked(a, b)
 
             if d > self.range:
+                self._links.get(a, set()).discard(b)
+                self._links.get(b, set()).discard(a)
                 if linked:
                     logging.debug("was linked, unlinking")
                     self.wlan.unlink(a, b)
                     self.sendlinkmsg(a, b, unlink=True)
             else:
+                self._links.setdefault(a, set()).add(b)
+                self._links.setdefault(b, set()).add(a)
                 if not linked:
                     logging.debug("was not linked, linking")
                     self.wlan.link(a, b)
@@ -561,6 +719,124 @@ class BasicRangeModel(WirelessModel):
         return all_links
 
 
+class RangeMatrix(object):
+    """
+    Interface positions and links for a wlan, kept in contiguous numpy arrays for the
+    numpy range engine. Links are calculated for a set of moved interfaces against all
+    others in one vectorized pass, and compared with the previous links to produce only
+    the pairs that changed.
+    """
+
+    def __init__(self):
+        """
+        Create a RangeMatrix instance.
+        """
+        self.netifs = []
+        self.index = {}
+        # arrays allocated with spare capacity, and views of the rows in use
+        self._positions = numpy.zeros((0, 3))
+        self._linked = numpy.zeros((0, 0), dtype=bool)
+        self.positions = self._positions
+        self.linked = self._linked
+
+    def _add(self, netif):
+        """
+        Add an interface, doubling the capacity of the arrays when full, so adding
+        interfaces one at a time copies the arrays only a few times.
+
+        :param netif: interface to add
+        :return: index of the interface
+        :rtype: int
+        """
+        index = len(self.netifs)
+        capacity = len(self._positions)
+        if index == capacity:
+            capacity = max(16, capacity * 2)
+            positions = numpy.full((capacity, 3), numpy.nan)
+            positions[:index] = self._positions
+            linked = numpy.zeros((capacity, capacity), dtype=bool)
+            linked[:index, :index] = self._linked
+            self._positions = positions
+            self._linked = linked
+
+        self.netifs.append(netif)
+        self.index[netif] = index
+        self.positions = self._positions[:index + 1]
+        self.linked = self._linked[:index + 1, :index + 1]
+        return index
+
+    def set_position(self, netif, position):
+        """
+        Set the position of an interface, unknown values are set using None.
+
+        :param netif: interface to set position for
+        :param tuple position: x, y, and z position
+        :return: nothing
+        """
+        index = self.index.get(netif)
+        if index is None:
+            index = self._add(netif)
+        self.positions[index] = [numpy.nan if value is None else value for value in position]
+
+    def set_linked(self, netif, netif2, linked):
+        """
+        Set the known link state between two interfaces.
+
+        :param netif: interface one
+        :param netif2: interface two
+        :param bool linked: True if linked, False otherwise
+        :return: nothing
+        """
+        index = self.index[netif]
+        index2 = self.index[netif2]
+        self.linked[index, index2] = linked
+        self.linked[index2, index] = linked
+
+    def calculate(self, netifs, distance):
+        """
+        Calculate links between the given interfaces and all others, mirroring
+        BasicRangeModel.calcdistance, where z is only considered when known for both
+        interfaces and pairs without a known x and y position are left unchanged.
+
+        :param list netifs: interfaces that have moved
+        :param int distance: range within which interfaces are linked
+        :return: tuples of interfaces and whether they are now linked, for pairs that changed
+        :rtype: list
+        """
+        rows = numpy.array([self.index[netif] for netif in netifs if netif in self.index], dtype=int)
+        if not len(rows):
+            return []
+
+        # squared distances between each moved interface and all interfaces, one axis
+        # at a time to avoid holding per axis differences for every pair at once
+        squared = numpy.zeros((len(rows), len(self.netifs)))
+        for axis in range(3):
+            values = self.positions[:, axis]
+            deltas = values[rows, None] - values[None, :]
+            if axis == 2:
+                deltas[numpy.isnan(deltas)] = 0
+            deltas *= deltas
+            squared += deltas
+        known = ~numpy.isnan(squared)
+        in_range = known & (numpy.nan_to_num(squared) <= distance * distance)
+
+        changed = known & (in_range != self.linked[rows])
+        changed[numpy.arange(len(rows)), rows] = False
+        changes = []
+        seen = set()
+        for row, column in zip(*numpy.nonzero(changed)):
+            index = rows[row]
+            pair = (min(index, column), max(index, column))
+            if pair in seen:
+                continue
+            seen.add(pair)
+            connect = bool(in_range[row, column])
+            self.linked[index, column] = connect
+            self.linked[column, index] = connect
+            changes.append((self.netifs[index], self.netifs[column], connect))
+        return changes
+
+
 class WayPoint(object):
     """
     Maintains information regarding waypoints.
@@ -826,9 +1102,9 @@ class WayPointMobility(WirelessModel):
 
     def setnodeposition(self, node, x, y, z):
         """
-        Helper to move a node, notify any GUI (connected session handlers),
-        without invoking the interface poshook callback that may perform
-        range calculation.
+        Helper to move a node, notify any GUI (connected session handlers)
+        through the coalescing position publisher, without invoking the
+        interface poshook callback that may perform range calculation.
 
         :param core.netns.vnode.CoreNode node: node to set position for
         :param x: x position
@@ -837,9 +1113,10 @@ class WayPointMobility(WirelessModel):
         :return: nothing
         """
         # this would cause PyCoreNetIf.poshook() callback (range calculation)
-        node.position.set(x, y, z)
+        if node.position.set(x, y, z):
+            self.session.data_changed(node.id)
         node_data = node.data(message_type=0)
-        self.session.broadcast_node(node_data)
+        self.session.position_publisher.publish(node_data)
 
     def setendtime(self):
         """
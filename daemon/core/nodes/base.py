@@ -20,6 +20,7 @@ from core import constants
 from core.emulator.data import NodeData, LinkData
 from core.emulator.enumerations import NodeTypes, LinkTypes
 from core.nodes import client, nodeutils, ipaddress
+from core.nodes.netclient import get_net_client
 from core.nodes.interface import TunTap, CoreInterface
 from core.nodes.interface import Veth
 
@@ -63,6 +64,8 @@ class NodeBase(object):
         self.icon = None
         self.opaque = None
         self.position = Position()
+        self.net_client = get_net_client(session.options.get_config("net_backend"), utils.check_cmd,
+                                         batch=session.get_net_batch, name=self.name)
 
     def startup(self):
         """
@@ -90,7 +93,10 @@ class NodeBase(object):
         :return: True if position changed, False otherwise
         :rtype: bool
         """
-        return self.position.set(x=x, y=y, z=z)
+        changed = self.position.set(x=x, y=y, z=z)
+        if changed:
+            self.session.data_changed(self.id)
+        return changed
 
     def getposition(self):
         """
@@ -436,6 +442,7 @@ class CoreNode(CoreNodeBase):
         self.nodedir = nodedir
         self.ctrlchnlname = os.path.abspath(os.path.join(self.session.session_dir, self.name))
         self.client = None
+        self.node_net_client = None
         self.pid = None
         self.up = False
         self.lock = threading.RLock()
@@ -491,9 +498,13 @@ class CoreNode(CoreNodeBase):
             # create vnode client
             self.client = client.VnodeClient(self.name, self.ctrlchnlname)
 
+            # create net client for operating within the node namespace
+            net_backend = self.session.options.get_config("net_backend")
+            self.node_net_client = get_net_client(net_backend, self.check_cmd, self.pid)
+
             # bring up the loopback interface
             logging.debug("bringing up loopback interface")
-            self.check_cmd([constants.IP_BIN, "link", "set", "lo", "up"])
+            self.node_net_client.device_up("lo")
 
             # set hostname for node
             logging.debug("setting hostname: %s", self.name)
@@ -545,6 +556,7 @@ class CoreNode(CoreNodeBase):
                 # clear interface data, close client, and mark self and not up
                 self._netif.clear()
                 self.client.close()
+                self.node_net_client.close()
                 self.up = False
             except OSError:
                 logging.exception("error during shutdown")
@@ -666,21 +678,15 @@ class CoreNode(CoreNodeBase):
             veth = Veth(node=self, name=name, localname=localname, net=net, start=self.up)
 
             if self.up:
-                utils.check_cmd([constants.IP_BIN, "link", "set", veth.name, "netns", str(self.pid)])
-                self.check_cmd([constants.IP_BIN, "link", "set", veth.name, "name", ifname])
+                self.net_client.device_ns(veth.name, self.pid)
+                self.node_net_client.device_name(veth.name, ifname)
 
             veth.name = ifname
 
             if self.up:
-                # TODO: potentially find better way to query interface ID
                 # retrieve interface information
-                output = self.check_cmd(["ip", "link", "show", veth.name])
-                logging.debug("interface command output: %s", output)
-                output = output.split("\n")
-                veth.flow_id = int(output[0].strip().split(":")[0]) + 1
+                veth.flow_id = self.node_net_client.get_ifindex(veth.name) + 1
                 logging.debug("interface flow index: %s - %s", veth.name, veth.flow_id)
-                # TODO: mimic packed hwaddr
-                # veth.hwaddr = MacAddress.from_string(output[1].strip().split()[1])
                 logging.debug("interface mac: %s - %s", veth.name, veth.hwaddr)
 
             try:
@@ -734,8 +740,7 @@ class CoreNode(CoreNodeBase):
         """
         self._netif[ifindex].sethwaddr(addr)
         if self.up:
-            args = [constants.IP_BIN, "link", "set", "dev", self.ifname(ifindex), "address", str(addr)]
-            self.check_cmd(args)
+            self.node_net_client.device_mac(self.ifname(ifindex), addr)
 
     def addaddr(self, ifindex, addr):
         """
@@ -748,11 +753,9 @@ class CoreNode(CoreNodeBase):
         if self.up:
             # check if addr is ipv6
             if ":" in str(addr):
-                args = [constants.IP_BIN, "addr", "add", str(addr), "dev", self.ifname(ifindex)]
-                self.check_cmd(args)
+                self.node_net_client.create_address(self.ifname(ifindex), addr)
             else:
-                args = [constants.IP_BIN, "addr", "add", str(addr), "broadcast", "+", "dev", self.ifname(ifindex)]
-                self.check_cmd(args)
+                self.node_net_client.create_address(self.ifname(ifindex), addr, broadcast="+")
 
         self._netif[ifindex].addaddr(addr)
 
@@ -771,7 +774,7 @@ class CoreNode(CoreNodeBase):
             logging.exception("trying to delete unknown address: %s" % addr)
 
         if self.up:
-            self.check_cmd([constants.IP_BIN, "addr", "del", str(addr), "dev", self.ifname(ifindex)])
+            self.node_net_client.delete_address(self.ifname(ifindex), addr)
 
     def delalladdr(self, ifindex, address_types=None):
         """
@@ -805,7 +808,7 @@ class CoreNode(CoreNodeBase):
         :return: nothing
         """
         if self.up:
-            self.check_cmd([constants.IP_BIN, "link", "set", self.ifname(ifindex), "up"])
+            self.node_net_client.device_up(self.ifname(ifindex))
 
     def newnetif(self, net=None, addrlist=None, hwaddr=None, ifindex=None, ifname=None):
         """
@@ -863,15 +866,15 @@ class CoreNode(CoreNodeBase):
         tmplen = 8
         tmp1 = "tmp." + "".join([random.choice(string.ascii_lowercase) for _ in range(tmplen)])
         tmp2 = "tmp." + "".join([random.choice(string.ascii_lowercase) for _ in range(tmplen)])
-        utils.check_cmd([constants.IP_BIN, "link", "add", "name", tmp1, "type", "veth", "peer", "name", tmp2])
+        self.net_client.create_veth(tmp1, tmp2)
 
-        utils.check_cmd([constants.IP_BIN, "link", "set", tmp1, "netns", str(self.pid)])
-        self.check_cmd([constants.IP_BIN, "link", "set", tmp1, "name", ifname])
+        self.net_client.device_ns(tmp1, self.pid)
+        self.node_net_client.device_name(tmp1, ifname)
         interface = CoreInterface(node=self, name=ifname, mtu=_DEFAULT_MTU)
         self.addnetif(interface, self.newifindex())
 
-        utils.check_cmd([constants.IP_BIN, "link", "set", tmp2, "netns", str(othernode.pid)])
-        othernode.check_cmd([constants.IP_BIN, "link", "set", tmp2, "name", otherifname])
+        self.net_client.device_ns(tmp2, othernode.pid)
+        othernode.node_net_client.device_name(tmp2, otherifname)
         other_interface = CoreInterface(node=othernode, name=otherifname, mtu=_DEFAULT_MTU)
         othernode.addnetif(other_interface, othernode.newifindex())
 
@@ -996,11 +999,13 @@ class CoreNetworkBase(NodeBase):
         :param core.nodes.interface.CoreInterface netif: network interface to attach
         :return: nothing
         """
-        i = self.newifindex()
-        self._netif[i] = netif
-        netif.netifi = i
+        # nodes may attach concurrently, allocate the index and link state together
         with self._linked_lock:
+            i = self.newifindex()
+            self._netif[i] = netif
+            netif.netifi = i
             self._linked[netif] = {}
+        self.session.data_changed(self.id)
 
     def detach(self, netif):
         """
@@ -1009,10 +1014,11 @@ class CoreNetworkBase(NodeBase):
         :param core.nodes.interface.CoreInterface netif: network interface to detach
         :return: nothing
         """
-        del self._netif[netif.netifi]
-        netif.netifi = None
         with self._linked_lock:
+            del self._netif[netif.netifi]
+            netif.netifi = None
             del self._linked[netif]
+        self.session.data_changed(self.id)
 
     def all_link_data(self, flags):
         """
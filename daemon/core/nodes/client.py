@@ -1,17 +1,236 @@
 """
 client.py: implementation of the VnodeClient class for issuing commands
 over a control channel to the vnoded process running in a network namespace.
-The control channel can be accessed via calls using the vcmd shell.
+The control channel can be accessed via calls using the vcmd shell, or
+directly using a persistent VnodeChannel connection.
 """
 
+import array
 import logging
 import os
+import socket
+import struct
+import threading
 
 from subprocess import Popen, PIPE
 
 from core import CoreCommandError, utils
 from core import constants
 
+# vnoded control channel protocol values, from netns/vnode_msg.h
+VNODE_MSG_CMDREQ = 1
+VNODE_MSG_CMDREQACK = 2
+VNODE_MSG_CMDSTATUS = 3
+VNODE_TLV_CMDID = 1
+VNODE_TLV_CMDARG = 5
+VNODE_TLV_CMDPID = 6
+VNODE_TLV_CMDSTATUS = 7
+VNODE_MSGSIZMAX = 65535
+VNODE_ARGMAX = 1024
+
+_VNODE_HEADER = "=II"
+_VNODE_HEADER_LEN = struct.calcsize(_VNODE_HEADER)
+
+
+class VnodeCommand(object):
+    """
+    Command request sent over a vnoded control channel, completed when its status is received.
+    """
+
+    def __init__(self, cmdid):
+        """
+        Create a VnodeCommand instance.
+
+        :param int cmdid: command id for the request
+        """
+        self.cmdid = cmdid
+        self.pid = None
+        self.status = None
+        self.error = None
+        self.event = threading.Event()
+
+    def done(self, status, error=None):
+        """
+        Complete the command.
+
+        :param int status: raw wait status for the command
+        :param str error: error that prevented the command from completing
+        :return: nothing
+        """
+        self.status = status
+        self.error = error
+        self.event.set()
+
+    def wait(self):
+        """
+        Wait for the command to complete and return its exit status, 255 is used for
+        commands that did not exit normally, mirroring vcmd.
+
+        :return: exit status
+        :rtype: int
+        :raises IOError: when the control channel failed before the command completed
+        """
+        self.event.wait()
+        if self.error:
+            raise IOError(self.error)
+        if os.WIFEXITED(self.status):
+            return os.WEXITSTATUS(self.status)
+        return 255
+
+
+class VnodeChannel(object):
+    """
+    Long lived connection to the control channel of a vnoded process. Any number of
+    command requests can be outstanding, responses are matched by command id.
+    """
+
+    def __init__(self, ctrlchnlname):
+        """
+        Create a VnodeChannel instance, connecting to the control channel.
+
+        :param str ctrlchnlname: control channel name
+        :raises IOError: when unable to connect, or passing file descriptors is not supported
+        """
+        # passing file descriptors requires socket.sendmsg, not available on python 2
+        if not hasattr(socket.socket, "sendmsg"):
+            raise IOError("socket sendmsg not supported, unable to use control channel")
+        self.ctrlchnlname = ctrlchnlname
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        self.sock.connect(ctrlchnlname)
+        self.lock = threading.Lock()
+        self.cmdid = 0
+        self.commands = {}
+        self.running = True
+        self.thread = threading.Thread(target=self.receive_loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def close(self):
+        """
+        Close the connection, failing any outstanding commands.
+
+        :return: nothing
+        """
+        self.running = False
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+        self.thread.join()
+        self.sock.close()
+
+    def request(self, args, infd, outfd, errfd):
+        """
+        Send a command request, passing the provided file descriptors to be used as the
+        standard input, output, and error of the command.
+
+        :param list[str] args: command arguments
+        :param int infd: standard input file descriptor
+        :param int outfd: standard output file descriptor
+        :param int errfd: standard error file descriptor
+        :return: command request
+        :rtype: VnodeCommand
+        :raises IOError: when the request cannot be sent
+        """
+        if len(args) >= VNODE_ARGMAX:
+            raise IOError("too many command arguments: %s" % len(args))
+
+        with self.lock:
+            if not self.running:
+                raise IOError("control channel closed: %s" % self.ctrlchnlname)
+            self.cmdid = (self.cmdid + 1) & 0x7fffffff
+            command = VnodeCommand(self.cmdid)
+            data = _vnode_tlv(VNODE_TLV_CMDID, struct.pack("=i", command.cmdid))
+            for arg in args:
+                data += _vnode_tlv(VNODE_TLV_CMDARG, arg.encode("utf-8") + b"\0")
+            message = struct.pack(_VNODE_HEADER, VNODE_MSG_CMDREQ, len(data)) + data
+            if len(message) > VNODE_MSGSIZMAX:
+                raise IOError("command request too large: %s bytes" % len(message))
+            self.commands[command.cmdid] = command
+            fds = array.array("i", [infd, outfd, errfd])
+            try:
+                self.sock.sendmsg([message], [(socket.SOL_SOCKET, socket.SCM_RIGHTS, fds)])
+            except socket.error as e:
+                del self.commands[command.cmdid]
+                raise IOError("error sending command request: %s" % e)
+        return command
+
+    def receive_loop(self):
+        """
+        Thread target that receives command acknowledgements and statuses, completing
+        commands as their status arrives.
+
+        :return: nothing
+        """
+        while True:
+            try:
+                data = self.sock.recv(VNODE_MSGSIZMAX)
+            except socket.error:
+                data = None
+            if not data:
+                break
+
+            if len(data) < _VNODE_HEADER_LEN:
+                logging.warning("truncated control channel message: %s", self.ctrlchnlname)
+                continue
+            message_type, _length = struct.unpack_from(_VNODE_HEADER, data)
+            values = _parse_vnode_tlvs(data, _VNODE_HEADER_LEN)
+            cmdid = values.get(VNODE_TLV_CMDID)
+            if message_type == VNODE_MSG_CMDREQACK:
+                pid = values.get(VNODE_TLV_CMDPID)
+                with self.lock:
+                    command = self.commands.get(cmdid)
+                    if command and pid == -1:
+                        del self.commands[cmdid]
+                if not command:
+                    continue
+                command.pid = pid
+                if pid == -1:
+                    command.done(None, "failed to start command")
+            elif message_type == VNODE_MSG_CMDSTATUS:
+                with self.lock:
+                    command = self.commands.pop(cmdid, None)
+                if command:
+                    command.done(values.get(VNODE_TLV_CMDSTATUS))
+
+        with self.lock:
+            self.running = False
+            commands = list(self.commands.values())
+            self.commands.clear()
+        for command in commands:
+            command.done(None, "control channel closed: %s" % self.ctrlchnlname)
+
+
+def _vnode_tlv(tlv_type, value):
+    """
+    Pack a vnoded control channel tlv.
+
+    :param int tlv_type: tlv type
+    :param bytes value: tlv value
+    :return: packed tlv
+    :rtype: bytes
+    """
+    return struct.pack("=II", tlv_type, len(value)) + value
+
+
+def _parse_vnode_tlvs(data, offset):
+    """
+    Parse the int32 valued tlvs of a vnoded control channel message.
+
+    :param bytes data: message data
+    :param int offset: offset tlvs start at
+    :return: tlv values by type
+    :rtype: dict
+    """
+    values = {}
+    while offset + 8 <= len(data):
+        tlv_type, length = struct.unpack_from("=II", data, offset)
+        offset += 8
+        if length == 4:
+            values[tlv_type] = struct.unpack_from("=i", data, offset)[0]
+        offset += length
+    return values
+
 
 class VnodeClient(object):
     """
@@ -28,6 +247,9 @@ class VnodeClient(object):
         self.name = name
         self.ctrlchnlname = ctrlchnlname
         self._addr = {}
+        self.channel = None
+        self._channel_lock = threading.Lock()
+        self._channel_failed = False
 
     def _verify_connection(self):
         """
@@ -54,11 +276,58 @@ class VnodeClient(object):
 
         :return: nothing
         """
-        pass
+        with self._channel_lock:
+            if self.channel:
+                self.channel.close()
+                self.channel = None
 
     def _cmd_args(self):
         return [constants.VCMD_BIN, "-c", self.ctrlchnlname, "--"]
 
+    def _get_channel(self):
+        """
+        Retrieve the persistent control channel connection, connecting on first use.
+        Commands fall back to running vcmd when a connection is not possible.
+
+        :return: control channel connection, None when unavailable
+        :rtype: VnodeChannel
+        """
+        with self._channel_lock:
+            if self.channel is None and not self._channel_failed:
+                try:
+                    self.channel = VnodeChannel(self.ctrlchnlname)
+                except (IOError, socket.error):
+                    logging.exception("error connecting to control channel, using vcmd: %s", self.ctrlchnlname)
+                    self._channel_failed = True
+            return self.channel
+
+    def _channel_request(self, channel, args, infd, outfd, errfd):
+        """
+        Send a command request using the control channel, dropping the channel so commands
+        fall back to running vcmd when it was closed.
+
+        :param VnodeChannel channel: control channel to send request with
+        :param list[str] args: command arguments
+        :param int infd: standard input file descriptor
+        :param int outfd: standard output file descriptor
+        :param int errfd: standard error file descriptor
+        :return: command request, None when the channel was closed
+        :rtype: VnodeCommand
+        :raises IOError: when the request cannot be sent
+        """
+        try:
+            return channel.request(args, infd, outfd, errfd)
+        except IOError:
+            if channel.running:
+                raise
+        logging.warning("control channel closed, using vcmd: %s", self.ctrlchnlname)
+        with self._channel_lock:
+            if self.channel is channel:
+                self.channel = None
+                self._channel_failed = True
+        channel.close()
+        return None
+
     def cmd(self, args, wait=True):
         """
         Execute a command on a node and return the status (return code).
@@ -71,6 +340,19 @@ class VnodeClient(object):
         self._verify_connection()
         args = utils.split_args(args)
 
+        channel = self._get_channel()
+        if channel:
+            logging.info("cmd wait(%s): %s", wait, args)
+            devnull = os.open(os.devnull, os.O_RDWR)
+            try:
+                command = self._channel_request(channel, args, devnull, devnull, devnull)
+            finally:
+                os.close(devnull)
+            if command is not None:
+                if not wait:
+                    return 0
+                return command.wait()
+
         # run command, return process when not waiting
         cmd = self._cmd_args() + args
         logging.info("cmd wait(%s): %s", wait, cmd)
@@ -91,6 +373,28 @@ class VnodeClient(object):
         :return: command status and combined stdout and stderr output
         :rtype: tuple[int, str]
         """
+        channel = self._get_channel()
+        if channel:
+            self._verify_connection()
+            args = utils.split_args(args)
+            logging.info("cmd output: %s", args)
+            read_fd, write_fd = os.pipe()
+            devnull = os.open(os.devnull, os.O_RDONLY)
+            try:
+                command = self._channel_request(channel, args, devnull, write_fd, write_fd)
+            except IOError:
+                os.close(read_fd)
+                raise
+            finally:
+                os.close(devnull)
+                os.close(write_fd)
+            if command is not None:
+                with os.fdopen(read_fd, "rb") as output_file:
+                    output = output_file.read()
+                status = command.wait()
+                return status, output.decode("utf-8").strip()
+            os.close(read_fd)
+
         p, stdin, stdout, stderr = self.popen(args)
         stdin.close()
         output = stdout.read() + stderr.read()
@@ -229,11 +533,15 @@ class VnodeClient(object):
 
         interface = {"ether": [], "inet": [], "inet6": [], "inet6link": []}
         args = [constants.IP_BIN, "addr", "show", "dev", ifname]
-        p, stdin, stdout, stderr = self.popen(args)
-        stdin.close()
+        status, output = self.cmd_output(args)
+        if status:
+            logging.warning("nonzero exist status (%s) for cmd: %s", status, args)
+            logging.warning("error output: %s", output)
 
-        for line in stdout:
+        for line in output.split("\n"):
             line = line.strip().split()
+            if not line:
+                continue
             if line[0] == "link/ether":
                 interface["ether"].append(line[1])
             elif line[0] == "inet":
@@ -246,14 +554,6 @@ class VnodeClient(object):
                 else:
                     logging.warning("unknown scope: %s" % line[3])
 
-        err = stderr.read()
-        stdout.close()
-        stderr.close()
-        status = p.wait()
-        if status:
-            logging.warning("nonzero exist status (%s) for cmd: %s", status, args)
-        if err:
-            logging.warning("error output: %s", err)
         self._addr[ifname] = interface
         return interface
 
@@ -267,16 +567,18 @@ class VnodeClient(object):
         """
         stats = {}
         args = ["cat", "/proc/net/dev"]
-        p, stdin, stdout, stderr = self.popen(args)
-        stdin.close()
-        # ignore first line
-        stdout.readline()
-        # second line has count names
-        tmp = stdout.readline().decode("utf-8").strip().split("|")
+        status, output = self.cmd_output(args)
+        if status:
+            logging.warning("nonzero exist status (%s) for cmd: %s", status, args)
+            logging.warning("error output: %s", output)
+            return stats
+        lines = output.split("\n")
+        # ignore first line, second line has count names
+        tmp = lines[1].strip().split("|")
         rxkeys = tmp[1].split()
         txkeys = tmp[2].split()
-        for line in stdout:
-            line = line.decode("utf-8").strip().split()
+        for line in lines[2:]:
+            line = line.strip().split()
             devname, tmp = line[0].split(":")
             if tmp:
                 line.insert(1, tmp)
@@ -288,14 +590,6 @@ class VnodeClient(object):
             for count in txkeys:
                 stats[devname]["tx"][count] = int(line[field])
                 field += 1
-        err = stderr.read()
-        stdout.close()
-        stderr.close()
-        status = p.wait()
-        if status:
-            logging.warning("nonzero exist status (%s) for cmd: %s", status, args)
-        if err:
-            logging.warning("error output: %s", err)
         if ifname is not None:
             return stats[ifname]
         else:
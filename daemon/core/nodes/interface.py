@@ -95,6 +95,7 @@ class CoreInterface(object):
         """
 
         self.addrlist.append(addr)
+        self.data_changed()
 
     def deladdr(self, addr):
         """
@@ -104,6 +105,7 @@ class CoreInterface(object):
         :return: nothing
         """
         self.addrlist.remove(addr)
+        self.data_changed()
 
     def sethwaddr(self, addr):
         """
@@ -113,6 +115,16 @@ class CoreInterface(object):
         :return: nothing
         """
         self.hwaddr = addr
+        self.data_changed()
+
+    def data_changed(self):
+        """
+        Record a change to the link data of the network this interface is attached to.
+
+        :return: nothing
+        """
+        if self.net is not None:
+            self.net.session.data_changed(self.net.id)
 
     def getparam(self, key):
         """
@@ -150,6 +162,7 @@ class CoreInterface(object):
             return False
 
         self._params[key] = value
+        self.data_changed()
         return True
 
     def swapparams(self, name):
@@ -207,10 +220,14 @@ class Veth(CoreInterface):
         :param bool start: start flag
         :raises CoreCommandError: when there is a command exception
         """
-        # note that net arg is ignored
+        # note that net arg is only used for its net client, when there is no node
         CoreInterface.__init__(self, node=node, name=name, mtu=mtu)
         self.localname = localname
         self.up = False
+        if node is not None:
+            self.net_client = node.net_client
+        else:
+            self.net_client = net.net_client
         if start:
             self.startup()
 
@@ -221,9 +238,8 @@ class Veth(CoreInterface):
         :return: nothing
         :raises CoreCommandError: when there is a command exception
         """
-        utils.check_cmd([constants.IP_BIN, "link", "add", "name", self.localname,
-                         "type", "veth", "peer", "name", self.name])
-        utils.check_cmd([constants.IP_BIN, "link", "set", self.localname, "up"])
+        self.net_client.create_veth(self.localname, self.name)
+        self.net_client.device_up(self.localname)
         self.up = True
 
     def shutdown(self):
@@ -237,13 +253,13 @@ class Veth(CoreInterface):
 
         if self.node:
             try:
-                self.node.check_cmd([constants.IP_BIN, "-6", "addr", "flush", "dev", self.name])
+                self.node.node_net_client.device_flush(self.name)
             except CoreCommandError:
                 logging.exception("error shutting down interface")
 
         if self.localname:
             try:
-                utils.check_cmd([constants.IP_BIN, "link", "delete", self.localname])
+                self.net_client.delete_device(self.localname)
             except CoreCommandError:
                 logging.exception("error deleting link")
 
@@ -298,7 +314,7 @@ class TunTap(CoreInterface):
             return
 
         try:
-            self.node.check_cmd([constants.IP_BIN, "-6", "addr", "flush", "dev", self.name])
+            self.node.node_net_client.device_flush(self.name)
         except CoreCommandError:
             logging.exception("error shutting down tunnel tap")
 
@@ -391,10 +407,9 @@ class TunTap(CoreInterface):
         :raises CoreCommandError: when there is a command exception
         """
         self.waitfordevicelocal()
-        netns = str(self.node.pid)
-        utils.check_cmd([constants.IP_BIN, "link", "set", self.localname, "netns", netns])
-        self.node.check_cmd([constants.IP_BIN, "link", "set", self.localname, "name", self.name])
-        self.node.check_cmd([constants.IP_BIN, "link", "set", self.name, "up"])
+        self.node.net_client.device_ns(self.localname, self.node.pid)
+        self.node.node_net_client.device_name(self.localname, self.name)
+        self.node.node_net_client.device_up(self.name)
 
     def setaddrs(self):
         """
@@ -404,7 +419,7 @@ class TunTap(CoreInterface):
         """
         self.waitfordevicenode()
         for addr in self.addrlist:
-            self.node.check_cmd([constants.IP_BIN, "addr", "add", str(addr), "dev", self.name])
+            self.node.node_net_client.create_address(self.name, addr)
 
 
 class GreTap(CoreInterface):
@@ -0,0 +1,865 @@
+"""
+Clients for creating and configuring bridges and interfaces, either by running
+ip/brctl commands or by talking rtnetlink directly from within the daemon.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import re
+import socket
+import struct
+import threading
+
+from core import CoreCommandError, utils
+from core import constants
+
+# available backends, selected using the "net_backend" configuration option
+IP_BACKEND = "ip"
+NETLINK_BACKEND = "netlink"
+
+# netlink protocol values, from linux/netlink.h and linux/rtnetlink.h
+NETLINK_ROUTE = 0
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+NLM_F_REQUEST = 0x1
+NLM_F_ACK = 0x4
+NLM_F_EXCL = 0x200
+NLM_F_CREATE = 0x400
+NLM_F_DUMP = 0x300
+RTM_NEWLINK = 16
+RTM_DELLINK = 17
+RTM_GETLINK = 18
+RTM_NEWADDR = 20
+RTM_DELADDR = 21
+RTM_GETADDR = 22
+IFLA_ADDRESS = 1
+IFLA_IFNAME = 3
+IFLA_MASTER = 10
+IFLA_LINKINFO = 18
+IFLA_NET_NS_PID = 19
+IFLA_STATS64 = 23
+IFLA_INFO_KIND = 1
+IFLA_INFO_DATA = 2
+IFLA_BR_FORWARD_DELAY = 1
+IFLA_BR_AGEING_TIME = 4
+IFLA_BR_STP_STATE = 5
+VETH_INFO_PEER = 1
+IFA_ADDRESS = 1
+IFA_LOCAL = 2
+IFA_BROADCAST = 4
+IFF_UP = 0x1
+CLONE_NEWNET = 0x40000000
+
+_NLMSGHDR = "=LHHLL"
+_NLMSGHDR_LEN = struct.calcsize(_NLMSGHDR)
+_IFINFOMSG = "=BxHiII"
+_IFINFOMSG_LEN = struct.calcsize(_IFINFOMSG)
+_IFADDRMSG = "=BBBBi"
+_IFADDRMSG_LEN = struct.calcsize(_IFADDRMSG)
+_RTATTR = "=HH"
+_RTATTR_LEN = struct.calcsize(_RTATTR)
+# leading rx/tx packet and byte counters of rtnl_link_stats64
+_LINK_STATS64 = "=QQQQ"
+_LINK_STATS64_LEN = struct.calcsize(_LINK_STATS64)
+
+_host_client = None
+_host_client_lock = threading.Lock()
+
+
+def get_net_client(backend, run, pid=None, batch=None, name=None):
+    """
+    Retrieve the net client for the configured backend. The netlink backend falls
+    back to running commands when a netlink socket cannot be created.
+
+    :param str backend: configured backend name, defaults to ip when not set
+    :param func run: function used to run commands for the command based client
+    :param int pid: pid of a process within the namespace to operate in, None for the host
+    :param func batch: function returning the active host namespace batch, if any
+    :param str name: name of the node operations are for, used to report batch errors
+    :return: net client
+    :rtype: LinuxNetClient|NetlinkNetClient
+    """
+    if backend == NETLINK_BACKEND:
+        try:
+            if pid is None:
+                return _get_host_netlink_client()
+            return NetlinkNetClient(pid)
+        except CoreCommandError:
+            logging.exception("error creating netlink client, falling back to ip commands")
+    elif backend not in (None, IP_BACKEND):
+        logging.warning("unknown net backend(%s), using ip commands", backend)
+    return LinuxNetClient(run, batch, name)
+
+
+def _get_host_netlink_client():
+    """
+    Retrieve the netlink client shared by everything operating within the host namespace.
+
+    :return: host netlink client
+    :rtype: NetlinkNetClient
+    """
+    global _host_client
+    with _host_client_lock:
+        if _host_client is None:
+            _host_client = NetlinkNetClient()
+        return _host_client
+
+
+class NetBatch(object):
+    """
+    Collects host namespace ip and tc operations, running them as a single ip -batch
+    and tc -batch command when flushed. A failure is reported for the queued command
+    that caused it, along with the node it was queued for.
+    """
+
+    def __init__(self):
+        """
+        Create a NetBatch instance.
+        """
+        self.ip_commands = []
+        self.tc_commands = []
+
+    def add(self, args, source):
+        """
+        Queue an ip or tc command.
+
+        :param list[str] args: command arguments, starting with the ip or tc binary
+        :param str source: name of the node or network the command is for
+        :return: nothing
+        """
+        if args[0] == constants.IP_BIN:
+            self.ip_commands.append((args, source))
+        elif args[0] == constants.TC_BIN:
+            self.tc_commands.append((args, source))
+        else:
+            raise ValueError("unsupported batch command: %s" % args)
+
+    def flush(self):
+        """
+        Run all queued commands, ip commands first followed by tc commands.
+
+        :return: nothing
+        :raises CoreCommandError: when a queued command fails
+        """
+        ip_commands, self.ip_commands = self.ip_commands, []
+        tc_commands, self.tc_commands = self.tc_commands, []
+        _run_batch(constants.IP_BIN, ip_commands)
+        _run_batch(constants.TC_BIN, tc_commands)
+
+
+def _run_batch(binary, commands):
+    """
+    Run commands for ip or tc using batch mode, which stops at the first failure.
+
+    :param str binary: ip or tc binary
+    :param list[tuple[list[str], str]] commands: commands and their sources
+    :return: nothing
+    :raises CoreCommandError: when a command fails, with the failed command and its source
+    """
+    if not commands:
+        return
+
+    args = [binary, "-batch", "-"]
+    lines = "".join(" ".join(command[1:]) + "\n" for command, _ in commands)
+    logging.debug("batch command: %s with %s operations", args, len(commands))
+    try:
+        utils.check_cmd(args, input=lines.encode("utf-8"))
+    except CoreCommandError as e:
+        if not e.output:
+            raise
+        output = e.output.decode("utf-8").strip()
+        match = re.search(r"Command failed -:(\d+)", output)
+        if match and int(match.group(1)) <= len(commands):
+            command, source = commands[int(match.group(1)) - 1]
+            raise CoreCommandError(e.returncode, command, "%s: %s" % (source, output))
+        raise CoreCommandError(e.returncode, args, output)
+
+
+class LinuxNetClient(object):
+    """
+    Client for creating and configuring bridges and interfaces using ip and brctl commands.
+    While a batch is active, operations nothing else depends on right away are queued to
+    it, using ip for bridge operations so they can be batched along with everything else.
+    """
+
+    def __init__(self, run, batch=None, name=None):
+        """
+        Create a LinuxNetClient instance.
+
+        :param func run: function to run commands with
+        :param func batch: function returning the active batch to queue operations to, if any
+        :param str name: name of the node operations are for, used to report batch errors
+        """
+        self.run = run
+        self.batch = batch
+        self.name = name
+
+    def _get_batch(self):
+        """
+        Retrieve the active batch, if any.
+
+        :return: active batch, None otherwise
+        :rtype: NetBatch
+        """
+        if self.batch is None:
+            return None
+        return self.batch()
+
+    def _run_ip(self, args):
+        """
+        Run an ip command, or queue it when a batch is active.
+
+        :param list[str] args: ip arguments, without the ip binary
+        :return: nothing
+        """
+        args = [constants.IP_BIN] + args
+        batch = self._get_batch()
+        if batch is None:
+            self.run(args)
+        else:
+            batch.add(args, self.name)
+
+    def close(self):
+        """
+        Nothing to release for command based clients.
+
+        :return: nothing
+        """
+        pass
+
+    def create_veth(self, name, peer):
+        """
+        Create a veth pair.
+
+        :param str name: veth name
+        :param str peer: peer name
+        :return: nothing
+        """
+        self.run([constants.IP_BIN, "link", "add", "name", name, "type", "veth", "peer", "name", peer])
+
+    def device_up(self, device):
+        """
+        Bring a device up.
+
+        :param str device: device to bring up
+        :return: nothing
+        """
+        self._run_ip(["link", "set", device, "up"])
+
+    def device_down(self, device):
+        """
+        Bring a device down.
+
+        :param str device: device to bring down
+        :return: nothing
+        """
+        self._run_ip(["link", "set", device, "down"])
+
+    def device_name(self, device, name):
+        """
+        Rename a device.
+
+        :param str device: device to rename
+        :param str name: new device name
+        :return: nothing
+        """
+        self.run([constants.IP_BIN, "link", "set", device, "name", name])
+
+    def device_ns(self, device, pid):
+        """
+        Move a device into the network namespace of a process.
+
+        :param str device: device to move
+        :param int pid: pid of a process within the target namespace
+        :return: nothing
+        """
+        self.run([constants.IP_BIN, "link", "set", device, "netns", str(pid)])
+
+    def device_mac(self, device, mac):
+        """
+        Set the hardware address of a device.
+
+        :param str device: device to set mac for
+        :param mac: mac address to set
+        :return: nothing
+        """
+        self.run([constants.IP_BIN, "link", "set", "dev", device, "address", str(mac)])
+
+    def device_flush(self, device):
+        """
+        Remove all ipv6 addresses from a device.
+
+        :param str device: device to flush
+        :return: nothing
+        """
+        self.run([constants.IP_BIN, "-6", "addr", "flush", "dev", device])
+
+    def delete_device(self, device):
+        """
+        Delete a device.
+
+        :param str device: device to delete
+        :return: nothing
+        """
+        self._run_ip(["link", "delete", device])
+
+    def get_ifindex(self, device):
+        """
+        Retrieve the interface index of a device.
+
+        :param str device: device to get index for
+        :return: interface index
+        :rtype: int
+        """
+        output = self.run([constants.IP_BIN, "link", "show", device])
+        logging.debug("interface command output: %s", output)
+        return int(output.split("\n")[0].strip().split(":")[0])
+
+    def create_address(self, device, address, broadcast=None):
+        """
+        Add an address to a device.
+
+        :param str device: device to add address to
+        :param str address: address to add, with prefix length
+        :param str broadcast: broadcast address, "+" to derive it from the prefix
+        :return: nothing
+        """
+        args = ["addr", "add", str(address)]
+        if broadcast is not None:
+            args += ["broadcast", broadcast]
+        self._run_ip(args + ["dev", device])
+
+    def delete_address(self, device, address):
+        """
+        Delete an address from a device.
+
+        :param str device: device to delete address from
+        :param str address: address to delete, with prefix length
+        :return: nothing
+        """
+        self._run_ip(["addr", "del", str(address), "dev", device])
+
+    def create_bridge(self, name):
+        """
+        Create a bridge with spanning tree and forwarding delay turned off and bring it up.
+
+        :param str name: bridge name
+        :return: nothing
+        """
+        if self._get_batch():
+            self._run_ip(["link", "add", "name", name, "type", "bridge", "stp_state", "0", "forward_delay", "0",
+                          "mcast_snooping", "0"])
+            self.device_up(name)
+            return
+        self.run([constants.BRCTL_BIN, "addbr", name])
+        self.run([constants.BRCTL_BIN, "stp", name, "off"])
+        self.run([constants.BRCTL_BIN, "setfd", name, "0"])
+        self.device_up(name)
+
+    def delete_bridge(self, name):
+        """
+        Bring a bridge down and delete it.
+
+        :param str name: bridge name
+        :return: nothing
+        """
+        self.device_down(name)
+        if self._get_batch():
+            self._run_ip(["link", "delete", name, "type", "bridge"])
+            return
+        self.run([constants.BRCTL_BIN, "delbr", name])
+
+    def set_ageing(self, name, ageing):
+        """
+        Set the mac address ageing time of a bridge, zero disables learning.
+
+        :param str name: bridge name
+        :param int ageing: ageing time in seconds
+        :return: nothing
+        """
+        if self._get_batch():
+            self._run_ip(["link", "set", "dev", name, "type", "bridge", "ageing_time", str(int(ageing) * 100)])
+            return
+        self.run([constants.BRCTL_BIN, "setageing", name, str(ageing)])
+
+    def create_interface(self, bridge, device):
+        """
+        Add a device to a bridge and bring it up.
+
+        :param str bridge: bridge name
+        :param str device: device to add
+        :return: nothing
+        """
+        if self._get_batch():
+            self._run_ip(["link", "set", "dev", device, "master", bridge])
+        else:
+            self.run([constants.BRCTL_BIN, "addif", bridge, device])
+        self.device_up(device)
+
+    def delete_interface(self, bridge, device):
+        """
+        Remove a device from a bridge.
+
+        :param str bridge: bridge name
+        :param str device: device to remove
+        :return: nothing
+        """
+        if self._get_batch():
+            self._run_ip(["link", "set", "dev", device, "nomaster"])
+            return
+        self.run([constants.BRCTL_BIN, "delif", bridge, device])
+
+
+class NetlinkNetClient(object):
+    """
+    Client for creating and configuring bridges and interfaces over a rtnetlink socket,
+    avoiding a process per operation. Operations are equivalent to LinuxNetClient.
+    """
+
+    def __init__(self, pid=None):
+        """
+        Create a NetlinkNetClient instance.
+
+        :param int pid: pid of a process within the namespace to operate in, None for the host
+        :raises CoreCommandError: when the netlink socket cannot be created
+        """
+        self.pid = pid
+        self.seq = 0
+        self.lock = threading.Lock()
+        self.sock = _netlink_socket(pid)
+
+    def close(self):
+        """
+        Close the netlink socket.
+
+        :return: nothing
+        """
+        self.sock.close()
+
+    def _request(self, message_type, flags, payload, description):
+        """
+        Send a netlink request and wait for its acknowledgement or dump completion.
+
+        :param int message_type: netlink message type
+        :param int flags: netlink flags, in addition to request and ack
+        :param bytes payload: message payload
+        :param str description: description of the request, used for errors
+        :return: payloads of response messages
+        :rtype: list[tuple[int, bytes]]
+        :raises CoreCommandError: when the kernel returns an error
+        """
+        logging.debug("netlink(%s): %s", self.pid, description)
+        with self.lock:
+            self.seq += 1
+            seq = self.seq
+            flags |= NLM_F_REQUEST | NLM_F_ACK
+            header = struct.pack(_NLMSGHDR, _NLMSGHDR_LEN + len(payload), message_type, flags, seq, 0)
+            try:
+                self.sock.send(header + payload)
+                return self._receive(seq, description)
+            except socket.error as e:
+                raise CoreCommandError(-1, description, str(e))
+
+    def _receive(self, seq, description):
+        """
+        Receive responses for a request.
+
+        :param int seq: sequence number of the request
+        :param str description: description of the request, used for errors
+        :return: payloads of response messages
+        :rtype: list[tuple[int, bytes]]
+        """
+        messages = []
+        while True:
+            data = self.sock.recv(65536)
+            offset = 0
+            while offset + _NLMSGHDR_LEN <= len(data):
+                length, message_type, _flags, message_seq, _pid = struct.unpack_from(_NLMSGHDR, data, offset)
+                if length < _NLMSGHDR_LEN:
+                    break
+                start = offset + _NLMSGHDR_LEN
+                end = offset + length
+                offset += _align(length)
+                if message_seq != seq:
+                    continue
+                if message_type == NLMSG_DONE:
+                    return messages
+                if message_type == NLMSG_ERROR:
+                    error = -struct.unpack_from("=i", data, start)[0]
+                    if error:
+                        raise CoreCommandError(error, description, os.strerror(error))
+                    return messages
+                messages.append((message_type, data[start:end]))
+
+    def _link(self, flags, index, attributes, description, ifi_flags=0, change=0):
+        """
+        Send a link request.
+
+        :param int flags: netlink flags
+        :param int index: interface index, 0 to look up the device by its name attribute
+        :param list[bytes] attributes: link attributes
+        :param str description: description of the request, used for errors
+        :param int ifi_flags: device flags
+        :param int change: device flags being changed
+        :return: nothing
+        """
+        payload = struct.pack(_IFINFOMSG, socket.AF_UNSPEC, 0, index, ifi_flags, change)
+        payload += b"".join(attributes)
+        self._request(RTM_NEWLINK, flags, payload, description)
+
+    def create_veth(self, name, peer):
+        """
+        Create a veth pair.
+
+        :param str name: veth name
+        :param str peer: peer name
+        :return: nothing
+        """
+        peer_info = struct.pack(_IFINFOMSG, socket.AF_UNSPEC, 0, 0, 0, 0) + _attr_str(IFLA_IFNAME, peer)
+        linkinfo = _attr(IFLA_LINKINFO, _attr_str(IFLA_INFO_KIND, "veth") +
+                         _attr(IFLA_INFO_DATA, _attr(VETH_INFO_PEER, peer_info)))
+        attributes = [_attr_str(IFLA_IFNAME, name), linkinfo]
+        self._link(NLM_F_CREATE | NLM_F_EXCL, 0, attributes, "create veth %s peer %s" % (name, peer))
+
+    def device_up(self, device):
+        """
+        Bring a device up.
+
+        :param str device: device to bring up
+        :return: nothing
+        """
+        attributes = [_attr_str(IFLA_IFNAME, device)]
+        self._link(0, 0, attributes, "set %s up" % device, ifi_flags=IFF_UP, change=IFF_UP)
+
+    def device_down(self, device):
+        """
+        Bring a device down.
+
+        :param str device: device to bring down
+        :return: nothing
+        """
+        attributes = [_attr_str(IFLA_IFNAME, device)]
+        self._link(0, 0, attributes, "set %s down" % device, change=IFF_UP)
+
+    def device_name(self, device, name):
+        """
+        Rename a device.
+
+        :param str device: device to rename
+        :param str name: new device name
+        :return: nothing
+        """
+        index = self.get_ifindex(device)
+        attributes = [_attr_str(IFLA_IFNAME, name)]
+        self._link(0, index, attributes, "set %s name %s" % (device, name))
+
+    def device_ns(self, device, pid):
+        """
+        Move a device into the network namespace of a process.
+
+        :param str device: device to move
+        :param int pid: pid of a process within the target namespace
+        :return: nothing
+        """
+        attributes = [_attr_str(IFLA_IFNAME, device), _attr_u32(IFLA_NET_NS_PID, int(pid))]
+        self._link(0, 0, attributes, "set %s netns %s" % (device, pid))
+
+    def device_mac(self, device, mac):
+        """
+        Set the hardware address of a device.
+
+        :param str device: device to set mac for
+        :param mac: mac address to set
+        :return: nothing
+        """
+        address = b"".join(struct.pack("B", int(x, 16)) for x in str(mac).split(":"))
+        attributes = [_attr_str(IFLA_IFNAME, device), _attr(IFLA_ADDRESS, address)]
+        self._link(0, 0, attributes, "set %s address %s" % (device, mac))
+
+    def device_flush(self, device):
+        """
+        Remove all ipv6 addresses from a device.
+
+        :param str device: device to flush
+        :return: nothing
+        """
+        index = self.get_ifindex(device)
+        payload = struct.pack(_IFADDRMSG, socket.AF_INET6, 0, 0, 0, index)
+        description = "flush ipv6 addresses for %s" % device
+        for _message_type, data in self._request(RTM_GETADDR, NLM_F_DUMP, payload, description):
+            family, prefixlen, _flags, _scope, address_index = struct.unpack_from(_IFADDRMSG, data)
+            if family != socket.AF_INET6 or address_index != index:
+                continue
+            attributes = _parse_attrs(data, _IFADDRMSG_LEN)
+            address = attributes.get(IFA_ADDRESS)
+            if address is None:
+                continue
+            payload = struct.pack(_IFADDRMSG, family, prefixlen, 0, 0, index) + _attr(IFA_ADDRESS, address)
+            self._request(RTM_DELADDR, 0, payload, description)
+
+    def delete_device(self, device):
+        """
+        Delete a device.
+
+        :param str device: device to delete
+        :return: nothing
+        """
+        payload = struct.pack(_IFINFOMSG, socket.AF_UNSPEC, 0, 0, 0, 0) + _attr_str(IFLA_IFNAME, device)
+        self._request(RTM_DELLINK, 0, payload, "delete %s" % device)
+
+    def get_ifindex(self, device):
+        """
+        Retrieve the interface index of a device.
+
+        :param str device: device to get index for
+        :return: interface index
+        :rtype: int
+        """
+        payload = struct.pack(_IFINFOMSG, socket.AF_UNSPEC, 0, 0, 0, 0) + _attr_str(IFLA_IFNAME, device)
+        messages = self._request(RTM_GETLINK, 0, payload, "get index for %s" % device)
+        for message_type, data in messages:
+            if message_type == RTM_NEWLINK:
+                return struct.unpack_from(_IFINFOMSG, data)[2]
+        raise CoreCommandError(-1, "get index for %s" % device, "device not found")
+
+    def get_link_stats(self):
+        """
+        Retrieve the byte counters of all devices with a single dump.
+
+        :return: received and transmitted bytes by device name
+        :rtype: dict[str, tuple[int, int]]
+        """
+        payload = struct.pack(_IFINFOMSG, socket.AF_UNSPEC, 0, 0, 0, 0)
+        stats = {}
+        for message_type, data in self._request(RTM_GETLINK, NLM_F_DUMP, payload, "get link stats"):
+            if message_type != RTM_NEWLINK:
+                continue
+            attributes = _parse_attrs(data, _IFINFOMSG_LEN)
+            name = attributes.get(IFLA_IFNAME)
+            counters = attributes.get(IFLA_STATS64)
+            if name is None or counters is None or len(counters) < _LINK_STATS64_LEN:
+                continue
+            _rx_packets, _tx_packets, rx_bytes, tx_bytes = struct.unpack_from(_LINK_STATS64, counters)
+            stats[name.rstrip(b"\0").decode("utf-8")] = (rx_bytes, tx_bytes)
+        return stats
+
+    def create_address(self, device, address, broadcast=None):
+        """
+        Add an address to a device.
+
+        :param str device: device to add address to
+        :param str address: address to add, with prefix length
+        :param str broadcast: broadcast address, "+" to derive it from the prefix
+        :return: nothing
+        """
+        family, packed, prefixlen = _parse_address(address)
+        index = self.get_ifindex(device)
+        payload = struct.pack(_IFADDRMSG, family, prefixlen, 0, 0, index)
+        payload += _attr(IFA_LOCAL, packed) + _attr(IFA_ADDRESS, packed)
+        if family == socket.AF_INET and broadcast is not None:
+            if broadcast == "+":
+                value = struct.unpack("!I", packed)[0] | ((1 << (32 - prefixlen)) - 1)
+                broadcast = struct.pack("!I", value)
+            else:
+                broadcast = socket.inet_pton(socket.AF_INET, broadcast)
+            payload += _attr(IFA_BROADCAST, broadcast)
+        self._request(RTM_NEWADDR, NLM_F_CREATE | NLM_F_EXCL, payload, "add %s to %s" % (address, device))
+
+    def delete_address(self, device, address):
+        """
+        Delete an address from a device.
+
+        :param str device: device to delete address from
+        :param str address: address to delete, with prefix length
+        :return: nothing
+        """
+        family, packed, prefixlen = _parse_address(address)
+        index = self.get_ifindex(device)
+        payload = struct.pack(_IFADDRMSG, family, prefixlen, 0, 0, index)
+        payload += _attr(IFA_LOCAL, packed) + _attr(IFA_ADDRESS, packed)
+        self._request(RTM_DELADDR, 0, payload, "delete %s from %s" % (address, device))
+
+    def create_bridge(self, name):
+        """
+        Create a bridge with spanning tree and forwarding delay turned off and bring it up.
+
+        :param str name: bridge name
+        :return: nothing
+        """
+        data = _attr_u32(IFLA_BR_STP_STATE, 0) + _attr_u32(IFLA_BR_FORWARD_DELAY, 0)
+        linkinfo = _attr(IFLA_LINKINFO, _attr_str(IFLA_INFO_KIND, "bridge") + _attr(IFLA_INFO_DATA, data))
+        attributes = [_attr_str(IFLA_IFNAME, name), linkinfo]
+        self._link(NLM_F_CREATE | NLM_F_EXCL, 0, attributes, "create bridge %s" % name,
+                   ifi_flags=IFF_UP, change=IFF_UP)
+
+    def delete_bridge(self, name):
+        """
+        Bring a bridge down and delete it.
+
+        :param str name: bridge name
+        :return: nothing
+        """
+        self.device_down(name)
+        self.delete_device(name)
+
+    def set_ageing(self, name, ageing):
+        """
+        Set the mac address ageing time of a bridge, zero disables learning.
+
+        :param str name: bridge name
+        :param int ageing: ageing time in seconds
+        :return: nothing
+        """
+        linkinfo = _attr(IFLA_LINKINFO, _attr_str(IFLA_INFO_KIND, "bridge") +
+                         _attr(IFLA_INFO_DATA, _attr_u32(IFLA_BR_AGEING_TIME, int(ageing) * 100)))
+        attributes = [_attr_str(IFLA_IFNAME, name), linkinfo]
+        self._link(0, 0, attributes, "set bridge %s ageing %s" % (name, ageing))
+
+    def create_interface(self, bridge, device):
+        """
+        Add a device to a bridge and bring it up.
+
+        :param str bridge: bridge name
+        :param str device: device to add
+        :return: nothing
+        """
+        master = self.get_ifindex(bridge)
+        attributes = [_attr_str(IFLA_IFNAME, device), _attr_u32(IFLA_MASTER, master)]
+        self._link(0, 0, attributes, "add %s to bridge %s" % (device, bridge), ifi_flags=IFF_UP, change=IFF_UP)
+
+    def delete_interface(self, bridge, device):
+        """
+        Remove a device from a bridge.
+
+        :param str bridge: bridge name
+        :param str device: device to remove
+        :return: nothing
+        """
+        attributes = [_attr_str(IFLA_IFNAME, device), _attr_u32(IFLA_MASTER, 0)]
+        self._link(0, 0, attributes, "remove %s from bridge %s" % (device, bridge))
+
+
+def _align(length):
+    """
+    Align a length to the 4 byte boundary used by netlink.
+
+    :param int length: length to align
+    :return: aligned length
+    :rtype: int
+    """
+    return (length + 3) & ~3
+
+
+def _attr(attr_type, value):
+    """
+    Pack a netlink attribute, including padding.
+
+    :param int attr_type: attribute type
+    :param bytes value: attribute value
+    :return: packed attribute
+    :rtype: bytes
+    """
+    length = _RTATTR_LEN + len(value)
+    padding = b"\0" * (_align(length) - length)
+    return struct.pack(_RTATTR, length, attr_type) + value + padding
+
+
+def _attr_str(attr_type, value):
+    """
+    Pack a null terminated string netlink attribute.
+
+    :param int attr_type: attribute type
+    :param str value: attribute value
+    :return: packed attribute
+    :rtype: bytes
+    """
+    return _attr(attr_type, value.encode("utf-8") + b"\0")
+
+
+def _attr_u32(attr_type, value):
+    """
+    Pack an unsigned 32 bit netlink attribute.
+
+    :param int attr_type: attribute type
+    :param int value: attribute value
+    :return: packed attribute
+    :rtype: bytes
+    """
+    return _attr(attr_type, struct.pack("=I", value))
+
+
+def _parse_attrs(data, offset):
+    """
+    Parse the top level attributes of a netlink message payload.
+
+    :param bytes data: message payload
+    :param int offset: offset attributes start at
+    :return: attribute values by type
+    :rtype: dict
+    """
+    attributes = {}
+    while offset + _RTATTR_LEN <= len(data):
+        length, attr_type = struct.unpack_from(_RTATTR, data, offset)
+        if length < _RTATTR_LEN:
+            break
+        attributes[attr_type] = data[offset + _RTATTR_LEN:offset + length]
+        offset += _align(length)
+    return attributes
+
+
+def _parse_address(address):
+    """
+    Parse an address with prefix length.
+
+    :param str address: address to parse, prefix length defaults to the full address length
+    :return: address family, packed address, and prefix length
+    :rtype: tuple[int, bytes, int]
+    """
+    ip, _sep, prefixlen = str(address).partition("/")
+    family = socket.AF_INET6 if ":" in ip else socket.AF_INET
+    packed = socket.inet_pton(family, ip)
+    if prefixlen:
+        prefixlen = int(prefixlen)
+    else:
+        prefixlen = len(packed) * 8
+    return family, packed, prefixlen
+
+
+def _netlink_socket(pid=None):
+    """
+    Create a rtnetlink socket. When a pid is provided the socket is created from a
+    short lived thread that joins the network namespace of that process, the socket
+    stays bound to that namespace afterwards.
+
+    :param int pid: pid of a process within the namespace to create the socket in
+    :return: netlink socket
+    :raises CoreCommandError: when the socket cannot be created
+    """
+    result = {}
+
+    def create():
+        try:
+            if pid is not None:
+                libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+                with open("/proc/%s/ns/net" % pid) as ns_file:
+                    if libc.setns(ns_file.fileno(), CLONE_NEWNET) != 0:
+                        error = ctypes.get_errno()
+                        raise OSError(error, os.strerror(error))
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+            sock.bind((0, 0))
+            result["socket"] = sock
+        except (AttributeError, IOError, OSError) as e:
+            result["error"] = e
+
+    if pid is None:
+        create()
+    else:
+        thread = threading.Thread(target=create)
+        thread.start()
+        thread.join()
+
+    if "error" in result:
+        raise CoreCommandError(-1, "netlink socket for namespace(%s)" % pid, str(result["error"]))
+    return result["socket"]
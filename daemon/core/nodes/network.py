@@ -27,12 +27,25 @@ utils.check_executables([
 
 ebtables_lock = threading.Lock()
 
+# available wlan filtering backends, selected using the "wlan_backend" configuration option
+EBTABLES_BACKEND = "ebtables"
+NFTABLES_BACKEND = "nftables"
+
 
 class EbtablesQueue(object):
     """
     Helper class for queuing up ebtables commands into rate-limited
     atomic commits. This improves performance and reliability when there are
     many WLAN link updates.
+
+    The queue keeps the rules committed for each WLAN chain and tracks the pairs
+    linked or unlinked and interfaces detached since the last commit, so a commit
+    only inserts and deletes the rules for what changed.
+
+    When ebtables-save and ebtables-restore are available, each commit applies the
+    inserted and deleted rules of all updated WLANs to the saved filter table in
+    memory, and loads it using a single ebtables-restore. Otherwise each inserted or
+    deleted rule is applied to an atomic file using its own ebtables command.
     """
     # update rate is every 300ms
     rate = 0.3
@@ -55,6 +68,20 @@ class EbtablesQueue(object):
         # timestamps of last WLAN update; this keeps track of WLANs that are
         # using this queue
         self.last_update_time = {}
+        # committed rules of each WLAN chain, by interface pair
+        self.rules = {}
+        # link state changes for each WLAN since the last commit, by interface pair
+        self.deltas = {}
+        # interfaces detached from each WLAN since the last commit
+        self.detached = {}
+        # WLANs whose chain needs to be rebuilt from scratch
+        self.rebuild = set()
+        # commit instrumentation, rules and wall time for the last commit and totals
+        self.commits = 0
+        self.commit_rules = 0
+        self.commit_time = 0.0
+        self.last_commit_rules = 0
+        self.last_commit_time = 0.0
 
     def startupdateloop(self, wlan):
         """
@@ -84,6 +111,10 @@ class EbtablesQueue(object):
                 del self.last_update_time[wlan]
             except KeyError:
                 logging.exception("error deleting last update time for wlan, ignored before: %s", wlan)
+            self.rules.pop(wlan, None)
+            self.deltas.pop(wlan, None)
+            self.detached.pop(wlan, None)
+            self.rebuild.discard(wlan)
 
         if len(self.last_update_time) > 0:
             return
@@ -142,7 +173,8 @@ class EbtablesQueue(object):
         """
         while self.doupdateloop:
             with self.updatelock:
-                for wlan in self.updates:
+                wlans = []
+                for wlan in list(self.updates):
                     # Check if wlan is from a previously closed session. Because of the
                     # rate limiting scheme employed here, this may happen if a new session
                     # is started soon after closing a previous session.
@@ -155,27 +187,109 @@ class EbtablesQueue(object):
                         continue
 
                     if self.lastupdate(wlan) > self.rate:
-                        self.buildcmds(wlan)
-                        self.ebcommit(wlan)
+                        wlans.append(wlan)
+
+                if wlans:
+                    try:
+                        self.commit(wlans)
+                    except CoreCommandError:
+                        logging.exception("error committing ebtables rules")
+                    for wlan in wlans:
                         self.updated(wlan)
 
             time.sleep(self.rate)
 
-    def ebcommit(self, wlan):
+    def commit(self, wlans):
+        """
+        Update the ebtables chains for the given WLANs in a single commit, recording
+        the number of inserted and deleted rules and wall time taken. Chains are rebuilt
+        from scratch when a commit fails.
+
+        :param list wlans: wlans to update chains for
+        :return: nothing
+        :raises CoreCommandError: when there is a command exception
+        """
+        start = time.time()
+        chains = {}
+        rules = 0
+        for wlan in wlans:
+            rebuild, added, deleted = self.buildchanges(wlan)
+            if not rebuild and not added and not deleted:
+                continue
+            rules += len(added) + len(deleted)
+            chains[wlan.brname] = (rebuild, added, deleted, wlan)
+
+        if not chains:
+            return
+
+        try:
+            if constants.EBTABLES_SAVE_BIN and constants.EBTABLES_RESTORE_BIN:
+                self.ebrestore(chains)
+            else:
+                for brname in chains:
+                    rebuild, added, deleted, _ = chains[brname]
+                    if rebuild:
+                        self.cmds.append(["-F", brname])
+                    else:
+                        self.cmds.extend(["-D"] + rule[1:] for rule in deleted)
+                    self.cmds.extend(added)
+                self.ebcommit()
+        except CoreCommandError:
+            self.rebuild.update(wlans)
+            raise
+
+        elapsed = time.time() - start
+        self.commits += 1
+        self.commit_rules += rules
+        self.commit_time += elapsed
+        self.last_commit_rules = rules
+        self.last_commit_time = elapsed
+        logging.info("ebtables commit: wlans(%s) rules(%s) time(%.3fs)", len(wlans), rules, elapsed)
+
+    def ebrestore(self, chains):
+        """
+        Apply changes to the given chains using a single ebtables-restore of the filter
+        table, keeping all other chains and rules as currently in the kernel. Rebuilt
+        chains are replaced, while other chains only have rules inserted and deleted.
+
+        :param dict chains: rebuild flag, rules inserted, rules deleted, and wlan for each
+            chain, rules are lists of ebtables arguments
+        :return: nothing
+        :raises CoreCommandError: when there is a command exception
+        """
+        replace = {}
+        deltas = {}
+        for brname in chains:
+            rebuild, added, deleted, wlan = chains[brname]
+            if rebuild:
+                replace[brname] = added
+            else:
+                deltas[brname] = (added, deleted, self.chainrules(wlan))
+
+        with ebtables_lock:
+            saved = utils.check_cmd([constants.EBTABLES_SAVE_BIN])
+            data = ebtables_filter(saved, replace, deltas)
+            if data is None:
+                logging.warning("ebtables filter table not found, not restoring")
+                return
+            utils.check_cmd([constants.EBTABLES_RESTORE_BIN], input=data.encode("utf-8"))
+
+    def ebcommit(self):
         """
         Perform ebtables atomic commit using commands built in the self.cmds list.
 
         :return: nothing
         """
+        cmds, self.cmds = self.cmds, []
+
         # save kernel ebtables snapshot to a file
         args = self.ebatomiccmd(["--atomic-save", ])
         utils.check_cmd(args)
 
         # modify the table file using queued ebtables commands
-        for c in self.cmds:
+        for c in cmds:
             args = self.ebatomiccmd(c)
             utils.check_cmd(args)
-        self.cmds = []
 
         # commit the table file to the kernel
         args = self.ebatomiccmd(["--atomic-commit", ])
@@ -186,39 +300,115 @@ class EbtablesQueue(object):
         except OSError:
             logging.exception("error removing atomic file: %s", self.atomic_file)
 
-    def ebchange(self, wlan):
+    def ebchange(self, wlan, netif1=None, netif2=None, linked=None):
         """
         Flag a change to the given WLAN"s _linked dict, so the ebtables
-        chain will be rebuilt at the next interval.
+        chain will be updated at the next interval. The chain is rebuilt
+        from scratch when no interface pair is given.
 
+        :param wlan: wlan entity
+        :param core.nodes.interface.CoreInterface netif1: interface one of the changed pair
+        :param core.nodes.interface.CoreInterface netif2: interface two of the changed pair
+        :param bool linked: True if the pair is now linked, False otherwise
         :return: nothing
         """
         with self.updatelock:
+            if netif1 is None or netif2 is None:
+                self.rebuild.add(wlan)
+            else:
+                self.deltas.setdefault(wlan, {})[(netif1, netif2)] = linked
             if wlan not in self.updates:
                 self.updates.append(wlan)
 
-    def buildcmds(self, wlan):
+    def ebdetach(self, wlan, netif):
         """
-        Inspect a _linked dict from a wlan, and rebuild the ebtables chain for that WLAN.
+        Flag an interface detached from the given WLAN, so rules for it will be
+        deleted at the next interval.
 
+        :param wlan: wlan entity
+        :param core.nodes.interface.CoreInterface netif: detached interface
         :return: nothing
         """
-        with wlan._linked_lock:
-            # flush the chain
-            self.cmds.extend([["-F", wlan.brname], ])
-            # rebuild the chain
-            for netif1, v in wlan._linked.items():
-                for netif2, linked in v.items():
-                    if wlan.policy == "DROP" and linked:
-                        self.cmds.extend([["-A", wlan.brname, "-i", netif1.localname,
-                                           "-o", netif2.localname, "-j", "ACCEPT"],
-                                          ["-A", wlan.brname, "-o", netif1.localname,
-                                           "-i", netif2.localname, "-j", "ACCEPT"]])
-                    elif wlan.policy == "ACCEPT" and not linked:
-                        self.cmds.extend([["-A", wlan.brname, "-i", netif1.localname,
-                                           "-o", netif2.localname, "-j", "DROP"],
-                                          ["-A", wlan.brname, "-o", netif1.localname,
-                                           "-i", netif2.localname, "-j", "DROP"]])
+        with self.updatelock:
+            self.detached.setdefault(wlan, set()).add(netif)
+            if wlan not in self.updates:
+                self.updates.append(wlan)
+
+    def pairrules(self, wlan, netif1, netif2, linked):
+        """
+        Build the rules needed for a pair of interfaces, given their link state and the WLAN policy.
+
+        :param wlan: wlan entity
+        :param core.nodes.interface.CoreInterface netif1: interface one
+        :param core.nodes.interface.CoreInterface netif2: interface two
+        :param bool linked: True if the pair is linked, False otherwise
+        :return: rules for the pair, as lists of ebtables arguments
+        :rtype: list[list[str]]
+        """
+        if wlan.policy == "DROP" and linked:
+            target = "ACCEPT"
+        elif wlan.policy == "ACCEPT" and not linked:
+            target = "DROP"
+        else:
+            return []
+        return [["-A", wlan.brname, "-i", netif1.localname, "-o", netif2.localname, "-j", target],
+                ["-A", wlan.brname, "-i", netif2.localname, "-o", netif1.localname, "-j", target]]
+
+    def buildchanges(self, wlan):
+        """
+        Apply the changes tracked for a WLAN to its committed rules, expected to be
+        called with the update lock held.
+
+        :param wlan: wlan entity
+        :return: True when the chain is rebuilt from scratch, and the rules inserted and deleted
+        :rtype: tuple[bool, list[list[str]], list[list[str]]]
+        """
+        rules = self.rules.setdefault(wlan, {})
+        deltas = self.deltas.pop(wlan, {})
+        detached = self.detached.pop(wlan, set())
+        rebuild = wlan in self.rebuild
+        added = []
+        deleted = []
+
+        if rebuild:
+            self.rebuild.discard(wlan)
+            rules.clear()
+            with wlan._linked_lock:
+                deltas = {}
+                for netif1, v in wlan._linked.items():
+                    for netif2, linked in v.items():
+                        deltas[(netif1, netif2)] = linked
+
+        if detached:
+            for pair in list(rules):
+                if pair[0] in detached or pair[1] in detached:
+                    deleted.extend(rules.pop(pair))
+
+        for pair, linked in deltas.items():
+            if pair[0] in detached or pair[1] in detached:
+                continue
+            wanted = self.pairrules(wlan, pair[0], pair[1], linked)
+            current = rules.get(pair, [])
+            if wanted == current:
+                continue
+            deleted.extend(current)
+            added.extend(wanted)
+            if wanted:
+                rules[pair] = wanted
+            else:
+                rules.pop(pair, None)
+
+        return rebuild, added, deleted
+
+    def chainrules(self, wlan):
+        """
+        Retrieve all committed rules for a WLAN chain.
+
+        :param wlan: wlan entity
+        :return: rules for the chain, as lists of ebtables arguments
+        :rtype: list[list[str]]
+        """
+        return [rule for pair_rules in self.rules.get(wlan, {}).values() for rule in pair_rules]
 
 
 # a global object because all WLANs share the same queue
@@ -226,6 +416,318 @@ class EbtablesQueue(object):
 ebq = EbtablesQueue()
 
 
+class NftablesQueue(object):
+    """
+    Helper class for queuing up changes to the nftables sets of linked interface pairs
+    used by WLANs, applied in rate-limited transactions. A link or unlink only adds or
+    deletes set elements, rather than rebuilding the rules for the whole WLAN.
+    """
+    # update rate is every 300ms
+    rate = 0.3
+
+    def __init__(self):
+        """
+        Initialize the helper class, but don't start the update thread
+        until a WLAN is instantiated.
+        """
+        self.doupdateloop = False
+        self.updatethread = None
+        # this lock protects changes and elements
+        self.updatelock = threading.Lock()
+        # pending set membership changes for each WLAN, by interface name pair
+        self.changes = {}
+        # interface name pairs currently in the set of each WLAN
+        self.elements = {}
+
+    @staticmethod
+    def table(wlan):
+        """
+        Name of the nftables table for a WLAN.
+
+        :param wlan: wlan entity
+        :return: table name
+        :rtype: str
+        """
+        return "core_%s" % wlan.brname.replace(".", "_")
+
+    def startup(self, wlan):
+        """
+        Create the table, set, and forwarding chain for a WLAN and kick off the update loop.
+        Traffic bridged by the WLAN is only forwarded between linked interfaces for the DROP
+        policy, or dropped between unlinked interfaces for the ACCEPT policy.
+
+        :param wlan: wlan entity
+        :return: nothing
+        :raises CoreCommandError: when there is a command exception
+        """
+        table = self.table(wlan)
+        if wlan.policy == "DROP":
+            rules = ["iifname . oifname @links accept", "drop"]
+        else:
+            rules = ["iifname . oifname @links drop"]
+        lines = [
+            "add table bridge %s" % table,
+            "add set bridge %s links { type ifname . ifname ; }" % table,
+            "add chain bridge %s forward { type filter hook forward priority 0 ; policy accept ; }" % table,
+            "add rule bridge %s forward meta ibrname != \"%s\" accept" % (table, wlan.brname),
+        ]
+        lines.extend("add rule bridge %s forward %s" % (table, rule) for rule in rules)
+        nftcmd(lines)
+
+        with self.updatelock:
+            self.changes[wlan] = {}
+            self.elements[wlan] = set()
+
+        if self.doupdateloop:
+            return
+
+        self.doupdateloop = True
+        self.updatethread = threading.Thread(target=self.updateloop)
+        self.updatethread.daemon = True
+        self.updatethread.start()
+
+    def shutdown(self, wlan):
+        """
+        Delete the table for a WLAN, and kill the update loop thread if there are no more
+        WLANs using it.
+
+        :param wlan: wlan entity
+        :return: nothing
+        :raises CoreCommandError: when there is a command exception
+        """
+        with self.updatelock:
+            self.changes.pop(wlan, None)
+            self.elements.pop(wlan, None)
+            remaining = len(self.elements)
+
+        if not remaining:
+            self.doupdateloop = False
+            if self.updatethread:
+                self.updatethread.join()
+                self.updatethread = None
+
+        nftcmd(["delete table bridge %s" % self.table(wlan)])
+
+    def change(self, wlan, netif1, netif2, linked):
+        """
+        Queue a change in link state between two interfaces of a WLAN.
+
+        :param wlan: wlan entity
+        :param core.nodes.interface.CoreInterface netif1: interface one
+        :param core.nodes.interface.CoreInterface netif2: interface two
+        :param bool linked: True if the interfaces are now linked, False otherwise
+        :return: nothing
+        """
+        member = linked if wlan.policy == "DROP" else not linked
+        with self.updatelock:
+            changes = self.changes.get(wlan)
+            if changes is None:
+                return
+            changes[(netif1.localname, netif2.localname)] = member
+            changes[(netif2.localname, netif1.localname)] = member
+
+    def detach(self, wlan, netif):
+        """
+        Queue removal of all set elements for an interface detached from a WLAN.
+
+        :param wlan: wlan entity
+        :param core.nodes.interface.CoreInterface netif: detached interface
+        :return: nothing
+        """
+        with self.updatelock:
+            changes = self.changes.get(wlan)
+            if changes is None:
+                return
+            for pair in list(self.elements[wlan]) + list(changes):
+                if netif.localname in pair:
+                    changes[pair] = False
+
+    def updateloop(self):
+        """
+        Thread target that applies queued changes for all WLANs in a single transaction.
+
+        :return: nothing
+        """
+        while self.doupdateloop:
+            with self.updatelock:
+                try:
+                    self.commit()
+                except CoreCommandError:
+                    logging.exception("error committing nftables changes")
+            time.sleep(self.rate)
+
+    def commit(self):
+        """
+        Apply queued changes that differ from the current set elements, expected to be
+        called with the update lock held.
+
+        :return: nothing
+        :raises CoreCommandError: when there is a command exception
+        """
+        lines = []
+        applied = []
+        for wlan, changes in self.changes.items():
+            if not changes:
+                continue
+            elements = self.elements[wlan]
+            add = [pair for pair, member in changes.items() if member and pair not in elements]
+            delete = [pair for pair, member in changes.items() if not member and pair in elements]
+            table = self.table(wlan)
+            if add:
+                lines.append("add element bridge %s links { %s }" % (table, nftelements(add)))
+            if delete:
+                lines.append("delete element bridge %s links { %s }" % (table, nftelements(delete)))
+            applied.append((wlan, add, delete))
+
+        start = time.time()
+        try:
+            if lines:
+                nftcmd(lines)
+        except CoreCommandError:
+            for wlan, _, _ in applied:
+                self.resync(wlan)
+            raise
+
+        for wlan, add, delete in applied:
+            self.changes[wlan].clear()
+            self.elements[wlan].update(add)
+            self.elements[wlan].difference_update(delete)
+        if lines:
+            logging.debug("nftables commit: changes(%s) time(%.3fs)",
+                          sum(len(add) + len(delete) for _, add, delete in applied), time.time() - start)
+
+    def resync(self, wlan):
+        """
+        Rebuild the set of a WLAN from its linked interfaces, after a failed transaction left
+        the set unknown, expected to be called with the update lock held. Queued changes are
+        kept when the rebuild fails, to be applied by a later commit.
+
+        :param wlan: wlan entity
+        :return: nothing
+        """
+        member = wlan.policy == "DROP"
+        pairs = set()
+        with wlan._linked_lock:
+            for netif1 in wlan._linked:
+                for netif2, linked in wlan._linked[netif1].items():
+                    if linked == member:
+                        pairs.add((netif1.localname, netif2.localname))
+                        pairs.add((netif2.localname, netif1.localname))
+
+        table = self.table(wlan)
+        lines = ["flush set bridge %s links" % table]
+        if pairs:
+            lines.append("add element bridge %s links { %s }" % (table, nftelements(sorted(pairs))))
+        try:
+            nftcmd(lines)
+        except CoreCommandError:
+            logging.exception("error rebuilding nftables set: %s", table)
+            return
+        self.changes[wlan].clear()
+        self.elements[wlan] = pairs
+
+
+# a global object because all WLANs share the same queue
+nftq = NftablesQueue()
+
+
+def nftelements(pairs):
+    """
+    Format interface name pairs as nftables set elements.
+
+    :param list[tuple[str, str]] pairs: interface name pairs
+    :return: set elements
+    :rtype: str
+    """
+    return ", ".join("\"%s\" . \"%s\"" % pair for pair in pairs)
+
+
+def nftcmd(lines):
+    """
+    Apply nftables commands as a single transaction.
+
+    :param list[str] lines: nft commands
+    :return: nothing
+    :raises CoreCommandError: when there is a command exception
+    """
+    data = "\n".join(lines) + "\n"
+    utils.check_cmd([constants.NFT_BIN, "-f", "-"], input=data.encode("utf-8"))
+
+
+def ebtables_filter(saved, chains, deltas=None):
+    """
+    Render the filter table for ebtables-restore from ebtables-save output, replacing
+    the rules of the given chains, and inserting and deleting rules of the chains with
+    deltas. A chain with deltas is replaced when a rule to delete is not in the saved
+    output. Rules for chains that no longer exist are dropped.
+
+    :param str saved: ebtables-save output
+    :param dict chains: rules for each chain to replace, rules are lists of ebtables arguments
+    :param dict deltas: rules to insert, rules to delete, and all rules, for each chain to update
+    :return: filter table for ebtables-restore, None when the saved output has no filter table
+    :rtype: str
+    """
+    deltas = deltas or {}
+    lines = []
+    declared = set()
+    saved_rules = dict((chain, set()) for chain in deltas)
+    in_filter = False
+    for line in saved.split("\n"):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("*"):
+            in_filter = line == "*filter"
+            if in_filter:
+                lines.append(line)
+            continue
+        if not in_filter:
+            continue
+        args = line.split()
+        if args[0].startswith(":"):
+            declared.add(args[0][1:])
+        elif args[0] == "-A" and len(args) > 1 and args[1] in saved_rules:
+            saved_rules[args[1]].add(tuple(args))
+        lines.append(line)
+
+    if not lines:
+        return None
+
+    # rules are deleted in place when all are found, otherwise the chain is replaced
+    replace = dict(chains)
+    inserts = {}
+    deletes = {}
+    for chain in deltas:
+        added, deleted, rules = deltas[chain]
+        deleted = set(tuple(rule) for rule in deleted)
+        if deleted <= saved_rules[chain]:
+            inserts[chain] = added
+            deletes[chain] = deleted
+        else:
+            logging.debug("ebtables rules to delete not found, replacing chain: %s", chain)
+            replace[chain] = rules
+
+    result = []
+    for line in lines:
+        args = line.split()
+        if args[0] == "-A" and len(args) > 1:
+            if args[1] in replace or tuple(args) in deletes.get(args[1], ()):
+                continue
+        result.append(line)
+
+    commit = result[-1] == "COMMIT"
+    if commit:
+        result.pop()
+    for rules in (replace, inserts):
+        for chain in sorted(rules):
+            if chain not in declared:
+                continue
+            result.extend(" ".join(rule) for rule in rules[chain])
+    if commit:
+        result.append("COMMIT")
+    return "\n".join(result) + "\n"
+
+
 def ebtablescmds(call, cmds):
     """
     Run ebtable commands.
@@ -275,17 +777,12 @@ class CoreNetwork(CoreNetworkBase):
         :return: nothing
         :raises CoreCommandError: when there is a command exception
         """
-        utils.check_cmd([constants.BRCTL_BIN, "addbr", self.brname])
+        # create bridge with spanning tree protocol and forwarding delay turned off
+        self.net_client.create_bridge(self.brname)
+
+        # setup filtering of traffic between interfaces
+        self.filter_startup()
 
-        # turn off spanning tree protocol and forwarding delay
-        utils.check_cmd([constants.BRCTL_BIN, "stp", self.brname, "off"])
-        utils.check_cmd([constants.BRCTL_BIN, "setfd", self.brname, "0"])
-        utils.check_cmd([constants.IP_BIN, "link", "set", self.brname, "up"])
-        # create a new ebtables chain for this bridge
-        ebtablescmds(utils.check_cmd, [
-            [constants.EBTABLES_BIN, "-N", self.brname, "-P", self.policy],
-            [constants.EBTABLES_BIN, "-A", "FORWARD", "--logical-in", self.brname, "-j", self.brname]
-        ])
         # turn off multicast snooping so mcast forwarding occurs w/o IGMP joins
         snoop = "/sys/devices/virtual/net/%s/bridge/multicast_snooping" % self.brname
         if os.path.exists(snoop):
@@ -294,6 +791,50 @@ class CoreNetwork(CoreNetworkBase):
 
         self.up = True
 
+    def filter_startup(self):
+        """
+        Create the ebtables chain used to filter traffic between interfaces of this bridge.
+
+        :return: nothing
+        :raises CoreCommandError: when there is a command exception
+        """
+        ebtablescmds(utils.check_cmd, [
+            [constants.EBTABLES_BIN, "-N", self.brname, "-P", self.policy],
+            [constants.EBTABLES_BIN, "-A", "FORWARD", "--logical-in", self.brname, "-j", self.brname]
+        ])
+
+    def filter_shutdown(self):
+        """
+        Remove the ebtables chain used to filter traffic between interfaces of this bridge.
+
+        :return: nothing
+        :raises CoreCommandError: when there is a command exception
+        """
+        ebtablescmds(utils.check_cmd, [
+            [constants.EBTABLES_BIN, "-D", "FORWARD", "--logical-in", self.brname, "-j", self.brname],
+            [constants.EBTABLES_BIN, "-X", self.brname]
+        ])
+
+    def filter_changed(self, netif1, netif2, linked):
+        """
+        Flag a change in link state between two interfaces, so filtering gets updated.
+
+        :param core.nodes.interface.CoreInterface netif1: interface one
+        :param core.nodes.interface.CoreInterface netif2: interface two
+        :param bool linked: True if the interfaces are now linked, False otherwise
+        :return: nothing
+        """
+        ebq.ebchange(self, netif1, netif2, linked)
+
+    def filter_detached(self, netif):
+        """
+        Flag an interface detached, so filtering for it gets removed.
+
+        :param core.nodes.interface.CoreInterface netif: detached interface
+        :return: nothing
+        """
+        ebq.ebdetach(self, netif)
+
     def shutdown(self):
         """
         Linux bridge shutdown logic.
@@ -306,12 +847,8 @@ class CoreNetwork(CoreNetworkBase):
         ebq.stopupdateloop(self)
 
         try:
-            utils.check_cmd([constants.IP_BIN, "link", "set", self.brname, "down"])
-            utils.check_cmd([constants.BRCTL_BIN, "delbr", self.brname])
-            ebtablescmds(utils.check_cmd, [
-                [constants.EBTABLES_BIN, "-D", "FORWARD", "--logical-in", self.brname, "-j", self.brname],
-                [constants.EBTABLES_BIN, "-X", self.brname]
-            ])
+            self.net_client.delete_bridge(self.brname)
+            self.filter_shutdown()
         except CoreCommandError:
             logging.exception("error during shutdown")
 
@@ -333,8 +870,7 @@ class CoreNetwork(CoreNetworkBase):
         :return: nothing
         """
         if self.up:
-            utils.check_cmd([constants.BRCTL_BIN, "addif", self.brname, netif.localname])
-            utils.check_cmd([constants.IP_BIN, "link", "set", netif.localname, "up"])
+            self.net_client.create_interface(self.brname, netif.localname)
 
         CoreNetworkBase.attach(self, netif)
 
@@ -346,7 +882,8 @@ class CoreNetwork(CoreNetworkBase):
         :return: nothing
         """
         if self.up:
-            utils.check_cmd([constants.BRCTL_BIN, "delif", self.brname, netif.localname])
+            self.net_client.delete_interface(self.brname, netif.localname)
+            self.filter_detached(netif)
 
         CoreNetworkBase.detach(self, netif)
 
@@ -393,7 +930,8 @@ class CoreNetwork(CoreNetworkBase):
                 return
             self._linked[netif1][netif2] = False
 
-        ebq.ebchange(self)
+        self.session.data_changed(self.id)
+        self.filter_changed(netif1, netif2, False)
 
     def link(self, netif1, netif2):
         """
@@ -409,7 +947,22 @@ class CoreNetwork(CoreNetworkBase):
                 return
             self._linked[netif1][netif2] = True
 
-        ebq.ebchange(self)
+        self.session.data_changed(self.id)
+        self.filter_changed(netif1, netif2, True)
+
+    def tc_cmd(self, args):
+        """
+        Run a tc command for configuring a link, queued when a session net batch is active.
+
+        :param list[str] args: tc command arguments
+        :return: nothing
+        :raises CoreCommandError: when there is a command exception
+        """
+        batch = self.session.get_net_batch()
+        if batch is None:
+            utils.check_cmd(args)
+        else:
+            batch.add(args, self.name)
 
     def linkconfig(self, netif, bw=None, delay=None, loss=None, duplicate=None,
                    jitter=None, netif2=None, devname=None):
@@ -442,14 +995,14 @@ class CoreNetwork(CoreNetworkBase):
             if bw > 0:
                 if self.up:
                     logging.debug("linkconfig: %s" % ([tc + parent + ["handle", "1:"] + tbf],))
-                    utils.check_cmd(tc + parent + ["handle", "1:"] + tbf)
+                    self.tc_cmd(tc + parent + ["handle", "1:"] + tbf)
                 netif.setparam("has_tbf", True)
                 changed = True
             elif netif.getparam("has_tbf") and bw <= 0:
                 tcd = [] + tc
                 tcd[2] = "delete"
                 if self.up:
-                    utils.check_cmd(tcd + parent)
+                    self.tc_cmd(tcd + parent)
                 netif.setparam("has_tbf", False)
                 # removing the parent removes the child
                 netif.setparam("has_netem", False)
@@ -492,12 +1045,12 @@ class CoreNetwork(CoreNetworkBase):
             tc[2] = "delete"
             if self.up:
                 logging.debug("linkconfig: %s" % ([tc + parent + ["handle", "10:"]],))
-                utils.check_cmd(tc + parent + ["handle", "10:"])
+                self.tc_cmd(tc + parent + ["handle", "10:"])
             netif.setparam("has_netem", False)
         elif len(netem) > 1:
             if self.up:
                 logging.debug("linkconfig: %s" % ([tc + parent + ["handle", "10:"] + netem],))
-                utils.check_cmd(tc + parent + ["handle", "10:"] + netem)
+                self.tc_cmd(tc + parent + ["handle", "10:"] + netem)
             netif.setparam("has_netem", True)
 
     def linknet(self, net):
@@ -533,8 +1086,7 @@ class CoreNetwork(CoreNetworkBase):
         if net.up:
             # this is similar to net.attach() but uses netif.name instead
             # of localname
-            utils.check_cmd([constants.BRCTL_BIN, "addif", net.brname, netif.name])
-            utils.check_cmd([constants.IP_BIN, "link", "set", netif.name, "up"])
+            net.net_client.create_interface(net.brname, netif.name)
         i = net.newifindex()
         net._netif[i] = netif
         with net._linked_lock:
@@ -569,7 +1121,7 @@ class CoreNetwork(CoreNetworkBase):
             return
 
         for addr in addrlist:
-            utils.check_cmd([constants.IP_BIN, "addr", "add", str(addr), "dev", self.brname])
+            self.net_client.create_address(self.brname, addr)
 
 
 class GreTapBridge(CoreNetwork):
@@ -726,15 +1278,16 @@ class CtrlNet(CoreNetwork):
             logging.info("address %s", addr)
 
         if self.updown_script:
+            # the script expects the bridge to exist, so run anything queued for it first
+            batch = self.session.get_net_batch()
+            if batch is not None:
+                batch.flush()
             logging.info("interface %s updown script (%s startup) called", self.brname, self.updown_script)
             utils.check_cmd([self.updown_script, self.brname, "startup"])
 
         if self.serverintf:
-            # sets the interface as a port of the bridge
-            utils.check_cmd([constants.BRCTL_BIN, "addif", self.brname, self.serverintf])
-
-            # bring interface up
-            utils.check_cmd([constants.IP_BIN, "link", "set", self.serverintf, "up"])
+            # sets the interface as a port of the bridge and brings it up
+            self.net_client.create_interface(self.brname, self.serverintf)
 
     def detectoldbridge(self):
         """
@@ -771,7 +1324,7 @@ class CtrlNet(CoreNetwork):
         """
         if self.serverintf is not None:
             try:
-                utils.check_cmd([constants.BRCTL_BIN, "delif", self.brname, self.serverintf])
+                self.net_client.delete_interface(self.brname, self.serverintf)
             except CoreCommandError:
                 logging.exception("error deleting server interface %s from bridge %s", self.serverintf, self.brname)
 
@@ -963,7 +1516,7 @@ class HubNode(CoreNetwork):
 
         # TODO: move to startup method
         if start:
-            utils.check_cmd([constants.BRCTL_BIN, "setageing", self.brname, "0"])
+            self.net_client.set_ageing(self.brname, 0)
 
 
 class WlanNode(CoreNetwork):
@@ -985,12 +1538,68 @@ class WlanNode(CoreNetwork):
         :param bool start: start flag
         :param policy: wlan policy
         """
+        # filtering backend, needs to be known before startup
+        self.nftables = session.options.get_config("wlan_backend") == NFTABLES_BACKEND
+        if self.nftables and not constants.NFT_BIN:
+            logging.warning("nft not found, using ebtables for wlan filtering")
+            self.nftables = False
         CoreNetwork.__init__(self, session, _id, name, start, policy)
         # wireless model such as basic range
         self.model = None
         # mobility model such as scripted
         self.mobility = None
 
+    def filter_startup(self):
+        """
+        Create the nftables table used to filter traffic between interfaces, when enabled.
+
+        :return: nothing
+        :raises CoreCommandError: when there is a command exception
+        """
+        if self.nftables:
+            nftq.startup(self)
+        else:
+            CoreNetwork.filter_startup(self)
+
+    def filter_shutdown(self):
+        """
+        Remove the nftables table used to filter traffic between interfaces, when enabled.
+
+        :return: nothing
+        :raises CoreCommandError: when there is a command exception
+        """
+        if self.nftables:
+            nftq.shutdown(self)
+        else:
+            CoreNetwork.filter_shutdown(self)
+
+    def filter_changed(self, netif1, netif2, linked):
+        """
+        Queue a change in link state between two interfaces as nftables set element changes,
+        when enabled.
+
+        :param core.nodes.interface.CoreInterface netif1: interface one
+        :param core.nodes.interface.CoreInterface netif2: interface two
+        :param bool linked: True if the interfaces are now linked, False otherwise
+        :return: nothing
+        """
+        if self.nftables:
+            nftq.change(self, netif1, netif2, linked)
+        else:
+            CoreNetwork.filter_changed(self, netif1, netif2, linked)
+
+    def filter_detached(self, netif):
+        """
+        Queue removal of the nftables set elements for a detached interface, when enabled.
+
+        :param core.nodes.interface.CoreInterface netif: detached interface
+        :return: nothing
+        """
+        if self.nftables:
+            nftq.detach(self, netif)
+        else:
+            CoreNetwork.filter_detached(self, netif)
+
     def attach(self, netif):
         """
         Attach a network interface.
@@ -168,7 +168,8 @@ class OvsNet(CoreNetworkBase):
 
             self._linked[interface_one][interface_two] = False
 
-        ebtables_queue.ebchange(self)
+        self.session.data_changed(self.id)
+        ebtables_queue.ebchange(self, interface_one, interface_two, False)
 
     def link(self, interface_one, interface_two):
         """
@@ -181,7 +182,8 @@ class OvsNet(CoreNetworkBase):
 
             self._linked[interface_one][interface_two] = True
 
-        ebtables_queue.ebchange(self)
+        self.session.data_changed(self.id)
+        ebtables_queue.ebchange(self, interface_one, interface_two, True)
 
     def linkconfig(self, netif, bw=None, delay=None, loss=None, duplicate=None,
                    jitter=None, netif2=None, devname=None):
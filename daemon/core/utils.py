@@ -218,18 +218,22 @@ def check_cmd(args, **kwargs):
     is folded into the stdout result string.
 
     :param list[str]|str args: command arguments
-    :param dict kwargs: keyword arguments to pass to subprocess.Popen
+    :param dict kwargs: keyword arguments to pass to subprocess.Popen, except for input which
+        provides bytes to write to the command's stdin
     :return: combined stdout and stderr
     :rtype: str
     :raises CoreCommandError: when there is a non-zero exit status or the file to execute is not found
     """
+    data = kwargs.pop("input", None)
+    if data is not None:
+        kwargs["stdin"] = subprocess.PIPE
     kwargs["stdout"] = subprocess.PIPE
     kwargs["stderr"] = subprocess.STDOUT
     args = split_args(args)
     logging.debug("command: %s", args)
     try:
         p = subprocess.Popen(args, **kwargs)
-        stdout, _ = p.communicate()
+        stdout, _ = p.communicate(data)
         status = p.wait()
         if status != 0:
             raise CoreCommandError(status, args, stdout)
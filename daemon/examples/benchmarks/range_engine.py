@@ -0,0 +1,152 @@
+"""
+Compares the basic range model engines for a wlan of mobile nodes, against the
+original loop that calculates the distance between every pair of interfaces.
+Every node moves each round, which is the worst case for incremental engines.
+"""
+
+import argparse
+import logging
+import math
+import random
+import threading
+import time
+
+from core.location import mobility
+from core.location.mobility import BasicRangeModel
+
+RANGE = 275
+
+
+class BenchmarkNode(object):
+    def __init__(self, position):
+        self.position = position
+
+    def getposition(self):
+        return self.position
+
+
+class BenchmarkInterface(object):
+    def __init__(self, _id, node):
+        self.id = _id
+        self.node = node
+
+    def __lt__(self, other):
+        return self.id < other.id
+
+
+class BenchmarkWlan(object):
+    def __init__(self):
+        self.id = 1
+        self._linked = {}
+        self._linked_lock = threading.Lock()
+
+    def linked(self, netif1, netif2):
+        return self._linked.setdefault(netif1, {}).setdefault(netif2, False)
+
+    def link(self, netif1, netif2):
+        self._linked[netif1][netif2] = True
+
+    def unlink(self, netif1, netif2):
+        self._linked[netif1][netif2] = False
+
+    def pairs(self):
+        return set((a.id, b.id) for a in self._linked for b in self._linked[a] if self._linked[a][b])
+
+
+class BenchmarkSession(object):
+    def __init__(self):
+        self.wlan = BenchmarkWlan()
+
+    def get_node(self, _id):
+        return self.wlan
+
+
+class BenchmarkRangeModel(BasicRangeModel):
+    def sendlinkmsg(self, netif, netif2, unlink=False):
+        pass
+
+
+def update_loop(model, moved_netifs):
+    """
+    Original update, calculating links between each moved interface and all others.
+    Pending interfaces are tracked using a set, so only the per pair cost is measured.
+    """
+    with model._netifslock:
+        pending = set(moved_netifs)
+        while len(moved_netifs):
+            netif = moved_netifs.pop()
+            pending.discard(netif)
+            model._netifs[netif] = netif.node.getposition()
+            for netif2 in model._netifs:
+                if netif2 in pending:
+                    continue
+                model.calclink(netif, netif2)
+
+
+def run(engine, positions, rounds):
+    session = BenchmarkSession()
+    model = BenchmarkRangeModel(session, 1)
+    config = {option.id: option.default for option in model.options}
+    config["range"] = str(RANGE)
+    config["engine"] = engine if engine != "loop" else mobility.RANGE_ENGINE_GRID
+    model.values_from_config(config)
+
+    netifs = []
+    for index, position in enumerate(positions[0]):
+        netif = BenchmarkInterface(index, BenchmarkNode(position))
+        netifs.append(netif)
+        model.set_position(netif, *position)
+
+    elapsed = 0
+    for round_positions in positions[1:rounds + 1]:
+        for netif, position in zip(netifs, round_positions):
+            netif.node.position = position
+        start = time.time()
+        if engine == "loop":
+            update_loop(model, list(netifs))
+        else:
+            model.update(True, list(netifs))
+        elapsed += time.time() - start
+    return elapsed / rounds, session.wlan.pairs()
+
+
+def generate(count, rounds, speed):
+    # keep node density constant, about 5 nodes within range of each other
+    side = math.sqrt(count * math.pi * RANGE * RANGE / 5)
+    current = [(random.uniform(0, side), random.uniform(0, side), 0) for _ in range(count)]
+    positions = [current]
+    for _ in range(rounds):
+        current = [(min(max(x + random.uniform(-speed, speed), 0), side),
+                    min(max(y + random.uniform(-speed, speed), 0), side), z) for x, y, z in current]
+        positions.append(current)
+    return positions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark basic range model engines")
+    parser.add_argument("-n", "--nodes", type=int, nargs="+", default=[100, 500, 2000], help="wlan sizes")
+    parser.add_argument("-r", "--rounds", type=int, default=3, help="mobility rounds per size")
+    parser.add_argument("-s", "--speed", type=float, default=50, help="max distance moved per round")
+    args = parser.parse_args()
+
+    engines = ["loop", mobility.RANGE_ENGINE_GRID]
+    if mobility.numpy is not None:
+        engines.append(mobility.RANGE_ENGINE_NUMPY)
+    else:
+        logging.warning("numpy not installed, skipping numpy engine")
+
+    print("%8s %12s %12s %8s" % ("nodes", "engine", "ms/round", "links"))
+    for count in args.nodes:
+        positions = generate(count, args.rounds, args.speed)
+        expected = None
+        for engine in engines:
+            elapsed, pairs = run(engine, positions, args.rounds)
+            if expected is None:
+                expected = pairs
+            elif pairs != expected:
+                raise ValueError("%s engine links differ from loop" % engine)
+            print("%8s %12s %12.2f %8s" % (count, engine, elapsed * 1000, len(pairs)))
+
+
+if __name__ == "__main__":
+    main()
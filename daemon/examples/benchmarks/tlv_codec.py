@@ -0,0 +1,201 @@
+"""
+Measures encoding and decoding node, link, event, and config messages, comparing the
+compiled tlv encoders against the original packing loop, which concatenated the packed
+data of each tlv and logged every value. Encoded messages are checked to be identical.
+"""
+
+import argparse
+import logging
+import socket
+import time
+
+from past.builtins import basestring
+
+from core.api.tlv import coreapi
+from core.api.tlv import dataconversion
+from core.api.tlv import structutils
+from core.emulator.data import ConfigData, EventData, LinkData, NodeData
+from core.emulator.enumerations import ConfigTlvs
+from core.emulator.enumerations import EventTlvs
+from core.emulator.enumerations import EventTypes
+from core.emulator.enumerations import MessageFlags
+from core.nodes import ipaddress
+
+
+def legacy_pack_values(clazz, packers):
+    """
+    Original pack_values, packing each value with CoreTlv.pack.
+    """
+    logging.debug("packing: %s", packers)
+    data = b""
+    for packer in packers:
+        transformer = None
+        if len(packer) == 2:
+            tlv_type, value = packer
+        else:
+            tlv_type, value, transformer = packer
+        if value is None or (isinstance(value, basestring) and not value):
+            continue
+        if transformer:
+            value = transformer(value)
+        logging.debug("packing: %s - %s type(%s)", tlv_type, value, type(value))
+        data += clazz.pack(tlv_type.value, value)
+    return data
+
+
+def legacy_packers(clazz, obj, fields):
+    """
+    Build the list of tlv type, value, and transformer for a data object, as the original
+    conversions did for each message.
+    """
+    return [(clazz.tlv_type_map(tlv_type), getattr(obj, name), transformer)
+            for tlv_type, name, transformer in fields]
+
+
+def legacy_node(node_data):
+    packers = legacy_packers(coreapi.CoreNodeTlv, node_data, dataconversion.NODE_FIELDS)
+    tlv_data = legacy_pack_values(coreapi.CoreNodeTlv, packers)
+    return coreapi.CoreNodeMessage.pack(node_data.message_type, tlv_data)
+
+
+def legacy_link(link_data):
+    packers = legacy_packers(coreapi.CoreLinkTlv, link_data, dataconversion.LINK_FIELDS)
+    tlv_data = legacy_pack_values(coreapi.CoreLinkTlv, packers)
+    return coreapi.CoreLinkMessage.pack(link_data.message_type, tlv_data)
+
+
+def event_packers(event_data):
+    return [
+        (EventTlvs.NODE, event_data.node),
+        (EventTlvs.TYPE, event_data.event_type),
+        (EventTlvs.NAME, event_data.name),
+        (EventTlvs.DATA, event_data.data),
+        (EventTlvs.TIME, event_data.time),
+        (EventTlvs.SESSION, event_data.session)
+    ]
+
+
+def legacy_event(event_data):
+    tlv_data = legacy_pack_values(coreapi.CoreEventTlv, event_packers(event_data))
+    return coreapi.CoreEventMessage.pack(0, tlv_data)
+
+
+def convert_event(event_data):
+    tlv_data = structutils.pack_values(coreapi.CoreEventTlv, event_packers(event_data))
+    return coreapi.CoreEventMessage.pack(0, tlv_data)
+
+
+def legacy_config(config_data):
+    tlv_data = legacy_pack_values(coreapi.CoreConfigTlv, [
+        (ConfigTlvs.NODE, config_data.node),
+        (ConfigTlvs.OBJECT, config_data.object),
+        (ConfigTlvs.TYPE, config_data.type),
+        (ConfigTlvs.DATA_TYPES, config_data.data_types),
+        (ConfigTlvs.VALUES, config_data.data_values),
+        (ConfigTlvs.CAPTIONS, config_data.captions),
+        (ConfigTlvs.BITMAP, config_data.bitmap),
+        (ConfigTlvs.POSSIBLE_VALUES, config_data.possible_values),
+        (ConfigTlvs.GROUPS, config_data.groups),
+        (ConfigTlvs.SESSION, config_data.session),
+        (ConfigTlvs.INTERFACE_NUMBER, config_data.interface_number),
+        (ConfigTlvs.NETWORK_ID, config_data.network_id),
+        (ConfigTlvs.OPAQUE, config_data.opaque),
+    ])
+    return coreapi.CoreConfMessage.pack(config_data.message_type, tlv_data)
+
+
+def create_data():
+    ip4 = ipaddress.IpAddress(socket.AF_INET, socket.inet_pton(socket.AF_INET, "10.0.0.1"))
+    ip6 = ipaddress.IpAddress(socket.AF_INET6, socket.inet_pton(socket.AF_INET6, "2001::1"))
+    mac = ipaddress.MacAddress.from_string("00:00:00:aa:00:01")
+    node_data = NodeData(
+        message_type=MessageFlags.ADD.value,
+        id=1,
+        node_type=0,
+        name="n1",
+        emulation_id=1,
+        canvas=0,
+        icon="/usr/share/core/icons/normal/router.gif",
+        x_position=100,
+        y_position=200,
+        model="router",
+        services="zebra|OSPFv2|OSPFv3|IPForward",
+    )
+    link_data = LinkData(
+        message_type=MessageFlags.ADD.value,
+        node1_id=1,
+        node2_id=2,
+        delay=10000,
+        bandwidth=1000000,
+        per=0.5,
+        dup=1,
+        jitter=10,
+        link_type=1,
+        interface1_id=0,
+        interface1_ip4=ip4,
+        interface1_ip4_mask=24,
+        interface1_mac=mac,
+        interface1_ip6=ip6,
+        interface1_ip6_mask=64,
+        interface2_id=0,
+        interface2_ip4=ip4,
+        interface2_ip4_mask=24,
+        interface2_mac=mac,
+    )
+    event_data = EventData(
+        node=1,
+        event_type=EventTypes.RUNTIME_STATE.value,
+        name="mobility:start",
+        time="%s" % time.time(),
+        session="1",
+    )
+    config_data = ConfigData(
+        message_type=0,
+        node=1,
+        object="session",
+        type=2,
+        data_types=tuple([10] * 20),
+        data_values="|".join("value%s" % x for x in range(20)),
+        captions="|".join("caption%s" % x for x in range(20)),
+        groups="Options:1-20",
+        session="1",
+    )
+    return [
+        ("node", coreapi.CoreNodeMessage, node_data, legacy_node, dataconversion.convert_node),
+        ("link", coreapi.CoreLinkMessage, link_data, legacy_link, dataconversion.convert_link),
+        ("event", coreapi.CoreEventMessage, event_data, legacy_event, convert_event),
+        ("config", coreapi.CoreConfMessage, config_data, legacy_config, dataconversion.convert_config),
+    ]
+
+
+def measure(func, value, count):
+    start = time.time()
+    for _ in range(count):
+        func(value)
+    return (time.time() - start) / count * 1000000
+
+
+def decode(message_class, message):
+    header = message[:coreapi.CoreMessage.header_len]
+    _, flags, _ = coreapi.CoreMessage.unpack_header(header)
+    return message_class(flags, header, message[coreapi.CoreMessage.header_len:]).tlv_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark tlv message encoding and decoding")
+    parser.add_argument("-c", "--count", type=int, default=20000, help="messages per measurement")
+    args = parser.parse_args()
+
+    print("%8s %8s %12s %12s %12s" % ("message", "bytes", "legacy us", "encode us", "decode us"))
+    for name, message_class, data, legacy, convert in create_data():
+        message = convert(data)
+        if legacy(data) != message:
+            raise ValueError("%s message differs from legacy encoding" % name)
+        legacy_time = measure(legacy, data, args.count)
+        encode_time = measure(convert, data, args.count)
+        decode_time = measure(lambda x: decode(message_class, x), message, args.count)
+        print("%8s %8s %12.2f %12.2f %12.2f" % (name, len(message), legacy_time, encode_time, decode_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ Unit test fixture module.
 """
 
 import os
+import sys
 import threading
 import time
 
@@ -36,6 +37,11 @@ from core.services.coreservices import ServiceManager
 
 EMANE_SERVICES = "zebra|OSPFv3MDR|IPForward"
 
+# asyncio tests require python 3
+collect_ignore = []
+if sys.version_info < (3,):
+    collect_ignore.extend(["test_async_dispatcher.py", "test_async_grpc.py"])
+
 
 def node_message(_id, name, emulation_server=None, node_type=NodeTypes.DEFAULT, model=None):
     """
@@ -221,6 +227,20 @@ def grpc_server():
     grpc_server.server.stop(None)
 
 
+@pytest.fixture
+def async_grpc_server():
+    from core.api.grpc.asyncserver import AsyncCoreGrpcServer
+    coremu = CoreEmu()
+    grpc_server = AsyncCoreGrpcServer(coremu)
+    thread = threading.Thread(target=grpc_server.listen, args=("localhost:50051",))
+    thread.daemon = True
+    thread.start()
+    time.sleep(0.1)
+    yield grpc_server
+    coremu.shutdown()
+    grpc_server.stop(None)
+
+
 @pytest.fixture
 def session():
     # use coreemu and create a session
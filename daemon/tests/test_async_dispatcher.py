@@ -0,0 +1,57 @@
+"""
+Tests for the asyncio message dispatcher, requiring Python 3.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from core.api.tlv import coreapi
+from core.api.tlv.asyncserver import AsyncMessageDispatcher
+from core.emulator.enumerations import EventTlvs
+from core.emulator.enumerations import EventTypes
+from core.emulator.enumerations import LinkTlvs
+from core.emulator.enumerations import MessageFlags
+from core.emulator.enumerations import NodeTlvs
+
+
+class TestAsyncDispatcher:
+    def test_async_ordered_dispatch(self):
+        # given
+        loop = asyncio.new_event_loop()
+        executor = ThreadPoolExecutor(max_workers=4)
+        handled = []
+        lock = threading.Lock()
+
+        def handler(message):
+            with lock:
+                handled.append(message)
+
+        dispatcher = AsyncMessageDispatcher(handler, loop, executor)
+        node_messages = []
+        for node_id in range(1, 6):
+            message = coreapi.CoreNodeMessage.create(MessageFlags.ADD.value, [(NodeTlvs.NUMBER, node_id)])
+            node_messages.append(message)
+        link_message = coreapi.CoreLinkMessage.create(MessageFlags.ADD.value, [
+            (LinkTlvs.N1_NUMBER, 1),
+            (LinkTlvs.N2_NUMBER, 5),
+        ])
+        event_message = coreapi.CoreEventMessage.create(0, [
+            (EventTlvs.TYPE, EventTypes.INSTANTIATION_STATE.value)
+        ])
+
+        # when
+        for message in node_messages + [link_message, event_message]:
+            dispatcher.dispatch(message)
+        loop.run_until_complete(asyncio.sleep(0))
+        loop.run_until_complete(dispatcher.barrier.wait())
+        metrics = dispatcher.message_metrics()
+        loop.close()
+        executor.shutdown()
+
+        # then
+        assert len(handled) == 7
+        assert handled[-1] is event_message
+        assert handled.index(link_message) > handled.index(node_messages[0])
+        assert handled.index(link_message) > handled.index(node_messages[4])
+        assert metrics["NODE"]["handled"] == 5
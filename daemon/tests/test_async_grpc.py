@@ -0,0 +1,83 @@
+"""
+Tests for the asyncio grpc server and client, requiring Python 3 and a grpcio release
+providing grpc.aio.
+"""
+
+import asyncio
+import time
+from queue import Queue
+
+import grpc
+import pytest
+
+from core.api.grpc import core_pb2
+from core.api.grpc.client import CoreGrpcClient
+from core.emulator.coreemu import CoreEmu
+from core.emulator.data import EventData
+from core.emulator.enumerations import EventTypes
+
+try:
+    from grpc import aio
+except ImportError:
+    aio = None
+
+pytestmark = pytest.mark.skipif(aio is None, reason="grpc.aio not available")
+
+
+class TestAsyncGrpc:
+    def test_async_pipeline_add_nodes(self, async_grpc_server):
+        # given
+        from core.api.grpc.asyncclient import AsyncCoreGrpcClient
+        client = AsyncCoreGrpcClient(pool_size=2)
+        session = async_grpc_server.coreemu.create_session()
+        nodes = [core_pb2.Node(id=node_id) for node_id in range(1, 21)] + [core_pb2.Node(id=1)]
+
+        async def add_nodes():
+            async with client.context_connect():
+                responses = await client.pipeline_add_nodes(session.id, nodes, max_in_flight=4)
+                session_response = await client.get_session(session.id)
+            return responses, session_response
+
+        # when
+        responses, session_response = asyncio.new_event_loop().run_until_complete(add_nodes())
+
+        # then
+        assert [x.node_id for x in responses[:-1]] == list(range(1, 21))
+        assert isinstance(responses[-1], grpc.RpcError)
+        assert len(session_response.session.nodes) == 20
+
+    def test_async_events(self, async_grpc_server):
+        # given
+        client = CoreGrpcClient()
+        queue = Queue()
+
+        def handle_event(event_data):
+            assert event_data.HasField("session_event")
+            queue.put(event_data)
+
+        # then
+        with client.context_connect():
+            response = client.create_session()
+            session = async_grpc_server.coreemu.sessions[response.session_id]
+            for _ in range(3):
+                client.events(session.id, handle_event)
+            time.sleep(0.1)
+            event = EventData(event_type=EventTypes.RUNTIME_STATE.value, time="%s" % time.time())
+            session.broadcast_event(event)
+
+            # then
+            for _ in range(3):
+                queue.get(timeout=5)
+
+    def test_async_stop_without_listen(self):
+        # given
+        from core.api.grpc.asyncserver import AsyncCoreGrpcServer
+        coreemu = CoreEmu()
+        server = AsyncCoreGrpcServer(coreemu)
+
+        # when
+        server.stop(None)
+        coreemu.shutdown()
+
+        # then
+        assert server.stopped.is_set()
@@ -0,0 +1,85 @@
+import pytest
+
+from core.api.broadcast import BroadcastQueue
+from core.api.broadcast import BROADCAST_COALESCE
+from core.api.broadcast import BROADCAST_DISCONNECT
+from core.api.broadcast import BROADCAST_DROP
+
+
+class TestBroadcastQueue:
+    def test_coalesce(self):
+        # given
+        queue = BroadcastQueue("test", 10, BROADCAST_COALESCE)
+
+        # when
+        queue.put("add")
+        for x in range(5):
+            queue.put("position %s" % x, key=1)
+        queue.put("link")
+        items = queue.get_all(timeout=0)
+
+        # then
+        assert items == ["add", "position 4", "link"]
+        assert queue.stats()["coalesced"] == 4
+
+    def test_coalesce_full(self):
+        # given
+        disconnected = []
+        queue = BroadcastQueue("test", 3, BROADCAST_COALESCE, lambda: disconnected.append(True))
+
+        # when
+        queue.put("add")
+        queue.put("position 1", key=1)
+        queue.put("position 2", key=2)
+        queue.put("link")
+        queue.put("reply")
+        results = [queue.put("delete")]
+        stats = queue.stats()
+
+        # then
+        assert stats["dropped"] == 2
+        assert results == [False]
+        assert disconnected
+        assert stats["closed"]
+
+    def test_coalesce_full_keyed(self):
+        # given
+        queue = BroadcastQueue("test", 3, BROADCAST_COALESCE)
+
+        # when
+        queue.put("add")
+        queue.put("position 1", key=1)
+        queue.put("position 2", key=2)
+        queue.put("link")
+        items = queue.get_all(timeout=0)
+
+        # then
+        assert items == ["add", "position 2", "link"]
+        assert queue.stats()["dropped"] == 1
+
+    def test_drop(self):
+        # given
+        queue = BroadcastQueue("test", 2, BROADCAST_DROP)
+
+        # when
+        for x in range(5):
+            queue.put(x, key=1)
+        items = queue.get_all(timeout=0)
+
+        # then
+        assert items == [3, 4]
+        assert queue.stats()["dropped"] == 3
+
+    def test_disconnect(self):
+        # given
+        disconnected = []
+        queue = BroadcastQueue("test", 2, BROADCAST_DISCONNECT, lambda: disconnected.append(True))
+
+        # when
+        results = [queue.put(x) for x in range(3)]
+
+        # then
+        assert results == [True, True, False]
+        assert disconnected
+        with pytest.raises(EOFError):
+            queue.get(timeout=0)
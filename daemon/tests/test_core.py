@@ -6,15 +6,20 @@ import os
 import stat
 import subprocess
 import threading
+import time
 
 import pytest
 
+from core import constants
+from core.emulator.data import NodeData
 from core.emulator.emudata import NodeOptions
 from core.emulator.enumerations import MessageFlags
 from core.emulator.enumerations import NodeTypes
+from core.location import mobility
 from core.location.mobility import BasicRangeModel
 from core.location.mobility import Ns2ScriptedMobility
 from core.nodes.client import VnodeClient
+from core.nodes.network import ebq
 
 _PATH = os.path.abspath(os.path.dirname(__file__))
 _MOBILITY_FILE = os.path.join(_PATH, "mobility.scen")
@@ -208,6 +213,124 @@ class TestCore:
         status = ping(node_one, node_two, ip_prefixes)
         assert not status
 
+    @pytest.mark.skipif(not constants.NFT_BIN, reason="nft not installed")
+    def test_wlan_nftables(self, session, ip_prefixes):
+        """
+        Test basic wlan network filtered using nftables, pinging and then moving out of range.
+
+        :param core.emulator.coreemu.EmuSession session: session for test
+        :param ip_prefixes: generates ip addresses for nodes
+        """
+
+        # create wlan
+        session.options.set_config("wlan_backend", "nftables")
+        wlan_node = session.add_node(_type=NodeTypes.WIRELESS_LAN)
+        session.mobility.set_model(wlan_node, BasicRangeModel)
+        assert wlan_node.nftables
+
+        # create nodes
+        node_options = NodeOptions()
+        node_options.set_position(0, 0)
+        node_one = session.create_wireless_node(node_options=node_options)
+        node_two = session.create_wireless_node(node_options=node_options)
+
+        # link nodes
+        for node in [node_one, node_two]:
+            interface = ip_prefixes.create_interface(node)
+            session.add_link(node.id, wlan_node.id, interface_one=interface)
+
+        # instantiate session
+        session.instantiate()
+
+        # ping n2 from n1 and assert success
+        status = ping(node_one, node_two, ip_prefixes)
+        assert not status
+
+        # move n2 out of range, wait for the set to update, and assert failure
+        node_options.set_position(1000, 1000)
+        session.update_node(node_two.id, node_options)
+        time.sleep(1)
+        status = ping(node_one, node_two, ip_prefixes)
+        assert status
+
+    def test_wlan_ebtables(self, session, ip_prefixes):
+        """
+        Test wlan ebtables rules are inserted and deleted as nodes move in and out of range.
+
+        :param core.emulator.coreemu.EmuSession session: session for test
+        :param ip_prefixes: generates ip addresses for nodes
+        """
+
+        # create wlan
+        wlan_node = session.add_node(_type=NodeTypes.WIRELESS_LAN)
+        session.mobility.set_model(wlan_node, BasicRangeModel)
+
+        # create nodes
+        node_options = NodeOptions()
+        node_options.set_position(0, 0)
+        node_one = session.create_wireless_node(node_options=node_options)
+        node_two = session.create_wireless_node(node_options=node_options)
+
+        # link nodes
+        for node in [node_one, node_two]:
+            interface = ip_prefixes.create_interface(node)
+            session.add_link(node.id, wlan_node.id, interface_one=interface)
+
+        # instantiate session, wait for the chain to update, and assert rules for the link
+        session.instantiate()
+        time.sleep(1)
+        assert len(ebq.chainrules(wlan_node)) == 2
+
+        # move n2 out of range, wait for the chain to update, and assert rules were deleted
+        node_options.set_position(1000, 1000)
+        session.update_node(node_two.id, node_options)
+        time.sleep(1)
+        assert not ebq.chainrules(wlan_node)
+        status = ping(node_one, node_two, ip_prefixes)
+        assert status
+
+    @pytest.mark.parametrize("engine", [mobility.RANGE_ENGINE_GRID, mobility.RANGE_ENGINE_NUMPY])
+    def test_wlan_range(self, session, ip_prefixes, engine):
+        """
+        Test basic range links follow nodes moving in and out of range.
+
+        :param core.emulator.coreemu.EmuSession session: session for test
+        :param ip_prefixes: generates ip addresses for nodes
+        :param str engine: range engine to use
+        """
+        if engine == mobility.RANGE_ENGINE_NUMPY and mobility.numpy is None:
+            pytest.skip("numpy not installed")
+
+        # create wlan
+        wlan_node = session.add_node(_type=NodeTypes.WIRELESS_LAN)
+        session.mobility.set_model(wlan_node, BasicRangeModel, {"range": "100", "engine": engine})
+
+        # create nodes
+        node_options = NodeOptions()
+        node_options.set_position(0, 0)
+        node_one = session.create_wireless_node(node_options=node_options)
+        node_options.set_position(50, 50)
+        node_two = session.create_wireless_node(node_options=node_options)
+
+        # link nodes
+        netifs = []
+        for node in [node_one, node_two]:
+            interface = ip_prefixes.create_interface(node)
+            session.add_link(node.id, wlan_node.id, interface_one=interface)
+            netifs.append(node.netif(interface.id))
+        netif_one, netif_two = sorted(netifs)
+        assert wlan_node.linked(netif_one, netif_two)
+
+        # move node two several grid cells away
+        node_options.set_position(1000, 1000)
+        session.update_node(node_two.id, node_options)
+        assert not wlan_node.linked(netif_one, netif_two)
+
+        # move node two back in range
+        node_options.set_position(20, 30)
+        session.update_node(node_two.id, node_options)
+        assert wlan_node.linked(netif_one, netif_two)
+
     def test_mobility(self, session, ip_prefixes):
         """
         Test basic wlan network.
@@ -257,3 +380,53 @@ class TestCore:
 
         # validate we receive a node message for updating its location
         assert event.wait(5)
+
+    def test_position_publisher(self, session):
+        """
+        Test node position updates within a window are coalesced into a single batch.
+
+        :param core.emulator.coreemu.EmuSession session: session for test
+        """
+
+        # add handler for receiving batches of node updates
+        batches = []
+        event = threading.Event()
+
+        def node_batch_update(node_datas):
+            batches.append(node_datas)
+            event.set()
+
+        session.node_batch_handlers.append(node_batch_update)
+
+        # publish several positions for two nodes within a window
+        session.options.set_config("position_window", "100")
+        session.event_loop.run()
+        for x in range(10):
+            session.position_publisher.publish(NodeData(message_type=0, id=1, x_position=x))
+            session.position_publisher.publish(NodeData(message_type=0, id=2, x_position=x))
+
+        # validate only the latest position of each node was sent, in one batch
+        assert event.wait(5)
+        session.event_loop.stop()
+        assert len(batches) == 1
+        assert [(x.id, x.x_position) for x in batches[0]] == [(1, 9), (2, 9)]
+
+    def test_position_publisher_delete(self, session):
+        """
+        Test a pending node position update is discarded when the node is deleted.
+
+        :param core.emulator.coreemu.EmuSession session: session for test
+        """
+
+        # create node and start the event loop
+        node = session.add_node(_type=NodeTypes.SWITCH)
+        session.options.set_config("position_window", "1000")
+        session.event_loop.run()
+
+        # publish a position and delete the node within the window
+        session.position_publisher.publish(node.data(message_type=0))
+        session.delete_node(node.id)
+        session.event_loop.stop()
+
+        # validate the pending position was discarded
+        assert not session.position_publisher.pending
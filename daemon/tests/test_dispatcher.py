@@ -0,0 +1,56 @@
+import threading
+
+from core.api.tlv import coreapi
+from core.api.tlv.dispatcher import CoreMessageDispatcher
+from core.emulator.enumerations import EventTlvs
+from core.emulator.enumerations import EventTypes
+from core.emulator.enumerations import LinkTlvs
+from core.emulator.enumerations import MessageFlags
+from core.emulator.enumerations import NodeTlvs
+
+
+class TestDispatcher:
+    def test_ordered_dispatch(self):
+        # given
+        handled = []
+        lock = threading.Lock()
+        done = threading.Event()
+
+        def handler(message):
+            with lock:
+                handled.append(message)
+            if isinstance(message, coreapi.CoreEventMessage):
+                done.set()
+
+        dispatcher = CoreMessageDispatcher(handler, 4)
+        node_messages = []
+        for node_id in range(1, 11):
+            message = coreapi.CoreNodeMessage.create(MessageFlags.ADD.value, [(NodeTlvs.NUMBER, node_id)])
+            node_messages.append(message)
+        link_messages = []
+        for node_id in range(1, 10):
+            message = coreapi.CoreLinkMessage.create(MessageFlags.ADD.value, [
+                (LinkTlvs.N1_NUMBER, node_id),
+                (LinkTlvs.N2_NUMBER, node_id + 1),
+            ])
+            link_messages.append(message)
+        event_message = coreapi.CoreEventMessage.create(0, [
+            (EventTlvs.TYPE, EventTypes.INSTANTIATION_STATE.value)
+        ])
+
+        # when
+        for message in node_messages + link_messages + [event_message]:
+            dispatcher.dispatch(message)
+        done.wait(5)
+        metrics = dispatcher.message_metrics()
+        dispatcher.stop(5)
+
+        # then
+        assert len(handled) == 20
+        assert handled[-1] is event_message
+        for index, message in enumerate(link_messages):
+            position = handled.index(message)
+            assert handled.index(node_messages[index]) < position
+            assert handled.index(node_messages[index + 1]) < position
+        assert metrics["LINK"]["handled"] == 9
+        assert metrics["LINK"]["depth"] == 0
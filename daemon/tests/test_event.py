@@ -0,0 +1,66 @@
+import threading
+
+from core.location.event import EventLoop
+
+
+class TestEventLoop:
+    def test_run_events(self):
+        # given
+        event_loop = EventLoop()
+        results = []
+        done = threading.Event()
+        event_loop.add_event(0.2, results.append, 2)
+        event_loop.add_event(0.1, results.append, 1)
+        event_loop.add_event(0.3, done.set)
+
+        # when
+        event_loop.run()
+        event_loop.add_event(0.0, results.append, 0)
+        done.wait(5)
+        metrics = event_loop.lag_metrics()
+        event_loop.stop()
+
+        # then
+        assert done.is_set()
+        assert results == [0, 1, 2]
+        assert metrics["events"] == 4
+        assert metrics["max"] >= metrics["average"] >= 0.0
+        assert metrics["pending"] == 0
+
+    def test_cancel_event(self):
+        # given
+        event_loop = EventLoop()
+        results = []
+        done = threading.Event()
+        event_loop.run()
+        events = [event_loop.add_event(0.1, results.append, x) for x in range(10)]
+        event_loop.add_event(0.2, done.set)
+
+        # when
+        for event in events[1:]:
+            event_loop.cancel_event(event)
+        done.wait(5)
+        event_loop.stop()
+
+        # then
+        assert done.is_set()
+        assert results == [0]
+
+    def test_cancel_event_run(self):
+        # given
+        event_loop = EventLoop()
+        done = threading.Event()
+        event_loop.run()
+        event = event_loop.add_event(0.0, done.set)
+        done.wait(5)
+        event_loop.add_event(10, done.set)
+
+        # when
+        event_loop.cancel_event(event)
+        canceled = event_loop.canceled
+        metrics = event_loop.lag_metrics()
+        event_loop.stop()
+
+        # then
+        assert canceled == 0
+        assert metrics["pending"] == 1
@@ -1,18 +1,24 @@
+import threading
 import time
 
 import grpc
+import mock
 import pytest
 from builtins import int
 from queue import Queue
 
+from core import CoreCommandError
 from core.api.grpc import core_pb2
 from core.api.grpc.client import CoreGrpcClient
+from core.api.grpc.server import CoreGrpcServer
 from core.config import ConfigShim
 from core.emane.ieee80211abg import EmaneIeee80211abgModel
-from core.emulator.data import EventData
+from core.api.grpc.events import EventFilter
+from core.emulator.data import EventData, NodeData
 from core.emulator.emudata import NodeOptions
-from core.emulator.enumerations import NodeTypes, EventTypes, ConfigFlags, ExceptionLevels
+from core.emulator.enumerations import NodeTypes, EventTypes, ConfigFlags, ExceptionLevels, MessageFlags
 from core.location.mobility import BasicRangeModel, Ns2ScriptedMobility
+from core.nodes.netclient import NetBatch
 
 
 class TestGrpc:
@@ -88,6 +94,78 @@ class TestGrpc:
         assert len(response.sessions) == 1
         assert found_session is not None
 
+    def test_start_session(self, grpc_server, interface_helper):
+        # given
+        client = CoreGrpcClient()
+        nodes = [
+            core_pb2.Node(id=1, type=NodeTypes.SWITCH.value),
+            core_pb2.Node(id=2, model="host"),
+            core_pb2.Node(id=3, model="host"),
+        ]
+        links = []
+        for node_id in [2, 3]:
+            interface = interface_helper.create_interface(node_id, 0)
+            links.append(core_pb2.Link(
+                node_one_id=node_id, node_two_id=1, type=core_pb2.LinkType.WIRED, interface_one=interface))
+        hook = core_pb2.Hook(state=core_pb2.SessionState.RUNTIME, file="test", data="echo hello")
+        steps = []
+
+        # then
+        with client.context_connect():
+            response = client.start_session(nodes, links, hooks=[hook], handler=lambda x: steps.append(x.step))
+
+        # then
+        session = grpc_server.coreemu.sessions[response.session_id]
+        assert response.state == core_pb2.SessionState.RUNTIME
+        assert session.state == EventTypes.RUNTIME_STATE.value
+        assert steps[0] == "validated"
+        assert steps[-1] == "started"
+        assert len(session.get_node(1).all_link_data(0)) == 2
+
+    def test_start_session_invalid(self, grpc_server):
+        # given
+        client = CoreGrpcClient()
+        nodes = [core_pb2.Node(id=1)]
+        links = [core_pb2.Link(node_one_id=1, node_two_id=2)]
+        emane_model_configs = [core_pb2.EmaneModelConfig(node_id=1, model="unknown")]
+
+        # then
+        with pytest.raises(grpc.RpcError) as error:
+            with client.context_connect():
+                client.start_session(nodes, links, emane_model_configs=emane_model_configs)
+
+        # then
+        assert error.value.code() == grpc.StatusCode.INVALID_ARGUMENT
+        assert "unknown emane model" in error.value.details()
+        assert not grpc_server.coreemu.sessions
+
+    def test_start_session_cancel(self, grpc_server):
+        # given
+        client = CoreGrpcClient()
+        nodes = [core_pb2.Node(id=1, type=NodeTypes.SWITCH.value)]
+        request = core_pb2.StartSessionRequest(nodes=nodes)
+        cancelled = threading.Event()
+        add_nodes = CoreGrpcServer._add_nodes
+
+        def wait_add_nodes(*args):
+            cancelled.wait(5)
+            return add_nodes(*args)
+
+        # then
+        with mock.patch.object(CoreGrpcServer, "_add_nodes", wait_add_nodes):
+            with client.context_connect():
+                stream = client.stub.StartSession(request)
+                next(stream)
+                stream.cancel()
+                cancelled.set()
+            for _ in range(50):
+                if not grpc_server.coreemu.sessions:
+                    break
+                time.sleep(0.1)
+
+        # then
+        assert not grpc_server.coreemu.sessions
+
     def test_get_session_options(self, grpc_server):
         # given
         client = CoreGrpcClient()
@@ -185,6 +263,50 @@ class TestGrpc:
         assert response.node_id is not None
         assert session.get_node(response.node_id) is not None
 
+    def test_add_nodes(self, grpc_server):
+        # given
+        client = CoreGrpcClient()
+        session = grpc_server.coreemu.create_session()
+        nodes = [core_pb2.Node(id=1), core_pb2.Node(), core_pb2.Node(id=1)]
+
+        # then
+        with client.context_connect():
+            response = client.add_nodes(session.id, nodes)
+
+        # then
+        assert [x.result for x in response.results] == [True, True, False]
+        assert response.results[2].error
+        assert session.get_node(response.results[1].node_id) is not None
+
+    def test_stream_add_nodes(self, grpc_server):
+        # given
+        client = CoreGrpcClient()
+        session = grpc_server.coreemu.create_session()
+        nodes = (core_pb2.Node(id=node_id) for node_id in range(1, 6))
+
+        # then
+        with client.context_connect():
+            response = client.stream_add_nodes(session.id, nodes, chunk_size=2)
+
+        # then
+        assert [x.node_id for x in response.results] == [1, 2, 3, 4, 5]
+        assert all(x.result for x in response.results)
+
+    def test_delete_nodes(self, grpc_server):
+        # given
+        client = CoreGrpcClient()
+        session = grpc_server.coreemu.create_session()
+        node = session.add_node()
+
+        # then
+        with client.context_connect():
+            response = client.delete_nodes(session.id, [node.id, node.id + 1])
+
+        # then
+        assert [x.result for x in response.results] == [True, False]
+        with pytest.raises(KeyError):
+            session.get_node(node.id)
+
     def test_get_node(self, grpc_server):
         # given
         client = CoreGrpcClient()
@@ -220,6 +342,34 @@ class TestGrpc:
             assert node.position.x == x
             assert node.position.y == y
 
+    def test_move_positions(self, grpc_server, ip_prefixes):
+        # given
+        client = CoreGrpcClient()
+        session = grpc_server.coreemu.create_session()
+        wlan = session.add_node(_type=NodeTypes.WIRELESS_LAN)
+        session.mobility.set_model(wlan, BasicRangeModel, {"range": "100"})
+        nodes = []
+        for _ in range(2):
+            node = session.add_node()
+            interface = ip_prefixes.create_interface(node)
+            session.add_link(node.id, wlan.id, interface)
+            nodes.append(node)
+        batches = [
+            [core_pb2.NodePosition(node_id=x.id, position=core_pb2.Position(x=10, y=10)) for x in nodes],
+            [core_pb2.NodePosition(node_id=nodes[0].id, position=core_pb2.Position(x=500, y=500))],
+        ]
+
+        # then
+        with client.context_connect():
+            response = client.move_positions(session.id, batches)
+
+        # then
+        assert response.batches == 2
+        assert response.moved == 3
+        assert nodes[0].getposition() == (500, 500, 0)
+        assert nodes[1].getposition() == (10, 10, 0)
+        assert not wlan.model.all_link_data(0)
+
     @pytest.mark.parametrize("node_id, expected", [
         (1, True),
         (2, False)
@@ -258,6 +408,30 @@ class TestGrpc:
         # then
         assert response.output == output
 
+    def test_node_commands(self, grpc_server):
+        # given
+        client = CoreGrpcClient()
+        session = grpc_server.coreemu.create_session()
+        session.set_state(EventTypes.CONFIGURATION_STATE)
+        node_options = NodeOptions(model="Host")
+        nodes = [session.add_node(node_options=node_options) for _ in range(3)]
+        session.add_node(_type=NodeTypes.SWITCH)
+        session.instantiate()
+
+        # then
+        with client.context_connect():
+            results = list(client.node_commands(session.id, "echo hello world", max_output=5))
+            timeout_results = list(client.node_commands(session.id, "sleep 5", node_ids=[nodes[0].id], timeout=0.5))
+
+        # then
+        assert sorted(x.node_id for x in results) == [x.id for x in nodes]
+        for result in results:
+            assert result.status == 0
+            assert result.output == "hello"
+            assert result.truncated
+        assert len(timeout_results) == 1
+        assert timeout_results[0].timed_out
+
     def test_get_node_terminal(self, grpc_server):
         # given
         client = CoreGrpcClient()
@@ -394,6 +568,68 @@ class TestGrpc:
             with client.context_connect():
                 client.add_link(session.id, 1, 3, interface)
 
+    def test_add_links(self, grpc_server, interface_helper):
+        # given
+        client = CoreGrpcClient()
+        session = grpc_server.coreemu.create_session()
+        switch = session.add_node(_type=NodeTypes.SWITCH)
+        node_one = session.add_node()
+        node_two = session.add_node()
+        links = []
+        for node_id in [node_one.id, node_two.id, 10]:
+            interface = interface_helper.create_interface(node_id, 0)
+            links.append(core_pb2.Link(
+                node_one_id=node_id, node_two_id=switch.id, type=core_pb2.LinkType.WIRED, interface_one=interface))
+
+        # then
+        with client.context_connect():
+            response = client.add_links(session.id, links)
+
+        # then
+        assert [x.result for x in response.results] == [True, True, False]
+        assert len(switch.all_link_data(0)) == 2
+
+    def test_add_links_command_error(self, grpc_server, interface_helper):
+        # given
+        client = CoreGrpcClient()
+        session = grpc_server.coreemu.create_session()
+        switch = session.add_node(_type=NodeTypes.SWITCH)
+        node = session.add_node()
+        interface = interface_helper.create_interface(node.id, 0)
+        link = core_pb2.Link(
+            node_one_id=node.id, node_two_id=switch.id, type=core_pb2.LinkType.WIRED, interface_one=interface)
+
+        # then
+        with mock.patch.object(NetBatch, "flush", side_effect=CoreCommandError(1, "ip", "failed")):
+            with client.context_connect():
+                response = client.add_links(session.id, [link])
+
+        # then
+        assert not response.results[0].result
+        assert response.results[0].error
+
+    def test_edit_links(self, grpc_server, ip_prefixes):
+        # given
+        client = CoreGrpcClient()
+        session = grpc_server.coreemu.create_session()
+        switch = session.add_node(_type=NodeTypes.SWITCH)
+        node = session.add_node()
+        interface = ip_prefixes.create_interface(node)
+        session.add_link(node.id, switch.id, interface)
+        options = core_pb2.LinkOptions(bandwidth=30000)
+        link = core_pb2.Link(
+            node_one_id=node.id, node_two_id=switch.id, interface_one=core_pb2.Interface(id=interface.id),
+            options=options)
+
+        # then
+        with client.context_connect():
+            response = client.edit_links(session.id, [link])
+
+        # then
+        assert response.results[0].result is True
+        link = switch.all_link_data(0)[0]
+        assert options.bandwidth == link.bandwidth
+
     def test_edit_link(self, grpc_server, ip_prefixes):
         # given
         client = CoreGrpcClient()
@@ -789,6 +1025,58 @@ class TestGrpc:
             # then
             queue.get(timeout=5)
 
+    def test_event_batches(self, grpc_server, ip_prefixes):
+        # given
+        client = CoreGrpcClient()
+        session = grpc_server.coreemu.create_session()
+        wlan = session.add_node(_type=NodeTypes.WIRELESS_LAN)
+        node = session.add_node()
+        interface = ip_prefixes.create_interface(node)
+        session.add_link(node.id, wlan.id, interface)
+        link_data = wlan.all_link_data(0)[0]
+        node_data = node.data(message_type=0)
+        queue = Queue()
+
+        def handle_batch(event_batch):
+            for event_data in event_batch.events:
+                assert event_data.HasField("link_event")
+            queue.put(event_batch)
+
+        # then
+        with client.context_connect():
+            client.event_batches(session.id, handle_batch, events=[core_pb2.EventType.LINK], node_ids=[node.id])
+            time.sleep(0.1)
+            session.broadcast_node(node_data)
+            session.broadcast_link(link_data)
+
+            # then
+            event_batch = queue.get(timeout=5)
+            assert len(event_batch.events) == 1
+
+    def test_event_filter(self):
+        # given
+        event_filter = EventFilter(node_ids=[1], max_rate=1)
+        first = NodeData(message_type=0, id=1, x_position=1)
+        second = NodeData(message_type=0, id=1, x_position=2)
+        third = NodeData(message_type=0, id=1, x_position=3)
+        fourth = NodeData(message_type=0, id=1, x_position=4)
+        delete = NodeData(message_type=MessageFlags.DELETE.value, id=1)
+        event = EventData(event_type=EventTypes.RUNTIME_STATE.value)
+
+        # then
+        assert event_filter.accept(first)
+        assert not event_filter.accept(NodeData(message_type=0, id=2))
+        assert event_filter.accept(event)
+        assert event_filter.limit([first, second, event], 10) == [first, event]
+        assert event_filter.limit([third], 10.5) == []
+        assert event_filter.timeout(10.5, 1) == 0.5
+        assert event_filter.limit([], 11) == [third]
+        assert event_filter.timeout(11, 1) == 1
+        assert event_filter.limit([fourth, delete], 11.5) == [delete]
+        assert not event_filter.pending
+        assert not event_filter.next_times
+        assert event_filter.limit([], 12) == []
+
     def test_throughputs(self, grpc_server):
         # given
         client = CoreGrpcClient()
@@ -806,6 +1094,29 @@ class TestGrpc:
             # then
             queue.get(timeout=5)
 
+    def test_session_throughputs(self, grpc_server):
+        # given
+        grpc_server.throughput_sampler.interval = 0.1
+        client = CoreGrpcClient()
+        session = grpc_server.coreemu.create_session()
+        session.set_state(EventTypes.CONFIGURATION_STATE)
+        grpc_server.coreemu.create_session()
+        switch = session.add_node(_type=NodeTypes.SWITCH)
+        queue = Queue()
+
+        def handle_event(event_data):
+            queue.put(event_data)
+
+        # then
+        with client.context_connect():
+            client.throughputs(handle_event, session_id=session.id)
+
+            # then
+            for _ in range(3):
+                event_data = queue.get(timeout=5)
+                assert event_data.session_id == session.id
+                assert [x.node_id for x in event_data.bridge_throughputs] == [switch.id]
+
     def test_session_events(self, grpc_server):
         # given
         client = CoreGrpcClient()
@@ -2,19 +2,31 @@
 Unit tests for testing with a CORE switch.
 """
 
+import socket
+import struct
 import threading
 
+import mock
+import pytest
+
+from core import CoreCommandError
 from core.api.tlv import coreapi, dataconversion
 from core.api.tlv.coreapi import CoreExecuteTlv
+from core.api.tlv.corehandlers import CoreHandler
 from core.emulator.enumerations import CORE_API_PORT, NodeTypes
+from core.emulator.enumerations import ConfigTlvs
 from core.emulator.enumerations import EventTlvs
 from core.emulator.enumerations import EventTypes
 from core.emulator.enumerations import ExecuteTlvs
+from core.emulator.enumerations import FileTlvs
 from core.emulator.enumerations import LinkTlvs
 from core.emulator.enumerations import LinkTypes
 from core.emulator.enumerations import MessageFlags
 from core.emulator.enumerations import MessageTypes
+from core.emulator.enumerations import NodeTlvs
+from core.location.mobility import WayPointMobility
 from core.nodes import ipaddress
+from core.nodes.netclient import NetBatch
 
 
 def command_message(node, command):
@@ -172,3 +184,281 @@ class TestGui:
         pingip = output.split()[3].split("/")[0]
         output, status = run_cmd(node_two, "ping -c 5 " + pingip)
         assert not status
+
+    def test_message_reader(self):
+        """
+        Test reading framed messages received in pieces, with lazily decoded TLVs.
+        """
+
+        # create a large file message and a small node message
+        file_data = "x" * 60000
+        tlv_data = coreapi.CoreFileTlv.pack(FileTlvs.NODE.value, 1)
+        tlv_data += coreapi.CoreFileTlv.pack(FileTlvs.NAME.value, "test.txt")
+        tlv_data += coreapi.CoreFileTlv.pack(FileTlvs.DATA.value, file_data)
+        file_message = coreapi.CoreFileMessage.pack(MessageFlags.ADD.value, tlv_data)
+        tlv_data = coreapi.CoreNodeTlv.pack(NodeTlvs.NUMBER.value, 2)
+        node_message = coreapi.CoreNodeMessage.pack(0, tlv_data)
+        data = file_message + node_message
+
+        # send messages in small pieces
+        sock_one, sock_two = socket.socketpair()
+
+        def send_data():
+            for index in range(0, len(data), 1000):
+                sock_one.sendall(data[index:index + 1000])
+            sock_one.close()
+
+        thread = threading.Thread(target=send_data)
+        thread.start()
+
+        # read messages
+        reader = coreapi.CoreMessageReader(sock_two)
+        message_type, message_flags, header, message_data = reader.read()
+        message = coreapi.CLASS_MAP[message_type](message_flags, header, message_data)
+        message_type, message_flags, header, message_data = reader.read()
+        node_message = coreapi.CLASS_MAP[message_type](message_flags, header, message_data)
+        with pytest.raises(EOFError):
+            reader.read()
+        thread.join()
+        sock_two.close()
+
+        # validate messages and values
+        assert message.raw_message == file_message
+        assert message.get_tlv(FileTlvs.NAME.value) == "test.txt"
+        assert message.get_tlv(FileTlvs.DATA.value) == file_data
+        assert message.tlv_data[FileTlvs.NODE.value] == 1
+        assert node_message.get_tlv(NodeTlvs.NUMBER.value) == 2
+
+    def test_batch_message(self):
+        """
+        Test packing node and link messages into batch messages and parsing them back.
+        """
+
+        # create node and link messages
+        messages = []
+        for node_id in range(1, 101):
+            tlv_data = coreapi.CoreNodeTlv.pack(NodeTlvs.NUMBER.value, node_id)
+            tlv_data += coreapi.CoreNodeTlv.pack(NodeTlvs.NAME.value, "n%s" % node_id)
+            messages.append(coreapi.CoreNodeMessage.pack(MessageFlags.ADD.value, tlv_data))
+        for node_id in range(1, 100):
+            tlv_data = coreapi.CoreLinkTlv.pack(LinkTlvs.N1_NUMBER.value, node_id)
+            tlv_data += coreapi.CoreLinkTlv.pack(LinkTlvs.N2_NUMBER.value, node_id + 1)
+            messages.append(coreapi.CoreLinkMessage.pack(MessageFlags.ADD.value, tlv_data))
+
+        # pack into batches limited in size
+        batches = coreapi.CoreBatchMessage.pack_batches(MessageFlags.STRING.value, messages, 1000)
+
+        # parse batches back into messages
+        parsed = []
+        for batch in batches:
+            message_type, message_flags, _ = coreapi.CoreMessage.unpack_header(batch)
+            header = batch[:coreapi.CoreMessage.header_len]
+            assert message_type == MessageTypes.BATCH.value
+            assert len(batch) - len(header) <= 1000
+            message = coreapi.CLASS_MAP[message_type](message_flags, header, batch[len(header):])
+            parsed.extend(message.messages)
+
+        # validate messages
+        assert len(batches) > 1
+        assert [x.raw_message for x in parsed] == messages
+        assert parsed[0].get_tlv(NodeTlvs.NAME.value) == "n1"
+        assert parsed[-1].node_numbers() == [99, 100]
+
+    def test_batch_message_invalid(self):
+        """
+        Test invalid messages within a batch message are skipped and counted.
+        """
+
+        # create batch with an unknown message type, a nested batch and a node message
+        unknown_message = struct.pack(coreapi.CoreMessage.header_format, 99, 0, 4) + b"\0" * 4
+        nested_message = coreapi.CoreBatchMessage.pack(0, b"")
+        tlv_data = coreapi.CoreNodeTlv.pack(NodeTlvs.NUMBER.value, 1)
+        node_message = coreapi.CoreNodeMessage.pack(MessageFlags.ADD.value, tlv_data)
+        batch = coreapi.CoreBatchMessage.pack(0, unknown_message + nested_message + node_message)
+
+        # parse batch
+        header = batch[:coreapi.CoreMessage.header_len]
+        message = coreapi.CoreBatchMessage(0, header, batch[len(header):])
+
+        # validate only the node message was parsed
+        assert [x.raw_message for x in message.messages] == [node_message]
+        assert message.invalid == 2
+
+    def test_batch_message_replies(self, cored):
+        """
+        Test string flagged batch messages always get a reply, including when batched host commands fail.
+
+        :param cored: cored daemon server to test with
+        """
+
+        # set core daemon to run in the background
+        thread = threading.Thread(target=cored.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        # connect and create batches
+        sock = socket.create_connection(("localhost", CORE_API_PORT))
+        reader = coreapi.CoreMessageReader(sock)
+        empty_batch = coreapi.CoreBatchMessage.pack(MessageFlags.STRING.value, b"")
+        tlv_data = coreapi.CoreNodeTlv.pack(NodeTlvs.NUMBER.value, 1)
+        tlv_data += coreapi.CoreNodeTlv.pack(NodeTlvs.TYPE.value, NodeTypes.SWITCH.value)
+        node_message = coreapi.CoreNodeMessage.pack(MessageFlags.ADD.value, tlv_data)
+        node_batch = coreapi.CoreBatchMessage.pack(MessageFlags.STRING.value, node_message)
+
+        def read_batch():
+            while True:
+                message_type, message_flags, header, data = reader.read()
+                if message_type == MessageTypes.BATCH.value:
+                    return coreapi.CoreBatchMessage(message_flags, header, data)
+
+        # send batches, with batched host commands failing for the second
+        sock.sendall(empty_batch)
+        empty_reply = read_batch()
+        with mock.patch.object(NetBatch, "flush", side_effect=CoreCommandError(1, "ip", "failed")):
+            sock.sendall(node_batch)
+            node_reply = read_batch()
+        sock.close()
+
+        # validate replies
+        assert empty_reply.messages == []
+        assert [x.message_type for x in node_reply.messages] == [MessageTypes.EXCEPTION.value]
+
+    def test_tlv_encoder(self):
+        """
+        Test compiled tlv encoders pack the same data as CoreTlv.pack.
+        """
+
+        # create values for each tlv data type
+        ip4 = ipaddress.IpAddress.from_string("10.0.0.1")
+        ip6 = ipaddress.IpAddress(socket.AF_INET6, socket.inet_pton(socket.AF_INET6, "2001::1"))
+        mac = ipaddress.MacAddress.from_string("00:00:00:aa:00:01")
+        values = [
+            (coreapi.CoreNodeTlv, NodeTlvs.NUMBER.value, 1),
+            (coreapi.CoreNodeTlv, NodeTlvs.NAME.value, "n1"),
+            (coreapi.CoreNodeTlv, NodeTlvs.OPAQUE.value, "x" * 300),
+            (coreapi.CoreNodeTlv, NodeTlvs.IP_ADDRESS.value, ip4),
+            (coreapi.CoreNodeTlv, NodeTlvs.IP6_ADDRESS.value, ip6),
+            (coreapi.CoreNodeTlv, NodeTlvs.MAC_ADDRESS.value, mac),
+            (coreapi.CoreLinkTlv, LinkTlvs.DELAY.value, 2 ** 40),
+            (coreapi.CoreEventTlv, EventTlvs.TYPE.value, EventTypes.RUNTIME_STATE.value),
+            (coreapi.CoreConfigTlv, ConfigTlvs.TYPE.value, 2),
+            (coreapi.CoreConfigTlv, ConfigTlvs.DATA_TYPES.value, (10, 10, 11)),
+        ]
+
+        # pack values using encoders and validate against CoreTlv.pack
+        for tlv_class, tlv_type, value in values:
+            data = bytearray()
+            tlv_class.encoder().pack_into(data, tlv_type, value)
+            assert bytes(data) == tlv_class.pack(tlv_type, value)
+
+    def test_session_snapshot(self, session):
+        """
+        Test packed node and link messages are cached and repacked only for changed nodes.
+
+        :param core.emulator.coreemu.EmuSession session: session for test
+        """
+
+        # create switches linked to a hub
+        hub = session.add_node(_type=NodeTypes.HUB)
+        switches = []
+        for _ in range(2):
+            switch = session.add_node(_type=NodeTypes.SWITCH)
+            session.add_link(switch.id, hub.id)
+            switches.append(switch)
+
+        # pack snapshot and read back messages
+        data = session.snapshot.pack()
+        sock_one, sock_two = socket.socketpair()
+        sock_one.sendall(data)
+        sock_one.close()
+        reader = coreapi.CoreMessageReader(sock_two)
+        message_types = []
+        while True:
+            try:
+                message_types.append(reader.read()[0])
+            except EOFError:
+                break
+        sock_two.close()
+        assert message_types == [MessageTypes.NODE.value] * 3 + [MessageTypes.LINK.value] * 2
+        assert session.snapshot.misses == 3
+
+        # pack again without changes, then after moving a switch
+        assert session.snapshot.pack() == data
+        assert session.snapshot.hits == 3
+        switches[0].setposition(100, 100)
+        assert session.snapshot.pack() != data
+        assert session.snapshot.misses == 4
+
+        # delete a switch, removing its entry
+        session.delete_node(switches[1].id)
+        session.snapshot.pack()
+        assert switches[1].id not in session.snapshot.entries
+
+    def test_session_snapshot_mobility(self, session):
+        """
+        Test nodes moved by mobility scripts are repacked.
+
+        :param core.emulator.coreemu.EmuSession session: session for test
+        """
+
+        # create wlan with a node and mobility
+        wlan = session.add_node(_type=NodeTypes.WIRELESS_LAN)
+        node = session.add_node()
+        mobility = WayPointMobility(session=session, _id=wlan.id)
+        session.snapshot.pack()
+        misses = session.snapshot.misses
+
+        # move node as mobility scripts do
+        mobility.setnodeposition(node, 100, 100, 0)
+        session.snapshot.pack()
+        assert session.snapshot.misses == misses + 1
+
+    def test_session_snapshot_emane_location(self, session):
+        """
+        Test nodes moved by emane location events are repacked.
+
+        :param core.emulator.coreemu.EmuSession session: session for test
+        """
+
+        # create a switch and map a nem to it
+        switch = session.add_node(_type=NodeTypes.SWITCH)
+        netif = mock.MagicMock(node=switch)
+        session.snapshot.pack()
+        misses = session.snapshot.misses
+
+        # move switch as emane location events do
+        session.location.setrefgeo(47.57917, -122.13232, 2.0)
+        with mock.patch.object(session.emane, "nemlookup", return_value=(None, netif)):
+            assert session.emane.handlelocationeventtoxyz(1, 47.57917, -122.13232, 2.0)
+        session.snapshot.pack()
+        assert session.snapshot.misses == misses + 1
+
+    def test_broadcast_objects(self, session):
+        """
+        Test session objects are broadcast to handlers other than api clients.
+
+        :param core.emulator.coreemu.EmuSession session: session for test
+        """
+
+        # create switches linked to a hub, with an api client and other handlers
+        hub = session.add_node(_type=NodeTypes.HUB)
+        for _ in range(2):
+            switch = session.add_node(_type=NodeTypes.SWITCH)
+            session.add_link(switch.id, hub.id)
+        client = CoreHandler.__new__(CoreHandler)
+        client.session = session
+        client.sendall = mock.MagicMock()
+        session.node_batch_handlers.append(client.handle_broadcast_nodes)
+        session.link_handlers.append(client.handle_broadcast_link)
+        nodes = []
+        links = []
+        session.node_handlers.append(nodes.append)
+        session.link_handlers.append(links.append)
+
+        # broadcast session objects
+        client.broadcast_objects()
+
+        # only other handlers receive the nodes and links
+        assert len(nodes) == 3
+        assert len(links) == 2
+        assert not client.sendall.called
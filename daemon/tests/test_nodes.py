@@ -1,10 +1,21 @@
 import os
+import threading
 import time
 
+import mock
 import pytest
 
 from core.emulator.emudata import NodeOptions
 from core.emulator.enumerations import NodeTypes
+from core.nodes.base import CoreNetworkBase
+from core.nodes.client import VnodeClient
+from core.nodes.netclient import LinuxNetClient
+from core.nodes.netclient import NetBatch
+from core.nodes.netclient import NetlinkNetClient
+from core.nodes.network import EbtablesQueue
+from core.nodes.network import NftablesQueue
+from core import CoreCommandError
+from core import constants
 from core import utils
 
 MODELS = [
@@ -54,6 +65,28 @@ class TestNodes:
         assert node.position.x == position_value
         assert node.position.y == position_value
 
+    def test_node_commands(self, session):
+        # given
+        node = session.add_node()
+        results = []
+
+        def run_command(index):
+            results.append((index, node.cmd_output(["sh", "-c", "echo %s; exit %s" % (index, index % 3)])))
+
+        # when
+        threads = [threading.Thread(target=run_command, args=(i,)) for i in range(50)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # then
+        assert node.client.channel is not None
+        assert len(results) == 50
+        for index, (status, output) in results:
+            assert status == index % 3
+            assert output == str(index)
+
     def test_node_delete(self, session):
         # given
         node = session.add_node()
@@ -76,3 +109,169 @@ class TestNodes:
         assert node
         assert node.up
         assert utils.check_cmd(["brctl", "show", node.brname])
+
+    @pytest.mark.parametrize("net_backend, client_class", [("ip", LinuxNetClient), ("netlink", NetlinkNetClient)])
+    def test_net_backend(self, session, ip_prefixes, net_backend, client_class):
+        # given
+        session.options.set_config("net_backend", net_backend)
+        switch = session.add_node(_type=NodeTypes.SWITCH)
+        node = session.add_node()
+        interface = ip_prefixes.create_interface(node)
+
+        # when
+        session.add_link(node.id, switch.id, interface)
+
+        # then
+        assert isinstance(switch.net_client, client_class)
+        assert isinstance(node.net_client, client_class)
+        assert isinstance(node.node_net_client, client_class)
+        netif = node.netif(interface.id)
+        assert netif.flow_id
+        assert utils.check_cmd(["brctl", "show", switch.brname])
+        output = node.check_cmd(["ip", "addr", "show", netif.name])
+        assert ip_prefixes.ip4_address(node) in output
+
+    def test_net_batch(self, session, ip_prefixes):
+        # given
+        nodes = []
+
+        # when
+        with session.net_batch() as batch:
+            switch = session.add_node(_type=NodeTypes.SWITCH)
+            for _ in range(5):
+                node = session.add_node()
+                interface = ip_prefixes.create_interface(node)
+                session.add_link(node.id, switch.id, interface)
+                nodes.append((node, interface))
+            queued = len(batch.ip_commands)
+
+        # then
+        assert queued
+        assert not batch.ip_commands
+        output = utils.check_cmd(["ip", "link", "show", "master", switch.brname])
+        for node, interface in nodes:
+            netif = node.netif(interface.id)
+            assert netif.localname in output
+
+    def test_net_batch_error(self, session):
+        # given
+        error = ValueError("failed")
+
+        # when
+        with mock.patch.object(NetBatch, "flush", side_effect=CoreCommandError(1, "ip", "failed")) as flush:
+            with pytest.raises(ValueError) as raised:
+                with session.net_batch():
+                    raise error
+
+        # then
+        assert raised.value is error
+        assert flush.called
+        assert session.get_net_batch() is None
+
+    def test_ebtables_commit(self):
+        # given
+        queue = EbtablesQueue()
+        wlan = mock.MagicMock(brname="b.1.1", policy="DROP")
+        netifs = [mock.MagicMock(localname="veth%s" % x) for x in range(11)]
+        table = ["*filter\n:INPUT ACCEPT\n:FORWARD ACCEPT\n:OUTPUT ACCEPT\n:b.1.1 DROP\n"]
+
+        def check_cmd(args, input=None):
+            if args == ["ebtables-restore"]:
+                table[0] = input.decode("utf-8")
+            return table[0]
+
+        # when
+        with mock.patch.object(constants, "EBTABLES_SAVE_BIN", "ebtables-save"), \
+                mock.patch.object(constants, "EBTABLES_RESTORE_BIN", "ebtables-restore"), \
+                mock.patch.object(utils, "check_cmd", side_effect=check_cmd) as check_cmd_mock:
+            for netif in netifs[1:]:
+                queue.ebchange(wlan, netifs[0], netif, True)
+            queue.commit([wlan])
+            added_calls = check_cmd_mock.call_count
+            added_rules = table[0].count("-A b.1.1")
+            check_cmd_mock.reset_mock()
+            queue.ebchange(wlan, netifs[0], netifs[1], False)
+            queue.commit([wlan])
+
+        # then
+        assert added_calls == 2
+        assert added_rules == 20
+        assert check_cmd_mock.call_count == 2
+        assert queue.last_commit_rules == 2
+        assert table[0].count("-A b.1.1") == 18
+        assert "-o veth1 " not in table[0]
+        assert len(queue.chainrules(wlan)) == 18
+
+    def test_nftables_commit_error(self):
+        # given
+        queue = NftablesQueue()
+        netifs = [mock.MagicMock(localname="veth%s" % x) for x in range(3)]
+        wlan = mock.MagicMock(brname="b.1.1", policy="DROP", _linked_lock=threading.Lock())
+        wlan._linked = {netifs[0]: {netifs[1]: True, netifs[2]: False}}
+        queue.changes[wlan] = {}
+        queue.elements[wlan] = set()
+        queue.change(wlan, netifs[0], netifs[1], True)
+        error = CoreCommandError(1, "nft", "failed")
+
+        # when
+        with mock.patch.object(utils, "check_cmd", side_effect=[error, None]) as check_cmd:
+            with pytest.raises(CoreCommandError):
+                queue.commit()
+
+        # then
+        resync = check_cmd.call_args[1]["input"].decode("utf-8")
+        assert check_cmd.call_count == 2
+        assert resync.startswith("flush set bridge core_b_1_1 links\n")
+        assert queue.elements[wlan] == {("veth0", "veth1"), ("veth1", "veth0")}
+        assert not queue.changes[wlan]
+
+    def test_vnode_client_channel_closed(self):
+        # given
+        client = VnodeClient("n1", "/tmp/n1.ctrl")
+        channel = mock.MagicMock(running=False)
+        channel.request.side_effect = IOError("control channel closed")
+        client.channel = channel
+
+        # when
+        with mock.patch("core.nodes.client.Popen") as popen:
+            popen.return_value.wait.return_value = 0
+            status = client.cmd(["true"])
+            client.cmd(["true"])
+
+        # then
+        assert status == 0
+        assert channel.request.call_count == 1
+        assert channel.close.called
+        assert client.channel is None
+        assert popen.call_count == 2
+
+    def test_vnode_client_no_sendmsg(self):
+        # given
+        client = VnodeClient("n1", "/tmp/n1.ctrl")
+
+        # when
+        with mock.patch("core.nodes.client.socket.socket", spec=[]):
+            channel = client._get_channel()
+
+        # then
+        assert channel is None
+        assert client._channel_failed
+
+    def test_net_attach_concurrent(self):
+        # given
+        session = mock.MagicMock()
+        session.options.get_config.return_value = None
+        net = CoreNetworkBase(session, 1, "n1")
+        netifs = [mock.MagicMock(netifi=None) for _ in range(50)]
+
+        # when
+        threads = [threading.Thread(target=net.attach, args=(netif,)) for netif in netifs]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # then
+        assert len(net.netifs()) == len(netifs)
+        assert len(set(netif.netifi for netif in netifs)) == len(netifs)
+        assert len(net._linked) == len(netifs)